@@ -1,196 +1,39 @@
 from shiny import App, ui, render, reactive
-from typing import List, Dict, Any
-
-# === Constants/data ported from codelookup.py ===
-
-SAS_TEMPLATE = """
-/* {var_value} */
-data new_varxx;
-YearNum = 2023;
-VarValID = {varvalid};
-Topic_ID = {topic_id};
-SubTopic_ID = {subtopic_id};
-ExcludeInclude = 1;
-SortOrder = 1;
-Topic_SortOrder = 1;
-SubTopic_SortOrder = 1;
-Topic_DefaultID = 1;
-DefaultID = 1;
-Indicator_SortOrder = ;
-YearDate = "2023-01-01";
-Dataset = "{dataset}";
-Dataset_Name = "{dataset_name}";
-Dataset_Type = "Health Surveys";
-VarCode = "{var_code}";
-VarValue = "{var_value}";
-VarType = "{var_type}";
-VarName = "{var_name}";
-Description = "{description}";
-Topic = "{topic}";
-Sub_Topic = "{sub_topic}";
-PopulationDatasource = "{population}";
-Note1 = "";
-Note2 = "";
-Note3 = "";
-CrossNotes = "";
-MapTitlePrefix = "";
-MapTitleSuffix = "";
-MapInsert = "";
-VarComments = "";
-Tag = "{var_name}_{tag_suffix}";
-DefaultPopulationSource = "{population}";
-output;
-run;
-"""
-
-TOPICS = {
-    "Children and Youth": {
-        "id": 5,
-        "subtopics": {
-            "Child Development and Disabilities": 26,
-            "Day Care and School": 34,
-            "Drug and Alcohol Use": 10,
-            "Health Care Use": 17,
-            "Health Insurance": 15,
-            "Household and Neighborhood": 16,
-            "Health Status": 18,
-            "Mental Health": 3,
-            "Nutrition": 23,
-            "Physical Activity": 35,
-            "Physical Health Conditions": 12,
-            "Population Characteristics": 11,
-            "Safety": 4,
-            "Sleep": 33,
-            "Sexual Behavior": 30,
-            "Smoking": 7,
-            "Violence": 1,
-        },
-    },
-    "Healthy Living": {
-        "id": 4,
-        "subtopics": {
-            "Vaccinations": 29,
-            "Drug and Alcohol Use": 10,
-            "Health Status": 18,
-            "Nutrition": 23,
-            "Physical Activity": 35,
-            "Safety": 4,
-            "Screening": 19,
-            "Sexual Behavior": 30,
-        },
-    },
-    "Sleep": {"id": 33, "subtopics": {}},
-    "Smoking": {"id": 7, "subtopics": {}},
-    "Vaccinations": {"id": 29, "subtopics": {}},
-    "Violence": {"id": 1, "subtopics": {}},
-    "Community Characteristics": {
-        "id": 6,
-        "subtopics": {
-            "Day Care and School": 34,
-            "Economic Factors": 31,
-            "Population Characteristics": 11,
-            "Social Factors": 13,
-        },
-    },
-    "Living and Environmental Conditions": {
-        "id": 7,
-        "subtopics": {
-            "Built Environment": 28,
-            "Housing": 14,
-        },
-    },
-    "Safety": {"id": 4, "subtopics": {}},
-    "Social Factors": {"id": 13, "subtopics": {}},
-    "Mental Health": {
-        "id": 3,
-        "subtopics": {
-            "Drug and Alcohol Use": 10,
-            "Mental Health Conditions": 20,
-            "Mental Health Counseling and Treatment": 27,
-        },
-    },
-    "Diseases and Conditions": {
-        "id": 1,
-        "subtopics": {
-            "Child Development and Disabilities": 26,
-            "Chronic Diseases": 24,
-            "Dental Health": 21,
-            "Foodborne or Waterborne Infections": 43,
-            "HIV-AIDS": 8,
-            "Hearing and Vision Health": 36,
-            "Hepatitis Infections": 48,
-            "Invasive Bacterial Infections": 45,
-            "Mosquitoborne Infections": 37,
-            "Other and Rare Diseases": 46,
-            "Person-to-Person Infections": 44,
-            "Respiratory Infections": 41,
-            "Sexually Transmitted Infections": 5,
-            "Syndromic Surveillance": 39,
-            "Tickborne Infections": 42,
-            "Tuberculosis": 53,
-            "Vaccine-Preventable Diseases": 47,
-            "Zoonotic Infections": 40,
-        },
-    },
-    "Health Care Access and Use": {
-        "id": 2,
-        "subtopics": {
-            "Health Care Use": 17,
-            "Health Insurance": 15,
-            "Mental Health Counseling and Treatment": 27,
-            "Screening": 19,
-            "Vaccinations": 29,
-        },
-    },
-    "Birth and Death": {
-        "id": 8,
-        "subtopics": {
-            "Birth": 38,
-            "Infant Mortality": 51,
-            "Leading Cause of Death": 52,
-            "Mortality and Premature Mortality": 49,
-        },
-    },
-}
-
-SURVEYS = {
-    "YRBS": {"full_name": "NYC Youth Risk Behavior Survey", "population": "Youth", "tag_suffix": "YRBS"},
-    "CHS": {"full_name": "Community Health Survey", "population": "Adult", "tag_suffix": "CHS"},
-    "HANES": {"full_name": "NYC Health and Nutrition Examination Survey", "population": "Adult", "tag_suffix": "HANES"},
-    "CCHS": {"full_name": "NYC Child Health Data", "population": "Youth", "tag_suffix": "CCHS"},
-}
-
-def compute_ids(var_type: str, topic: str, sub_topic: str) -> Dict[str, int]:
-    topic_id = TOPICS.get(topic, {}).get("id", 0) if topic else 0
-    subtopic_id = 0
-    if var_type == "Indicator" and topic in TOPICS:
-        subtopic_id = TOPICS.get(topic, {}).get("subtopics", {}).get(sub_topic, 0)
-    return {"topic_id": topic_id, "subtopic_id": subtopic_id}
-
-def generate_sas_for_variable(var_data: Dict[str, Any]) -> List[str]:
-    parts: List[str] = []
-    ids = compute_ids(var_data["var_type"], var_data.get("topic", ""), var_data.get("sub_topic", ""))
-    for idx, val in enumerate(var_data["levels"], start=1):
-        parts.append(
-            SAS_TEMPLATE.format(
-                varvalid=idx,
-                topic_id=ids["topic_id"],
-                subtopic_id=ids["subtopic_id"],
-                dataset=var_data["dataset"],
-                dataset_name=var_data["dataset_name"],
-                var_code=var_data["var_code"],
-                var_value=val,
-                var_type=var_data["var_type"],
-                var_name=var_data["var_name"],
-                description=var_data["description"],
-                topic=var_data.get("topic", ""),
-                sub_topic=var_data.get("sub_topic", ""),
-                population=var_data["population"],
-                tag_suffix=var_data["tag_suffix"],
-            )
-        )
-        parts.append("")  # blank line between entries
-    return parts
+from typing import List, Dict, Any, Optional
+
+from sasgen import TOPICS, SURVEYS, compute_ids, generate_sas_for_variable
+from sasgen.dictionary import DictionaryCatalog, catalog_from_env, check_records, survey_for_filename
+from sasgen.cache import cache_from_env
+from sasgen.levelsets import DuplicateLevelSet, library_from_env
+from sasgen.preview import VariablePreview
+from sasgen.queue import VariableQueue
+from sasgen.sasmeta import DATASET_SUFFIXES, FORMAT_SOURCE_SUFFIXES, import_files
+from sasgen.metrics import metrics_from_env
+from sasgen.search import KIND_VARIABLE, SearchIndex, SearchResult, format_result, search_many, taxonomy_index
+from sasgen.sessions import record_bytes, registry_from_env
+from sasgen.validation import MAX_LEVELS, MIN_LEVELS, format_errors, validate_records
+
+# === Shared state ===
+# Built once per process and shared by every session (read-only, except that
+# level sets can be appended); only the queue and form state below live per
+# session.
+
+# Optional render cache (set CODELOOKUP_CACHE_DIR). The queue renders variable by
+# variable, so only its in-memory level is used here, shared by all sessions.
+render_cache = cache_from_env()
+# Timing/counter hooks; written to $CODELOOKUP_METRICS at exit when set
+metrics_from_env()
+taxonomy_search = taxonomy_index()
+subtopic_options = {topic: sorted(info["subtopics"]) for topic, info in TOPICS.items()}
+# Level set library: built-in sets plus $CODELOOKUP_LEVEL_SETS. Shared by every
+# session when serverful: a set saved in one session is written to that file and
+# offered to other sessions once they reload. Under Shinylive each browser keeps
+# its own sets in IndexedDB.
+level_sets = library_from_env()
+# Data dictionaries in $CODELOOKUP_DICTIONARIES; sessions can upload more
+dictionaries = catalog_from_env()
+# Per-session queue size/bytes and caps (CODELOOKUP_MAX_QUEUE, CODELOOKUP_MAX_SESSION_BYTES)
+sessions = registry_from_env()
 
 # === UI (two columns for queue and output) ===
 
@@ -200,6 +43,8 @@ app_ui = ui.page_fluid(
     ui.h2("SAS Code Generator (Client-side, Shinylive)"),
     ui.layout_sidebar(
         ui.sidebar(
+            ui.input_text("search", "Search topics and variables"),
+            ui.input_select("search_pick", "Matches", choices={"": "(type to search)"}),
             ui.input_select("dataset", "Survey Dataset", choices=list(SURVEYS.keys()), selected="YRBS"),
             ui.input_text("var_code", "Variable Code"),
             ui.input_text("var_name", "Variable Name"),
@@ -208,28 +53,59 @@ app_ui = ui.page_fluid(
             ui.input_select("topic", "Topic", choices=topic_options, selected=topic_options[0]),
             # Initialize sub_topic with no choices and no selection
             ui.input_select("sub_topic", "Sub-Topic", choices=[], selected=None),
-            ui.input_numeric("levels", "Number of Levels", 2, min=2, max=6),
+            ui.input_select("level_set", "Level Set", choices={"": "(custom levels)", **level_sets.choices()}),
+            ui.input_numeric("levels", "Number of Levels", MIN_LEVELS, min=MIN_LEVELS, max=MAX_LEVELS),
             ui.output_ui("level_inputs"),
+            ui.input_text("level_set_name", "Save levels as set"),
+            ui.input_action_button("save_level_set", "Save Level Set", class_="btn-sm btn-outline-secondary"),
             ui.input_action_button("add_var", "Add Variable to Queue", class_="btn-primary"),
             ui.input_action_button("clear_queue", "Clear Queue", class_="btn-secondary"),
+            ui.input_file(
+                "sas_import",
+                "Import SAS metadata (.sas7bdat/.xpt, plus formats)",
+                accept=list(DATASET_SUFFIXES + FORMAT_SOURCE_SUFFIXES),
+                multiple=True,
+            ),
+            ui.input_file("dictionary_upload", "Data dictionaries (<SURVEY>.csv)", accept=[".csv"], multiple=True),
+            ui.input_action_button("check_dictionaries", "Check Against Dictionaries", class_="btn-outline-secondary"),
             ui.hr(),
             ui.input_action_button("generate", "Generate SAS Code", class_="btn-success"),
             ui.hr(),
             ui.output_text_verbatim("validation_errors"),
+            ui.output_text("session_usage"),
         ),
         ui.row(
             ui.column(
                 6,
                 ui.card(
                     ui.card_header("Queued Variables"),
-                    ui.output_text_verbatim("queue_summary"),
+                    ui.output_ui("queue_summary"),
+                    ui.div(id="queue_rows"),
+                    ui.input_select("queue_item", "Selected Variable", choices={}),
+                    ui.div(
+                        ui.input_action_button("item_load", "Load into Form", class_="btn-sm btn-outline-primary"),
+                        ui.input_action_button("item_update", "Update from Form", class_="btn-sm btn-outline-primary"),
+                        ui.input_action_button("item_up", "Move Up", class_="btn-sm btn-outline-secondary"),
+                        ui.input_action_button("item_down", "Move Down", class_="btn-sm btn-outline-secondary"),
+                        ui.input_action_button("item_delete", "Delete", class_="btn-sm btn-outline-danger"),
+                        style="display: flex; gap: 6px; flex-wrap: wrap;",
+                    ),
                 ),
             ),
             ui.column(
                 6,
+                ui.card(
+                    ui.card_header("Preview (variable being edited)"),
+                    ui.output_text_verbatim("preview"),
+                ),
+                ui.card(
+                    ui.card_header("Dictionary Cross-Check"),
+                    ui.output_text_verbatim("dictionary_report"),
+                ),
                 ui.card(
                     ui.card_header("Generated SAS Code"),
-                    ui.output_text_verbatim("sas_code"),
+                    ui.output_ui("sas_code"),
+                    ui.div(id="sas_rows"),
                 ),
             ),
         ),
@@ -237,17 +113,111 @@ app_ui = ui.page_fluid(
 )
 
 def server(input, output, session):
-    queued: reactive.Value[List[Dict[str, Any]]] = reactive.Value([])
+    # The queue (records, order, Indicator_SortOrder) lives in a VariableQueue.
+    # Each item is mirrored in a reactive value, so editing or renumbering an
+    # item only invalidates that item's outputs.
+    queue = VariableQueue()
+    queue_order: reactive.Value[List[int]] = reactive.Value([])
+    queue_items: Dict[int, reactive.Value[Dict[str, Any]]] = {}
+    item_sas: Dict[int, Any] = {}  # item id -> reactive.calc of its SAS parts
+    # The queue and code panels have one row per position, each showing the
+    # item id in row_items; a move only changes the two rows involved.
+    row_items: List[reactive.Value[int]] = []
+    shown_items: List[int] = []
+    queue_empty: reactive.Value[bool] = reactive.Value(True)
     last_error: reactive.Value[str] = reactive.Value("")
     awaiting_confirmation: reactive.Value[bool] = reactive.Value(False)
     pending_validation_errors: reactive.Value[List[str]] = reactive.Value([])
+    # Sub-topic and level names to apply once the dependent inputs re-render
+    pending_subtopic: reactive.Value[str] = reactive.Value("")
+    prefill_levels: reactive.Value[List[str]] = reactive.Value([])
+    # Uploaded dictionaries, falling back to the shared ones
+    session_dictionaries = DictionaryCatalog(fallback=dictionaries)
+    cross_check_report: reactive.Value[str] = reactive.Value("")
+
+    # Per-session memory accounting
+    usage = sessions.open(session.id)
+    usage_changed: reactive.Value[int] = reactive.Value(0)
+    item_bytes: Dict[int, int] = {}
+    session.on_ended(lambda: sessions.close(session.id))
+
+    # Typeahead: shared taxonomy index plus an index of this session's queued variables
+    search_index = SearchIndex()
+    search_hits: Dict[str, SearchResult] = {}
+    search_docs: Dict[int, int] = {}  # item id -> search doc id
+
+    # Live preview of the form; text inputs already send updates debounced
+    # while typing, and the preview re-renders only what changed
+    preview_renderer = VariablePreview()
+
+    @output
+    @render.text
+    def preview():
+        return preview_renderer.render(build_var_data())
 
     # Dynamic level inputs
     @output
     @render.ui
     def level_inputs():
-        n = int(input.levels() or 2)
-        return ui.div(*[ui.input_text(f"level_{i}", f"Level {i} Name") for i in range(1, n + 1)])
+        n = int(input.levels() or MIN_LEVELS)
+        # Used once, so a later change of the level count renders blank inputs
+        # instead of bringing back the names of a previously picked set
+        with reactive.isolate():
+            prefill = prefill_levels.get()
+        prefill_levels.set([])
+        return ui.div(*[
+            ui.input_text(f"level_{i}", f"Level {i} Name", value=prefill[i - 1] if i <= len(prefill) else "")
+            for i in range(1, n + 1)
+        ])
+
+    @reactive.effect
+    @reactive.event(input.level_set)
+    def _pick_level_set():
+        level_set = level_sets.get(input.level_set())
+        if level_set is None:
+            return
+        show_levels(list(level_set))
+
+    def show_levels(levels: List[str]) -> None:
+        if int(input.levels() or MIN_LEVELS) == len(levels):
+            # level_inputs won't re-render, so fill in the existing inputs
+            for i, name in enumerate(levels, start=1):
+                ui.update_text(f"level_{i}", session=session, value=name)
+        else:
+            # level_inputs picks these up once the new count arrives
+            prefill_levels.set(levels)
+            ui.update_numeric("levels", session=session, value=len(levels))
+
+    def update_level_set_choices(selected: Optional[str] = None):
+        choices = {"": "(custom levels)", **level_sets.choices()}
+        ui.update_select("level_set", session=session, choices=choices, selected=selected)
+
+    @reactive.effect
+    async def _load_browser_level_sets():
+        # Runs once per session; only finds anything under Shinylive
+        if await level_sets.load_browser():
+            with reactive.isolate():
+                update_level_set_choices(input.level_set())
+
+    @reactive.effect
+    @reactive.event(input.save_level_set)
+    async def _save_level_set():
+        levels = build_var_data()["levels"]
+        try:
+            level_set = level_sets.add(input.level_set_name(), levels, exist_ok=False)
+        except DuplicateLevelSet as e:
+            ui.notification_show(str(e), type="warning", duration=6)
+            update_level_set_choices(e.existing.set_id)
+            return
+        except (ValueError, OSError) as e:
+            ui.notification_show(f"Could not save level set: {e}", type="error", duration=6)
+            return
+        update_level_set_choices(level_set.set_id)
+        ui.update_text("level_set_name", session=session, value="")
+        try:
+            await level_sets.save_browser()
+        except OSError as e:
+            ui.notification_show(f"Level set added for this visit only: {e}", type="warning", duration=6)
 
     # Sub-topic updater effect (reacts to both var_type and topic)
     @reactive.effect
@@ -265,8 +235,11 @@ def server(input, output, session):
             options = []
             selected = None
         else:
-            options = sorted(TOPICS.get(topic, {}).get("subtopics", {}).keys())
-            selected = options[0] if options else None
+            options = subtopic_options.get(topic, [])
+            with reactive.isolate():
+                wanted = pending_subtopic.get()
+            pending_subtopic.set("")
+            selected = wanted if wanted in options else (options[0] if options else None)
 
         # Use ui.update_select for updating choices - more reliable than send_input_message
         ui.update_select(
@@ -276,6 +249,49 @@ def server(input, output, session):
             selected=selected,
         )
 
+    @reactive.effect
+    def _search():
+        queue_order.get()  # refresh matches when the queue changes
+        search_hits.clear()
+        choices = {"": "(type to search)"}
+        for n, hit in enumerate(search_many([taxonomy_search, search_index], input.search() or "", limit=20)):
+            search_hits[str(n)] = hit
+            choices[str(n)] = format_result(hit)
+        ui.update_select("search_pick", session=session, choices=choices, selected="")
+
+    @reactive.effect
+    @reactive.event(input.search_pick)
+    def _search_pick():
+        hit = search_hits.get(input.search_pick() or "")
+        if hit is None:
+            return
+        if hit.kind == KIND_VARIABLE:
+            # Select the queued variable and copy its fields into the form
+            if hit.payload in queue_items:
+                ui.update_select("queue_item", session=session, selected=str(hit.payload))
+                fill_form(queue_items[hit.payload].get())
+        else:
+            ui.update_select("var_type", session=session, selected="Indicator")
+            select_topic(*hit.payload)
+
+    def select_topic(topic: str, sub_topic: str) -> None:
+        if topic and topic == input.topic():
+            ui.update_select("sub_topic", session=session, selected=sub_topic)
+        elif topic:
+            # _update_subtopics picks this up once the new topic's choices are sent
+            pending_subtopic.set(sub_topic)
+            ui.update_select("topic", session=session, selected=topic)
+
+    def fill_form(v: Dict[str, Any]) -> None:
+        ui.update_select("dataset", session=session, selected=v["dataset"])
+        ui.update_text("var_code", session=session, value=v["var_code"])
+        ui.update_text("var_name", session=session, value=v["var_name"])
+        ui.update_text("description", session=session, value=v["description"])
+        ui.update_select("var_type", session=session, selected=v["var_type"])
+        show_levels(list(v["levels"]))
+        ui.update_select("level_set", session=session, selected=v.get("level_set") or "")
+        select_topic(v["topic"], v["sub_topic"])
+
     def validate_current() -> List[str]:
         """Validate current inputs and return list of missing fields."""
         errors = []
@@ -295,7 +311,7 @@ def server(input, output, session):
         elif vt == "Indicator":
             # Require a topic with at least one subtopic choice and a selected sub_topic
             topic = input.topic()
-            subs = sorted(TOPICS.get(topic, {}).get("subtopics", {}).keys()) if topic else []
+            subs = subtopic_options.get(topic, []) if topic else []
             if not topic or not subs:
                 errors.append("Topic (with Sub-Topics)")
             if not input.sub_topic():
@@ -303,13 +319,14 @@ def server(input, output, session):
         
         try:
             n = int(input.levels())
-            if not (2 <= n <= 6):
-                errors.append("Number of Levels (must be 2-6)")
+            # Same bounds as the batch rules (sasgen.validation) and the Tk form
+            if not (MIN_LEVELS <= n <= MAX_LEVELS):
+                errors.append(f"Number of Levels (must be {MIN_LEVELS}-{MAX_LEVELS})")
         except Exception:
             errors.append("Number of Levels")
             n = 0
         
-        if n >= 2:
+        if n >= MIN_LEVELS:
             for i in range(1, n + 1):
                 try:
                     name = (input[f"level_{i}"]() or "").strip()
@@ -343,7 +360,8 @@ def server(input, output, session):
         sub_topic = input.sub_topic() if var_type == "Indicator" else ""
         ids = compute_ids(var_type, topic or "", sub_topic or "")
         
-        return {
+        # Matching levels share the library's LevelSet instead of a new list
+        return level_sets.bind({
             "dataset": dataset,
             "dataset_name": survey["full_name"],
             "population": survey["population"],
@@ -357,7 +375,178 @@ def server(input, output, session):
             "topic_id": ids["topic_id"],
             "subtopic_id": ids["subtopic_id"],
             "levels": levels,
+        })
+
+    # === Queue items ===
+
+    def queued_records() -> List[Dict[str, Any]]:
+        return [queue_items[i].get() for i in queue_order.get()]
+
+    def index_item(item_id: int, var_data: Dict[str, Any]) -> None:
+        if item_id in search_docs:
+            search_index.remove(search_docs.pop(item_id))
+        search_docs[item_id] = search_index.add_variable(var_data, payload=item_id)
+
+    def refresh_items(item_ids: List[int]) -> None:
+        for item_id in item_ids:
+            queue_items[item_id].set(queue.records[item_id])
+
+    def add_row(pos: int) -> None:
+        row = reactive.Value(shown_items[pos])
+        row_items.append(row)
+
+        @output(id=f"row_summary_{pos}")
+        @render.text
+        def _summary():
+            v = queue_items[row.get()].get()
+            return f"[{v['dataset']}] {v['var_code']} - {v['var_name']} ({v['var_type']}) Levels: {len(v['levels'])}"
+
+        @output(id=f"row_sas_{pos}")
+        @render.text
+        def _sas():
+            return "\n".join(item_sas[row.get()]())
+
+        ui.insert_ui(
+            ui.div(f"{pos + 1}. ", ui.output_text(f"row_summary_{pos}", inline=True), id=f"queue_row_{pos}"),
+            selector="#queue_rows",
+        )
+        ui.insert_ui(ui.div(ui.output_text_verbatim(f"row_sas_{pos}"), id=f"sas_row_{pos}"), selector="#sas_rows")
+
+    def remove_row() -> None:
+        pos = len(row_items) - 1
+        output.remove(f"row_summary_{pos}")
+        output.remove(f"row_sas_{pos}")
+        ui.remove_ui(f"#queue_row_{pos}")
+        ui.remove_ui(f"#sas_row_{pos}")
+        row_items.pop()
+
+    def sync_rows() -> None:
+        """Point the rows at the queue order, touching only rows whose item changed."""
+        order = list(queue.order)
+        queue_order.set(order)
+        if bool(order) != bool(shown_items):
+            queue_empty.set(not order)
+        for pos, item_id in enumerate(order[:len(shown_items)]):
+            if shown_items[pos] != item_id:
+                shown_items[pos] = item_id
+                row_items[pos].set(item_id)
+        while len(shown_items) < len(order):
+            shown_items.append(order[len(shown_items)])
+            add_row(len(shown_items) - 1)
+        while len(shown_items) > len(order):
+            shown_items.pop()
+            remove_row()
+
+    def register_item(item_id: int) -> None:
+        item = queue_items[item_id] = reactive.Value(queue.records[item_id])
+
+        @reactive.calc
+        def sas_parts() -> List[str]:
+            return generate_sas_for_variable(item.get(), render_cache)
+
+        item_sas[item_id] = sas_parts
+
+    def enqueue(var_data: Dict[str, Any]) -> bool:
+        nbytes = record_bytes(var_data)
+        warning = sessions.check_add(usage, nbytes)
+        if warning:
+            last_error.set(warning)
+            ui.notification_show(warning, type="warning", duration=10)
+            return False
+        item_id = queue.add(var_data)
+        register_item(item_id)
+        item_bytes[item_id] = nbytes
+        usage.add(nbytes)
+        usage_changed.set(usage_changed.get() + 1)
+        index_item(item_id, queue.records[item_id])
+        sync_rows()
+        last_error.set("")
+        return True
+
+    def forget_item(item_id: int) -> None:
+        # Drops the item's per-session state once it has left the queue
+        if item_id in search_docs:
+            search_index.remove(search_docs.pop(item_id))
+        del queue_items[item_id], item_sas[item_id]
+        usage.remove(item_bytes.pop(item_id))
+        usage_changed.set(usage_changed.get() + 1)
+
+    def remove_item(item_id: int) -> None:
+        refresh_items(queue.remove(item_id))
+        forget_item(item_id)
+        sync_rows()
+
+    def selected_item() -> Optional[int]:
+        try:
+            item_id = int(input.queue_item())
+        except (TypeError, ValueError):
+            return None
+        return item_id if item_id in queue_items else None
+
+    @reactive.effect
+    def _update_item_choices():
+        choices = {
+            str(i): f"{n}. {queue_items[i].get()['var_code'] or '(no code)'}"
+            for n, i in enumerate(queue_order.get(), start=1)
         }
+        with reactive.isolate():
+            current = input.queue_item()
+        selected = current if current in choices else next(iter(choices), None)
+        ui.update_select("queue_item", session=session, choices=choices, selected=selected)
+
+    @reactive.effect
+    @reactive.event(input.item_load)
+    def _item_load():
+        item_id = selected_item()
+        if item_id is not None:
+            fill_form(queue_items[item_id].get())
+
+    @reactive.effect
+    @reactive.event(input.item_update)
+    def _item_update():
+        item_id = selected_item()
+        if item_id is None:
+            return
+        var_data = build_var_data()
+        nbytes = record_bytes(var_data)
+        warning = sessions.check_resize(usage, item_bytes[item_id], nbytes)
+        if warning:
+            last_error.set(warning)
+            ui.notification_show(warning, type="warning", duration=10)
+            return
+        usage.resize(item_bytes[item_id], nbytes)
+        item_bytes[item_id] = nbytes
+        usage_changed.set(usage_changed.get() + 1)
+        refresh_items([item_id] + queue.update(item_id, var_data))
+        index_item(item_id, queue.records[item_id])
+        errors = validate_current()
+        last_error.set("Updated with missing: " + ", ".join(errors) if errors else "")
+        ui.notification_show("Queued variable updated.", type="message")
+
+    def move_item(offset: int) -> None:
+        item_id = selected_item()
+        if item_id is None:
+            return
+        refresh_items(queue.move(item_id, offset))
+        sync_rows()
+
+    @reactive.effect
+    @reactive.event(input.item_up)
+    def _item_up():
+        move_item(-1)
+
+    @reactive.effect
+    @reactive.event(input.item_down)
+    def _item_down():
+        move_item(1)
+
+    @reactive.effect
+    @reactive.event(input.item_delete)
+    def _item_delete():
+        item_id = selected_item()
+        if item_id is not None:
+            remove_item(item_id)
+            ui.notification_show("Queued variable deleted.", type="message")
 
     @reactive.effect
     @reactive.event(input.add_var)
@@ -386,11 +575,8 @@ def server(input, output, session):
             return
         
         # No errors, add directly
-        q = queued.get().copy()
-        q.append(build_var_data())
-        queued.set(q)
-        last_error.set("")
-        ui.notification_show("Variable added to queue.", type="message")
+        if enqueue(build_var_data()):
+            ui.notification_show("Variable added to queue.", type="message")
     
     @reactive.effect
     @reactive.event(input.modal_add_anyway)
@@ -399,11 +585,8 @@ def server(input, output, session):
         ui.modal_remove()
         awaiting_confirmation.set(False)
         
-        q = queued.get().copy()
-        q.append(build_var_data())
-        queued.set(q)
-        last_error.set("")
-        ui.notification_show("Variable added to queue (with incomplete values).", type="message")
+        if enqueue(build_var_data()):
+            ui.notification_show("Variable added to queue (with incomplete values).", type="message")
     
     @reactive.effect
     @reactive.event(input.modal_cancel)
@@ -415,9 +598,72 @@ def server(input, output, session):
         error_msg = "Missing: " + ", ".join(errors)
         last_error.set(error_msg)
 
+    @reactive.effect
+    @reactive.event(input.sas_import)
+    def _sas_import():
+        files = input.sas_import() or []
+        # Dataset, type and topic come from the form; code, label and levels
+        # from each column's header metadata
+        try:
+            result = import_files([f["datapath"] for f in files], build_var_data(), names=[f["name"] for f in files])
+        except (OSError, ValueError, ImportError) as e:
+            last_error.set(f"Import failed: {e}")
+            ui.notification_show("Could not import SAS metadata.", type="error")
+            return
+        queued = 0
+        for var_data in result.records:
+            if not enqueue(level_sets.bind(var_data)):
+                break  # session limit reached; enqueue has reported it
+            queued += 1
+        ui.notification_show(f"Imported {result.describe()}; {queued} queued.", type="message", duration=10)
+
+    def cross_check() -> bool:
+        """Check the queue against the data dictionaries; False when something didn't match."""
+        if not len(session_dictionaries):
+            cross_check_report.set("No data dictionaries loaded.")
+            return True
+        try:
+            check = check_records(queued_records(), session_dictionaries)
+        except (OSError, ValueError) as e:
+            cross_check_report.set(f"Cross-check failed: {e}")
+            return False
+        cross_check_report.set(check.describe())
+        return not check.errors
+
+    @reactive.effect
+    @reactive.event(input.dictionary_upload)
+    def _dictionary_upload():
+        added, skipped = [], []
+        for f in input.dictionary_upload() or []:
+            dataset = survey_for_filename(f["name"])
+            if dataset:
+                session_dictionaries.add(dataset, f["datapath"])
+                added.append(dataset)
+            else:
+                skipped.append(f["name"])
+        if skipped:
+            ui.notification_show(
+                f"Skipped {', '.join(skipped)}: name dictionaries after a survey ({', '.join(SURVEYS)}).",
+                type="warning",
+            )
+        if added:
+            ui.notification_show(f"Data dictionaries loaded for {', '.join(added)}.", type="message")
+
+    @reactive.effect
+    @reactive.event(input.check_dictionaries)
+    def _check_dictionaries():
+        if not queue_order.get():
+            cross_check_report.set("No variables queued.")
+        elif not cross_check():
+            ui.notification_show("Queued variables don't match the data dictionaries.", type="warning")
+
+    @reactive.effect
     @reactive.event(input.clear_queue)
     def _clear():
-        queued.set([])
+        queue.clear()  # nothing left to renumber
+        for item_id in list(queue_items):
+            forget_item(item_id)
+        sync_rows()
         ui.notification_show("Queue cleared.", type="message")
 
     @output
@@ -427,34 +673,49 @@ def server(input, output, session):
 
     @output
     @render.text
+    def dictionary_report():
+        return cross_check_report.get() or "Upload data dictionaries or set CODELOOKUP_DICTIONARIES, then check."
+
+    @output
+    @render.text
+    def session_usage():
+        usage_changed.get()
+        return usage.describe()
+
+    # Rows are added to #queue_rows and #sas_rows by sync_rows; these only
+    # show the empty-queue messages, so they only re-render when the queue
+    # becomes empty or stops being empty.
+    @output
+    @render.ui
     def queue_summary():
-        q = queued.get()
-        if not q:
-            return "No variables queued."
-        lines = []
-        for i, v in enumerate(q, start=1):
-            lines.append(
-                f"{i}. [{v['dataset']}] {v['var_code']} - {v['var_name']} "
-                f"({v['var_type']}) Levels: {len(v['levels'])}"
-            )
-        return "\n".join(lines)
+        if queue_empty.get():
+            return ui.pre("No variables queued.")
+        return None
 
+    @reactive.effect
     @reactive.event(input.generate)
     def _generate():
-        if not queued.get():
+        if not queue_order.get():
             msg = "No variables to generate SAS code."
             last_error.set(msg)
             ui.notification_show(msg, type="error")
+            return
+        # Check the whole queue in one pass so every problem is reported at once
+        errors = validate_records(queued_records())
+        if errors:
+            last_error.set(f"{len(errors)} problem(s) in queued variables:\n" + format_errors(errors))
+            ui.notification_show("Queued variables have validation problems.", type="warning")
+        else:
+            last_error.set("")
+        # Then confirm every variable exists in its survey's data dictionary
+        if len(session_dictionaries) and not cross_check():
+            ui.notification_show("Queued variables don't match the data dictionaries.", type="warning")
 
     @output
-    @render.text
+    @render.ui
     def sas_code():
-        q = queued.get()
-        if not q:
-            return "No variables to generate SAS code."
-        parts: List[str] = []
-        for v in q:
-            parts.extend(generate_sas_for_variable(v))
-        return "\n".join(parts)
+        if queue_empty.get():
+            return ui.pre("No variables to generate SAS code.")
+        return None
 
 app = App(app_ui, server)
@@ -0,0 +1,19 @@
+"""Pure-Python SAS generation helpers shared by the CodeLookup apps.
+
+``sasgen.frame`` needs pandas and is therefore not imported here; import it
+explicitly when working with DataFrames.
+"""
+from .core import SAS_TEMPLATE, SURVEYS, TOPICS, compute_ids, generate_sas_code, generate_sas_for_variable
+from .validation import RuleSet, ValidationError, validate_records
+
+__all__ = [
+    "SAS_TEMPLATE",
+    "SURVEYS",
+    "TOPICS",
+    "compute_ids",
+    "generate_sas_code",
+    "generate_sas_for_variable",
+    "RuleSet",
+    "ValidationError",
+    "validate_records",
+]
@@ -0,0 +1,79 @@
+"""Small key/value store in the browser's IndexedDB, for the Shinylive app.
+
+Under Shinylive the app runs in Pyodide and nothing written to its
+in-memory file system outlives the tab. ``get`` and ``put`` keep short text
+values (JSON) in IndexedDB instead, through Pyodide's ``js`` module. They
+only work in the browser; check ``IN_BROWSER`` first.
+"""
+import asyncio
+import sys
+from typing import Any, Optional
+
+DB_NAME = "codelookup"
+# Version 1 held the start-up artifacts of the removed warm start
+DB_VERSION = 2
+STORE_NAME = "settings"
+IN_BROWSER = sys.platform == "emscripten"
+
+
+async def _result(request: Any) -> Any:
+    """Await an IDBRequest; raises OSError when it fails."""
+    from pyodide.ffi import create_proxy
+
+    future = asyncio.get_event_loop().create_future()
+
+    def succeeded(event: Any) -> None:
+        if not future.done():
+            future.set_result(request.result)
+
+    def failed(event: Any) -> None:
+        if not future.done():
+            future.set_exception(OSError(f"IndexedDB: {request.error}"))
+
+    handlers = [create_proxy(succeeded), create_proxy(failed)]
+    request.onsuccess, request.onerror = handlers
+    try:
+        return await future
+    finally:
+        request.onsuccess = request.onerror = None
+        for handler in handlers:
+            handler.destroy()
+
+
+async def _open_db() -> Any:
+    import js
+    from pyodide.ffi import create_proxy
+
+    request = js.indexedDB.open(DB_NAME, DB_VERSION)
+
+    def upgrade(event: Any) -> None:
+        db = request.result
+        if db.objectStoreNames.contains("artifacts"):
+            db.deleteObjectStore("artifacts")
+        if not db.objectStoreNames.contains(STORE_NAME):
+            db.createObjectStore(STORE_NAME)
+
+    handler = create_proxy(upgrade)
+    request.onupgradeneeded = handler
+    try:
+        return await _result(request)
+    finally:
+        request.onupgradeneeded = None
+        handler.destroy()
+
+
+async def get(key: str) -> Optional[str]:
+    db = await _open_db()
+    try:
+        value = await _result(db.transaction(STORE_NAME, "readonly").objectStore(STORE_NAME).get(key))
+        return None if value is None else str(value)
+    finally:
+        db.close()
+
+
+async def put(key: str, value: str) -> None:
+    db = await _open_db()
+    try:
+        await _result(db.transaction(STORE_NAME, "readwrite").objectStore(STORE_NAME).put(value, key))
+    finally:
+        db.close()
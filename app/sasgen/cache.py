@@ -0,0 +1,299 @@
+"""Optional render cache: variables in memory, whole programs on disk.
+
+Rendering a variable is a handful of ``str.format`` calls, so reading one
+small file per variable back from disk is slower than rendering it again.
+The cache therefore has two levels:
+
+* each variable's rendered parts, keyed by a hash of the normalized record,
+  in a size-bounded in-memory LRU. Re-generating a queue after a few edits
+  renders only the edited variables;
+* each whole program written by ``generate_sas_code``, keyed by a hash of all
+  its records, as one file on disk. Generating the same queue again, also
+  after a restart, is one file read.
+
+Disk entries live in a namespace directory named after a fingerprint of
+RENDERER_VERSION, SAS_TEMPLATE and the taxonomy/survey tables, so changing the
+template, any topic/subtopic id or the renderer itself yields a new namespace
+and stale output is never served. Each namespace holds a marker file; when a
+cache is opened, other namespaces with that marker are removed, and nothing
+else under the cache directory is touched. Both levels are bounded and evict
+the least recently used entries first.
+
+Enable it in either app by setting ``CODELOOKUP_CACHE_DIR``.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from .core import SAS_TEMPLATE, SURVEYS, TOPICS
+
+CACHE_DIR_ENV = "CODELOOKUP_CACHE_DIR"
+CACHE_MAX_BYTES_ENV = "CODELOOKUP_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+
+# Bump when the renderer's output changes without a change to SAS_TEMPLATE or
+# the taxonomy (escaping rules, sort-order numbering, ...).
+RENDERER_VERSION = 1
+
+# Every record field the renderer reads; ids are derived from the taxonomy and
+# are covered by the namespace fingerprint instead.
+RECORD_FIELDS = (
+    "dataset",
+    "dataset_name",
+    "var_code",
+    "var_type",
+    "var_name",
+    "description",
+    "topic",
+    "sub_topic",
+    "population",
+    "tag_suffix",
+    "indicator_sort",
+    "levels",
+)
+
+MARKER = ".codelookup-render-cache"
+_NAMESPACE_LEN = 16
+_SUFFIX = ".sas"
+
+
+def template_fingerprint(
+    template: str = SAS_TEMPLATE,
+    topics: Dict[str, Any] = TOPICS,
+    surveys: Dict[str, Any] = SURVEYS,
+    renderer_version: int = RENDERER_VERSION,
+) -> str:
+    """Hash of everything besides the record that affects rendered output."""
+    # sort_keys loses the TOPICS order, which Topic/SubTopic_SortOrder depend on
+    order = [[topic, list(info.get("subtopics", {}))] for topic, info in topics.items()]
+    payload = json.dumps(
+        {
+            "renderer": renderer_version,
+            "template": template,
+            "topics": topics,
+            "order": order,
+            "surveys": surveys,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _record_payload(var_data: Dict[str, Any]) -> bytes:
+    # Missing optional fields count as ""
+    normalized = [var_data.get(f, "") for f in RECORD_FIELDS[:-1]]
+    normalized.append(list(var_data.get("levels") or []))
+    return json.dumps(normalized, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def record_key(var_data: Dict[str, Any]) -> str:
+    """Hash of the normalized record."""
+    return hashlib.sha256(_record_payload(var_data)).hexdigest()
+
+
+def program_key(records: List[Dict[str, Any]]) -> str:
+    """Hash of every normalized record, in order."""
+    return _program_key([_record_payload(var_data) for var_data in records])
+
+
+def _program_key(payloads: List[bytes]) -> str:
+    h = hashlib.sha256()
+    for payload in payloads:
+        h.update(len(payload).to_bytes(8, "little"))
+        h.update(payload)
+    return h.hexdigest()
+
+
+class RenderCache:
+    """Per-variable parts in an in-memory LRU and whole programs in a size-bounded LRU under ``path``."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        template: str = SAS_TEMPLATE,
+        topics: Dict[str, Any] = TOPICS,
+        surveys: Dict[str, Any] = SURVEYS,
+    ):
+        self.root = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes  # counted in characters of rendered text
+        self.fingerprint = template_fingerprint(template, topics, surveys)
+        self.path = os.path.join(self.root, self.fingerprint[:_NAMESPACE_LEN])
+        os.makedirs(self.path, exist_ok=True)
+        open(os.path.join(self.path, MARKER), "a").close()
+        self._drop_stale_namespaces()
+        self._memory: "OrderedDict[str, List[str]]" = OrderedDict()
+        self.memory_used = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self._load_index()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop_stale_namespaces(self) -> None:
+        current = os.path.basename(self.path)
+        for name in os.listdir(self.root):
+            full = os.path.join(self.root, name)
+            # Only directories this class created; anything else under root is left alone
+            if name != current and os.path.isfile(os.path.join(full, MARKER)):
+                shutil.rmtree(full, ignore_errors=True)
+
+    def _load_index(self) -> None:
+        found = []
+        for name in os.listdir(self.path):
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[: -len(_SUFFIX)], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()  # max_bytes may be lower than in a previous run
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + _SUFFIX)
+
+    # === Variables (memory) ===
+
+    def get(self, var_data: Dict[str, Any]) -> Optional[List[str]]:
+        return self._recall(record_key(var_data))
+
+    def put(self, var_data: Dict[str, Any], parts: List[str]) -> None:
+        self._remember(record_key(var_data), parts)
+
+    def render(
+        self, var_data: Dict[str, Any], renderer: Callable[[Dict[str, Any]], List[str]]
+    ) -> List[str]:
+        """Return cached parts for ``var_data`` or render and store them."""
+        key = record_key(var_data)
+        parts = self._recall(key)
+        if parts is None:
+            parts = renderer(var_data)
+            self._remember(key, parts)
+        return parts
+
+    def _recall(self, key: str) -> Optional[List[str]]:
+        parts = self._memory.get(key)
+        if parts is None:
+            self.misses += 1
+            return None
+        self._memory.move_to_end(key)
+        self.hits += 1
+        return parts
+
+    def _remember(self, key: str, parts: List[str]) -> None:
+        size = sum(map(len, parts))
+        if size > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= sum(map(len, old))
+        self._memory[key] = parts
+        self.memory_used += size
+        while self.memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_used -= sum(map(len, evicted))
+
+    # === Programs (disk) ===
+
+    def get_program(self, records: List[Dict[str, Any]]) -> Optional[str]:
+        return self._read_program(program_key(records))
+
+    def _read_program(self, key: str) -> Optional[str]:
+        if key not in self._entries:
+            return None
+        try:
+            with open(self._file(key), encoding="utf-8", newline="") as fh:
+                text = fh.read()
+            os.utime(self._file(key))
+        except (OSError, ValueError):
+            self._forget(key)
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def put_program(self, records: List[Dict[str, Any]], text: str) -> None:
+        self._write_program(program_key(records), text)
+
+    def _write_program(self, key: str, text: str) -> None:
+        data = text.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, self._file(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return
+        self.total_bytes += len(data) - self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        self._evict()
+
+    def render_program(
+        self, records: List[Dict[str, Any]], renderer: Callable[[Dict[str, Any]], List[str]]
+    ) -> str:
+        """Return the cached program for ``records``, or render it from the
+        variables (each through the memory cache) and store it.
+
+        Each record is normalized once, for both its own key and the program's.
+        """
+        payloads = [_record_payload(var_data) for var_data in records]
+        key = _program_key(payloads)
+        text = self._read_program(key)
+        if text is not None:
+            return text
+        parts: List[str] = []
+        for var_data, payload in zip(records, payloads):
+            var_key = hashlib.sha256(payload).hexdigest()
+            rendered = self._recall(var_key)
+            if rendered is None:
+                rendered = renderer(var_data)
+                self._remember(var_key, rendered)
+            parts.extend(rendered)
+        text = "\n".join(parts)
+        self._write_program(key, text)
+        return text
+
+    def _forget(self, key: str) -> None:
+        self.total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.unlink(self._file(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            self._forget(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._forget(key)
+        self._memory.clear()
+        self.memory_used = 0
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._memory) + len(self._entries)
+
+
+def cache_from_env() -> Optional[RenderCache]:
+    """RenderCache at $CODELOOKUP_CACHE_DIR, or None when the variable is unset."""
+    path = os.environ.get(CACHE_DIR_ENV)
+    if not path:
+        return None
+    max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+    return RenderCache(path, max_bytes=max_bytes)
@@ -0,0 +1,362 @@
+"""SAS template, taxonomy tables and the per-variable renderer.
+
+Shared by the Shiny app and the batch helpers in this package. Kept free of
+Shiny and native-extension imports so it runs unchanged under Pyodide.
+"""
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .escaping import sas_comment, sas_literal
+from .metrics import METRICS, count_blocks, text_bytes
+from .ordering import number_in_groups
+
+# === Constants/data (shared by codelookup.py and app/app.py) ===
+
+SAS_TEMPLATE = """
+/* {var_value_comment} */
+data new_varxx;
+YearNum = 2023;
+VarValID = {varvalid};
+Topic_ID = {topic_id};
+SubTopic_ID = {subtopic_id};
+ExcludeInclude = 1;
+SortOrder = {varvalid};
+Topic_SortOrder = {topic_sort};
+SubTopic_SortOrder = {subtopic_sort};
+Topic_DefaultID = 1;
+DefaultID = 1;
+Indicator_SortOrder = {indicator_sort};
+YearDate = "2023-01-01";
+Dataset = {dataset};
+Dataset_Name = {dataset_name};
+Dataset_Type = "Health Surveys";
+VarCode = {var_code};
+VarValue = {var_value};
+VarType = {var_type};
+VarName = {var_name};
+Description = {description};
+Topic = {topic};
+Sub_Topic = {sub_topic};
+PopulationDatasource = {population};
+Note1 = "";
+Note2 = "";
+Note3 = "";
+CrossNotes = "";
+MapTitlePrefix = "";
+MapTitleSuffix = "";
+MapInsert = "";
+VarComments = "";
+Tag = {tag};
+DefaultPopulationSource = {population};
+output;
+run;
+"""
+
+TOPICS = {
+    "Children and Youth": {
+        "id": 5,
+        "subtopics": {
+            "Child Development and Disabilities": 26,
+            "Day Care and School": 34,
+            "Drug and Alcohol Use": 10,
+            "Health Care Use": 17,
+            "Health Insurance": 15,
+            "Household and Neighborhood": 16,
+            "Health Status": 18,
+            "Mental Health": 3,
+            "Nutrition": 23,
+            "Physical Activity": 35,
+            "Physical Health Conditions": 12,
+            "Population Characteristics": 11,
+            "Safety": 4,
+            "Sleep": 33,
+            "Sexual Behavior": 30,
+            "Smoking": 7,
+            "Violence": 1,
+        },
+    },
+    "Healthy Living": {
+        "id": 4,
+        "subtopics": {
+            "Vaccinations": 29,
+            "Drug and Alcohol Use": 10,
+            "Health Status": 18,
+            "Nutrition": 23,
+            "Physical Activity": 35,
+            "Safety": 4,
+            "Screening": 19,
+            "Sexual Behavior": 30,
+        },
+    },
+    "Sleep": {"id": 33, "subtopics": {}},
+    "Smoking": {"id": 7, "subtopics": {}},
+    "Vaccinations": {"id": 29, "subtopics": {}},
+    "Violence": {"id": 1, "subtopics": {}},
+    "Community Characteristics": {
+        "id": 6,
+        "subtopics": {
+            "Day Care and School": 34,
+            "Economic Factors": 31,
+            "Population Characteristics": 11,
+            "Social Factors": 13,
+        },
+    },
+    "Living and Environmental Conditions": {
+        "id": 7,
+        "subtopics": {
+            "Built Environment": 28,
+            "Housing": 14,
+        },
+    },
+    "Safety": {"id": 4, "subtopics": {}},
+    "Social Factors": {"id": 13, "subtopics": {}},
+    "Mental Health": {
+        "id": 3,
+        "subtopics": {
+            "Drug and Alcohol Use": 10,
+            "Mental Health Conditions": 20,
+            "Mental Health Counseling and Treatment": 27,
+        },
+    },
+    "Diseases and Conditions": {
+        "id": 1,
+        "subtopics": {
+            "Child Development and Disabilities": 26,
+            "Chronic Diseases": 24,
+            "Dental Health": 21,
+            "Foodborne or Waterborne Infections": 43,
+            "HIV-AIDS": 8,
+            "Hearing and Vision Health": 36,
+            "Hepatitis Infections": 48,
+            "Invasive Bacterial Infections": 45,
+            "Mosquitoborne Infections": 37,
+            "Other and Rare Diseases": 46,
+            "Person-to-Person Infections": 44,
+            "Respiratory Infections": 41,
+            "Sexually Transmitted Infections": 5,
+            "Syndromic Surveillance": 39,
+            "Tickborne Infections": 42,
+            "Tuberculosis": 53,
+            "Vaccine-Preventable Diseases": 47,
+            "Zoonotic Infections": 40,
+        },
+    },
+    "Health Care Access and Use": {
+        "id": 2,
+        "subtopics": {
+            "Health Care Use": 17,
+            "Health Insurance": 15,
+            "Mental Health Counseling and Treatment": 27,
+            "Screening": 19,
+            "Vaccinations": 29,
+        },
+    },
+    "Birth and Death": {
+        "id": 8,
+        "subtopics": {
+            "Birth": 38,
+            "Infant Mortality": 51,
+            "Leading Cause of Death": 52,
+            "Mortality and Premature Mortality": 49,
+        },
+    },
+}
+
+SURVEYS = {
+    "YRBS": {"full_name": "NYC Youth Risk Behavior Survey", "population": "Youth", "tag_suffix": "YRBS"},
+    "CHS": {"full_name": "Community Health Survey", "population": "Adult", "tag_suffix": "CHS"},
+    "HANES": {"full_name": "NYC Health and Nutrition Examination Survey", "population": "Adult", "tag_suffix": "HANES"},
+    "CCHS": {"full_name": "NYC Child Health Data", "population": "Youth", "tag_suffix": "CCHS"},
+}
+
+# Order of the positional arguments passed to the compiled template.
+RENDER_FIELDS = (
+    "varvalid",
+    "topic_id",
+    "subtopic_id",
+    "dataset",
+    "dataset_name",
+    "var_code",
+    "var_value",
+    "var_type",
+    "var_name",
+    "description",
+    "topic",
+    "sub_topic",
+    "population",
+    "tag",
+    "topic_sort",
+    "subtopic_sort",
+    "indicator_sort",
+    "var_value_comment",
+)
+
+# Fields that change from one level of a variable to the next; the rest are
+# per variable.
+LEVEL_FIELDS = ("varvalid", "var_value", "var_value_comment")
+VARIABLE_FIELDS = tuple(f for f in RENDER_FIELDS if f not in LEVEL_FIELDS)
+# Text fields written as SAS literals by sas_literal, quotes included; tag is
+# var_name and tag_suffix joined by "_". var_value_comment is var_value
+# through sas_comment.
+LITERAL_FIELDS = (
+    "dataset",
+    "dataset_name",
+    "var_code",
+    "var_value",
+    "var_type",
+    "var_name",
+    "description",
+    "topic",
+    "sub_topic",
+    "population",
+    "tag",
+)
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+def _placeholder(index: int, spec: str, conversion: Optional[str]) -> str:
+    return "{%d%s%s}" % (index, "!" + conversion if conversion else "", ":" + spec if spec else "")
+
+def positional_template(template: str, fields: Sequence[str]) -> str:
+    """Rewrite ``{name}`` placeholders as ``{index}`` into ``fields``.
+
+    ``str.format(*values)`` on the result skips building a kwargs dict per row.
+    """
+    out: List[str] = []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        out.append(_escape_braces(literal))
+        if name is not None:
+            out.append(_placeholder(fields.index(name), spec, conversion))
+    return "".join(out)
+
+def _partial(parsed: List[Tuple[Any, ...]], values: Dict[str, Any], fields: Sequence[str]) -> str:
+    conversions = {"r": repr, "s": str, "a": ascii}
+    out: List[str] = []
+    for literal, name, spec, conversion in parsed:
+        out.append(_escape_braces(literal))
+        if name is None:
+            continue
+        if name in values:
+            value = values[name]
+            if conversion:
+                value = conversions[conversion](value)
+            out.append(_escape_braces(format(value, spec or "")))
+        else:
+            out.append(_placeholder(fields.index(name), spec, conversion))
+    return "".join(out)
+
+def partial_template(values: Dict[str, Any], fields: Sequence[str], template: str = SAS_TEMPLATE) -> str:
+    """Fill in ``values`` now and leave the rest as positional placeholders over ``fields``.
+
+    ``values`` are inserted as given, so text fields must already be SAS literals.
+    """
+    return _partial(list(Formatter().parse(template)), values, fields)
+
+# Compiled once at import and shared by every renderer and session.
+COMPILED_TEMPLATE = positional_template(SAS_TEMPLATE, RENDER_FIELDS)
+
+# 1-based positions in TOPICS, for Topic_SortOrder and SubTopic_SortOrder
+TOPIC_SORT = {topic: n for n, topic in enumerate(TOPICS, start=1)}
+SUBTOPIC_SORT = {
+    topic: {sub: n for n, sub in enumerate(info["subtopics"], start=1)}
+    for topic, info in TOPICS.items()
+}
+
+def compute_ids(var_type: str, topic: str, sub_topic: str) -> Dict[str, int]:
+    topic_id = TOPICS.get(topic, {}).get("id", 0) if topic else 0
+    subtopic_id = 0
+    if var_type == "Indicator" and topic in TOPICS:
+        subtopic_id = TOPICS.get(topic, {}).get("subtopics", {}).get(sub_topic, 0)
+    return {"topic_id": topic_id, "subtopic_id": subtopic_id}
+
+def compute_sort_orders(var_type: str, topic: str, sub_topic: str) -> Dict[str, int]:
+    """Topic and subtopic positions in TOPICS (0 when unknown), mirroring compute_ids."""
+    topic_sort = TOPIC_SORT.get(topic, 0) if topic else 0
+    subtopic_sort = 0
+    if var_type == "Indicator" and topic in SUBTOPIC_SORT:
+        subtopic_sort = SUBTOPIC_SORT[topic].get(sub_topic, 0)
+    return {"topic_sort": topic_sort, "subtopic_sort": subtopic_sort}
+
+def order_group(var_data: Dict[str, Any]) -> Tuple[int, int]:
+    """Indicator_SortOrder counts variables within the same (Topic_ID, SubTopic_ID)."""
+    ids = compute_ids(var_data["var_type"], var_data.get("topic", ""), var_data.get("sub_topic", ""))
+    return (ids["topic_id"], ids["subtopic_id"])
+
+def _render_variable(var_data: Dict[str, Any]) -> List[str]:
+    parts: List[str] = []
+    topic = var_data.get("topic", "")
+    sub_topic = var_data.get("sub_topic", "")
+    ids = compute_ids(var_data["var_type"], topic, sub_topic)
+    sorts = compute_sort_orders(var_data["var_type"], topic, sub_topic)
+    # Assigned by generate_sas_code or a sasgen.ordering.OrderIndex; blank otherwise
+    indicator_sort = var_data.get("indicator_sort", "")
+    levels = var_data["levels"]
+    # Text fields are escaped once per variable, not once per level
+    dataset = sas_literal(var_data["dataset"])
+    dataset_name = sas_literal(var_data["dataset_name"])
+    var_code = sas_literal(var_data["var_code"])
+    var_type = sas_literal(var_data["var_type"])
+    var_name = sas_literal(var_data["var_name"])
+    description = sas_literal(var_data["description"])
+    topic = sas_literal(topic)
+    sub_topic = sas_literal(sub_topic)
+    population = sas_literal(var_data["population"])
+    tag = sas_literal(f"{var_data['var_name']}_{var_data['tag_suffix']}")
+    fmt = COMPILED_TEMPLATE.format
+    for idx, val in enumerate(levels, start=1):
+        # Positional arguments in RENDER_FIELDS order
+        parts.append(
+            fmt(
+                idx,
+                ids["topic_id"],
+                ids["subtopic_id"],
+                dataset,
+                dataset_name,
+                var_code,
+                sas_literal(val),
+                var_type,
+                var_name,
+                description,
+                topic,
+                sub_topic,
+                population,
+                tag,
+                sorts["topic_sort"],
+                sorts["subtopic_sort"],
+                indicator_sort,
+                sas_comment(val),
+            )
+        )
+        parts.append("")  # blank line between entries
+    return parts
+
+@METRICS.timed("generate_sas_for_variable", rows=count_blocks)
+def generate_sas_for_variable(var_data: Dict[str, Any], cache: Optional[Any] = None) -> List[str]:
+    """Render one SAS block per level; ``cache`` is an optional sasgen.cache.RenderCache."""
+    if cache is not None:
+        return cache.render(var_data, _render_variable)
+    return _render_variable(var_data)
+
+@METRICS.timed("generate_sas_code", nbytes=text_bytes)
+def generate_sas_code(records: Iterable[Dict[str, Any]], cache: Optional[Any] = None) -> str:
+    """Render all records into one SAS program.
+
+    Indicator_SortOrder is numbered here, in record order, within each
+    (Topic_ID, SubTopic_ID) group. With a ``cache``, a program already
+    rendered for the same records is read back whole.
+    """
+    records = list(records)
+    numbered: List[Dict[str, Any]] = []
+    for var_data, n in zip(records, number_in_groups(order_group(r) for r in records)):
+        if var_data.get("indicator_sort") != n:
+            var_data = dict(var_data, indicator_sort=n)
+        numbered.append(var_data)
+    if cache is not None:
+        return cache.render_program(numbered, _render_variable)
+    parts: List[str] = []
+    # _render_variable, not generate_sas_for_variable: metrics time the
+    # whole program, not each variable
+    for var_data in numbered:
+        parts.extend(_render_variable(var_data))
+    return "\n".join(parts)
@@ -0,0 +1,261 @@
+"""Cross-check of queued variables against survey data dictionaries.
+
+Each survey in SURVEYS can have a data dictionary: a CSV export listing its
+variables and their value labels. ``build_index`` streams a dictionary once,
+row by row, into a ``DictionaryIndex`` that keeps only each variable code
+(upper-cased, since SAS names are case-insensitive) and its number of value
+labels. Indexes are saved as JSON in a cache directory, keyed by the CSV's
+path, size and modification time, so later runs skip the CSV entirely until
+it changes. ``check_records`` then checks a whole queue with one dictionary
+lookup per variable.
+
+Two CSV layouts are understood (header names are case-insensitive):
+
+* one row per variable, with a ``levels`` column of ``|``-separated labels;
+* one row per value label, with a ``value_label`` (or ``value``) column; rows
+  with an empty label only declare the variable.
+
+The variable code column may be called ``var_code``, ``variable``,
+``variable_name``, ``varname`` or ``name``. A dictionary with neither levels
+column only lists variables, so level counts are not checked against it.
+
+Set ``CODELOOKUP_DICTIONARIES`` to a directory holding ``<SURVEY>.csv`` files
+(e.g. ``YRBS.csv``); indexes are cached in its ``.index`` subdirectory, or in
+``CODELOOKUP_DICTIONARY_CACHE`` when that is set.
+"""
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from .core import SURVEYS
+from .metrics import METRICS
+from .validation import ValidationError, format_errors
+
+DICTIONARY_DIR_ENV = "CODELOOKUP_DICTIONARIES"
+DICTIONARY_CACHE_ENV = "CODELOOKUP_DICTIONARY_CACHE"
+FORMAT_VERSION = 1
+
+CODE_COLUMNS = ("var_code", "variable", "variable_name", "varname", "name")
+LEVELS_COLUMN = "levels"
+LEVEL_SEPARATOR = "|"
+VALUE_COLUMNS = ("value_label", "value")
+INDEX_DIRNAME = ".index"
+
+
+def normalize_code(code: str) -> str:
+    return code.strip().upper()
+
+
+def survey_for_filename(name: str) -> Optional[str]:
+    """Survey a dictionary file is for, from its name (``yrbs.csv`` -> ``"YRBS"``)."""
+    stem, ext = os.path.splitext(os.path.basename(name))
+    if ext.lower() != ".csv":
+        return None
+    return next((dataset for dataset in SURVEYS if dataset.lower() == stem.lower()), None)
+
+
+class DictionaryIndex:
+    """Variable code -> number of value labels (None when the CSV has no labels)."""
+
+    def __init__(self, dataset: str, source: Dict[str, Any], counts: Dict[str, Optional[int]]):
+        self.dataset = dataset
+        self.source = source  # path, size and mtime_ns of the CSV the index was built from
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __contains__(self, code: str) -> bool:
+        return normalize_code(code) in self.counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": FORMAT_VERSION, "dataset": self.dataset, "source": self.source, "counts": self.counts}
+
+
+def _source(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _column(header: List[str], names: Iterable[str]) -> Optional[int]:
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def build_index(path: str, dataset: str, encoding: str = "utf-8-sig") -> DictionaryIndex:
+    """Stream the CSV at ``path`` once into an index."""
+    source = _source(path)
+    counts: Dict[str, Optional[int]] = {}
+    with open(path, newline="", encoding=encoding) as fh:
+        reader = csv.reader(fh)
+        header = [h.strip().lower().replace(" ", "_") for h in next(reader, [])]
+        code_col = _column(header, CODE_COLUMNS)
+        if code_col is None:
+            raise ValueError(
+                f"{os.path.basename(path)}: no variable code column (expected one of {', '.join(CODE_COLUMNS)})"
+            )
+        levels_col = _column(header, (LEVELS_COLUMN,))
+        value_col = None if levels_col is not None else _column(header, VALUE_COLUMNS)
+        for row in reader:
+            if len(row) <= code_col:
+                continue
+            code = normalize_code(row[code_col])
+            if not code:
+                continue
+            if levels_col is not None:
+                cell = row[levels_col] if len(row) > levels_col else ""
+                counts[code] = sum(1 for level in cell.split(LEVEL_SEPARATOR) if level.strip())
+            elif value_col is not None:
+                n = counts.get(code) or 0
+                counts[code] = n + 1 if len(row) > value_col and row[value_col].strip() else n
+            else:
+                counts[code] = None
+    return DictionaryIndex(dataset, source, counts)
+
+
+class DictionaryCatalog:
+    """Per-survey dictionary indexes, built on first use and cached on disk."""
+
+    def __init__(self, cache_dir: Optional[str] = None, fallback: Optional["DictionaryCatalog"] = None):
+        self.cache_dir = cache_dir
+        self.fallback = fallback  # consulted for surveys without a dictionary here
+        self.paths: Dict[str, str] = {}
+        self._indexes: Dict[str, DictionaryIndex] = {}
+
+    def __len__(self) -> int:
+        return len(self.surveys())
+
+    def surveys(self) -> List[str]:
+        """Surveys that have a dictionary, here or in the fallback."""
+        own = list(self.paths)
+        return own + [s for s in self.fallback.surveys() if s not in self.paths] if self.fallback else own
+
+    def add(self, dataset: str, path: str) -> None:
+        """Use the CSV at ``path`` as the dictionary for ``dataset``."""
+        self.paths[dataset] = path
+        self._indexes.pop(dataset, None)
+
+    def add_dir(self, directory: str) -> List[str]:
+        """Add every ``<SURVEY>.csv`` in ``directory``; returns the surveys found.
+
+        Without a cache directory, indexes are cached in ``directory/.index``.
+        """
+        if self.cache_dir is None:
+            self.cache_dir = os.path.join(directory, INDEX_DIRNAME)
+        found = []
+        for name in sorted(os.listdir(directory)):
+            dataset = survey_for_filename(name)
+            if dataset:
+                self.add(dataset, os.path.join(directory, name))
+                found.append(dataset)
+        return found
+
+    def _cache_file(self, path: str) -> str:
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir or "", f"{digest}.json")
+
+    def _load_cached(self, dataset: str, path: str, source: Dict[str, Any]) -> Optional[DictionaryIndex]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_file(path), encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != FORMAT_VERSION or data.get("source") != source:
+            return None
+        return DictionaryIndex(dataset, source, data["counts"])
+
+    def _save(self, index: DictionaryIndex) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(index.to_dict(), fh, ensure_ascii=False)
+            os.replace(tmp, self._cache_file(index.source["path"]))
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def get(self, dataset: str) -> Optional[DictionaryIndex]:
+        """Index for ``dataset``, rebuilt only when its CSV has changed; None without a dictionary."""
+        path = self.paths.get(dataset)
+        if path is None:
+            return self.fallback.get(dataset) if self.fallback else None
+        source = _source(path)
+        index = self._indexes.get(dataset)
+        if index is None or index.source != source:
+            index = self._load_cached(dataset, path, source)
+            if index is None:
+                index = build_index(path, dataset)
+                self._save(index)
+            self._indexes[dataset] = index
+        return index
+
+
+class CrossCheck(NamedTuple):
+    errors: List[ValidationError]
+    checked: int
+    missing_dictionaries: List[str]  # queued surveys without a dictionary
+    seconds: float
+
+    def describe(self, limit: int = 50) -> str:
+        lines = [f"{self.checked} variable(s) checked against data dictionaries in {self.seconds * 1000:.1f} ms"]
+        if self.missing_dictionaries:
+            lines.append("No dictionary for: " + ", ".join(self.missing_dictionaries))
+        if self.errors:
+            lines.append(f"{len(self.errors)} mismatch(es):")
+            lines.append(format_errors(self.errors, limit))
+        else:
+            lines.append("No mismatches.")
+        return "\n".join(lines)
+
+
+@METRICS.timed("check_records", rows=lambda check: check.checked)
+def check_records(records: List[Dict[str, Any]], catalog: DictionaryCatalog) -> CrossCheck:
+    """Check that each record's var_code is in its survey's dictionary with as many levels as value labels."""
+    start = time.perf_counter()
+    errors: List[ValidationError] = []
+    indexes: Dict[str, Optional[DictionaryIndex]] = {}
+    missing: List[str] = []
+    checked = 0
+    for i, record in enumerate(records):
+        dataset = record.get("dataset") or ""
+        if dataset not in indexes:
+            indexes[dataset] = catalog.get(dataset)
+            if indexes[dataset] is None:
+                missing.append(dataset or "(no survey)")
+        index = indexes[dataset]
+        if index is None:
+            continue
+        checked += 1
+        code = normalize_code(str(record.get("var_code") or ""))
+        if code not in index.counts:
+            errors.append(ValidationError(i, "var_code", f"{code or '(blank)'} is not in the {dataset} dictionary"))
+            continue
+        expected = index.counts[code]
+        queued = len([level for level in record.get("levels") or [] if str(level).strip()])
+        if expected is not None and queued != expected:
+            message = f"{code} has {queued} level(s); the {dataset} dictionary has {expected} value label(s)"
+            errors.append(ValidationError(i, "levels", message))
+    return CrossCheck(errors, checked, missing, time.perf_counter() - start)
+
+
+def catalog_from_env() -> DictionaryCatalog:
+    """Catalog of the dictionaries in $CODELOOKUP_DICTIONARIES (empty when unset)."""
+    directory = os.environ.get(DICTIONARY_DIR_ENV)
+    catalog = DictionaryCatalog(os.environ.get(DICTIONARY_CACHE_ENV) or None)
+    if directory:
+        catalog.add_dir(directory)
+    return catalog
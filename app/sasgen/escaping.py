@@ -0,0 +1,55 @@
+"""Escaping for text placed in the generated SAS.
+
+``sas_literal`` returns a whole SAS string literal. SAS resolves macro
+references (``&name``, ``%name``) inside double quotes but not inside single
+quotes, so text containing ``&`` or ``%`` is single-quoted with ``'`` doubled.
+Everything else is double-quoted with ``"`` doubled, as codelookup.java's
+``escapeQuotes`` does. Once quotes are doubled the literal can't end early, so
+``;`` and other characters inside it are ordinary text. Level values are also
+echoed in a ``/* */`` comment, where ``*/`` would end the comment early.
+
+Most values contain none of these, so after a few ``in`` scans they are
+only wrapped in double quotes (comments are returned as they are). Values
+that do need escaping are cached, since the same level labels and survey
+names repeat across variables.
+"""
+from typing import Dict
+
+# Escaped values kept per cache; the cache is emptied when it fills up
+CACHE_SIZE = 65536
+
+_literals: Dict[str, str] = {}
+_comments: Dict[str, str] = {}
+
+
+def sas_literal(text: str) -> str:
+    """``text`` as a quoted SAS string literal that resolves no macro references."""
+    if '"' not in text and "&" not in text and "%" not in text:
+        return '"' + text + '"'
+    escaped = _literals.get(text)
+    if escaped is None:
+        if len(_literals) >= CACHE_SIZE:
+            _literals.clear()
+        if "&" in text or "%" in text:
+            escaped = "'" + text.replace("'", "''") + "'"
+        else:
+            escaped = '"' + text.replace('"', '""') + '"'
+        _literals[text] = escaped
+    return escaped
+
+
+def sas_comment(text: str) -> str:
+    """``text`` ready to go inside a ``/* */`` comment."""
+    if "*/" not in text:
+        return text
+    escaped = _comments.get(text)
+    if escaped is None:
+        if len(_comments) >= CACHE_SIZE:
+            _comments.clear()
+        escaped = _comments[text] = text.replace("*/", "* /")
+    return escaped
+
+
+def clear_caches() -> None:
+    _literals.clear()
+    _comments.clear()
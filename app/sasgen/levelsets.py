@@ -0,0 +1,240 @@
+"""Named, reusable level sets.
+
+The same level lists ("Yes"/"No", age bands, boroughs, race/ethnicity) are
+used by many variables. A ``LevelSetLibrary`` stores each distinct list once as
+an immutable ``LevelSet`` of interned strings, and records bound to a set hold
+a reference to that one object (plus its id in ``level_set``) instead of their
+own copy. A LevelSet is a tuple, so every renderer treats it like any other
+``levels`` value.
+
+Libraries are saved as JSON. Set ``CODELOOKUP_LEVEL_SETS`` to a file path to
+load it at start-up and save new sets to it. Under Shinylive there is no
+lasting file system, so ``load_browser``/``save_browser`` keep the library in
+the browser's IndexedDB instead (see sasgen.browserstore).
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import browserstore
+
+LEVEL_SETS_ENV = "CODELOOKUP_LEVEL_SETS"
+FORMAT_VERSION = 1
+BROWSER_KEY = "level_sets"
+
+DEFAULT_LEVEL_SETS = [
+    ("Yes/No", ["Yes", "No"]),
+    ("Yes/No/Don't know", ["Yes", "No", "Don't know"]),
+    ("Sex", ["Male", "Female"]),
+    ("Adult age groups", ["18-24", "25-44", "45-64", "65+"]),
+    ("Borough", ["Bronx", "Brooklyn", "Manhattan", "Queens", "Staten Island"]),
+    (
+        "Race/ethnicity",
+        ["White non-Hispanic", "Black non-Hispanic", "Hispanic/Latino", "Asian/Pacific Islander", "Other non-Hispanic"],
+    ),
+]
+
+
+def level_set_id(levels: Sequence[str]) -> str:
+    """Stable id derived from the level names, so equal lists share an id everywhere."""
+    digest = hashlib.sha1(json.dumps(list(levels), ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"ls-{digest[:10]}"
+
+
+class LevelSet(tuple):
+    """Immutable, interned level names plus the set's id and name."""
+
+    def __new__(cls, name: str, levels: Iterable[str]) -> "LevelSet":
+        self = super().__new__(cls, (sys.intern(str(level)) for level in levels))
+        self.set_id = level_set_id(self)
+        self.name = name
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (LevelSet, (self.name, tuple(self)))
+
+    def label(self) -> str:
+        return f"{self.name} ({len(self)}: {', '.join(self[:3])}{', ...' if len(self) > 3 else ''})"
+
+
+class DuplicateLevelSet(ValueError):
+    """The levels being saved are already in the library as ``existing``."""
+
+    def __init__(self, existing: LevelSet):
+        super().__init__(f"These levels are already saved as '{existing.name}'")
+        self.existing = existing
+
+
+class LevelSetLibrary:
+    """Level sets by id, deduplicated by content."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._by_id: Dict[str, LevelSet] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[LevelSet]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, set_id: str) -> bool:
+        return set_id in self._by_id
+
+    def get(self, set_id: Optional[str]) -> Optional[LevelSet]:
+        return self._by_id.get(set_id) if set_id else None
+
+    def add(self, name: str, levels: Sequence[str], save: bool = True, exist_ok: bool = True) -> LevelSet:
+        """Add a set, or return the existing one with the same levels.
+
+        Raises ValueError for an empty name, no levels or blank level names,
+        and DuplicateLevelSet when the levels are already saved and
+        ``exist_ok`` is false (the apps' "Save Level Set" buttons).
+        """
+        name = (name or "").strip()
+        levels = [(level or "").strip() for level in levels]
+        if not name:
+            raise ValueError("Level set name is required")
+        if not levels or not all(levels):
+            raise ValueError("Level sets need at least one level and no blank level names")
+        existing = self._by_id.get(level_set_id(levels))
+        if existing is not None:
+            if not exist_ok:
+                raise DuplicateLevelSet(existing)
+            return existing
+        level_set = LevelSet(name, levels)
+        self._by_id[level_set.set_id] = level_set
+        if save and self.path:
+            self.save()
+        return level_set
+
+    def match(self, levels: Sequence[str]) -> Optional[LevelSet]:
+        """The set whose levels equal ``levels`` exactly, if any."""
+        if isinstance(levels, LevelSet) and levels.set_id in self._by_id:
+            return levels
+        return self._by_id.get(level_set_id(levels))
+
+    def bind(self, var_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Point ``var_data`` at the library's copy of its levels when one exists.
+
+        Sets ``levels`` to the shared LevelSet and ``level_set`` to its id, or
+        ``level_set`` to None for one-off level lists.
+        """
+        level_set = self.match(var_data.get("levels") or [])
+        if level_set is not None:
+            var_data["levels"] = level_set
+            var_data["level_set"] = level_set.set_id
+        else:
+            var_data["level_set"] = None
+        return var_data
+
+    def resolve(self, var_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill ``levels`` from the ``level_set`` id (e.g. for records loaded from disk).
+
+        Raises KeyError for an unknown id.
+        """
+        set_id = var_data.get("level_set")
+        if set_id:
+            if set_id not in self._by_id:
+                raise KeyError(f"Unknown level set: {set_id}")
+            var_data["levels"] = self._by_id[set_id]
+        return var_data
+
+    def choices(self) -> Dict[str, str]:
+        """``{id: label}`` for select widgets, sorted by name."""
+        return {s.set_id: s.label() for s in sorted(self, key=lambda s: s.name.lower())}
+
+    # === Persistence ===
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": FORMAT_VERSION,
+            "sets": [{"id": s.set_id, "name": s.name, "levels": list(s)} for s in self],
+        }
+
+    def merge(self, data: Dict[str, Any]) -> int:
+        """Add the sets in ``data`` (as written by ``to_dict``); returns how many were new."""
+        before = len(self)
+        for entry in data.get("sets", []):
+            self.add(entry["name"], entry["levels"], save=False)
+        return len(self) - before
+
+    def load(self, path: Optional[str] = None) -> None:
+        """Merge sets from a JSON file; a missing file is not an error."""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as fh:
+            self.merge(json.load(fh))
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the library to ``path`` (default: the library's own path) atomically."""
+        path = path or self.path
+        if not path:
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self.to_dict(), fh, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    async def load_browser(self) -> int:
+        """Merge the sets saved in this browser; returns how many were new (0 outside Pyodide)."""
+        if not browserstore.IN_BROWSER:
+            return 0
+        try:
+            text = await browserstore.get(BROWSER_KEY)
+            return self.merge(json.loads(text)) if text else 0
+        except Exception as e:  # storage may be disabled (private browsing); JS errors aren't OSError
+            print(f"saved level sets unavailable: {e}", file=sys.stderr)
+            return 0
+
+    async def save_browser(self) -> None:
+        """Keep the library in this browser's IndexedDB (no-op outside Pyodide); raises OSError."""
+        if not browserstore.IN_BROWSER:
+            return
+        try:
+            await browserstore.put(BROWSER_KEY, json.dumps(self.to_dict(), ensure_ascii=False))
+        except Exception as e:
+            raise OSError(f"the browser did not store it ({e})") from e
+
+
+def default_library(path: Optional[str] = None) -> LevelSetLibrary:
+    """Library with the built-in sets plus any saved in ``path``."""
+    library = LevelSetLibrary(path)
+    for name, levels in DEFAULT_LEVEL_SETS:
+        library.add(name, levels, save=False)
+    library.load()
+    return library
+
+
+def library_from_env() -> LevelSetLibrary:
+    return default_library(os.environ.get(LEVEL_SETS_ENV) or None)
+
+
+def intern_levels(records: Iterable[Dict[str, Any]], library: LevelSetLibrary) -> List[Dict[str, Any]]:
+    """Bind every record to a shared set, adding unnamed sets for repeated lists.
+
+    Level lists used by more than one record become library sets named after
+    their first level names; one-off lists are left as they are.
+    """
+    records = list(records)
+    keys = [level_set_id(var_data.get("levels") or []) for var_data in records]
+    counts: Dict[str, int] = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    for key, var_data in zip(keys, records):
+        levels = var_data.get("levels") or []
+        if counts[key] > 1 and key not in library and all(level and level.strip() == level for level in levels):
+            library.add(" / ".join(levels[:3]) + (" / ..." if len(levels) > 3 else ""), levels, save=False)
+        library.bind(var_data)
+    return records
@@ -0,0 +1,228 @@
+"""Timing and counter hooks around the generation path.
+
+``generate_sas_for_variable``, ``generate_sas_code``, ``validate_records``
+and ``dictionary.check_records`` are wrapped with ``METRICS.timed``. While
+metrics are disabled (the default) the wrapper is a single attribute check
+before calling through. When enabled, every call records its latency plus
+the rows (SAS blocks, validation errors or checked variables) it produced;
+``generate_sas_code`` also records the bytes of the finished program.
+Programs are timed as a whole: the variables rendered inside
+``generate_sas_code`` and helpers such as ``compute_ids`` are not timed on
+their own, which would cost more than the rendering they measure.
+
+Set ``CODELOOKUP_METRICS`` to a file path to enable metrics in either app; the
+file is written when the process exits. Paths ending in ``.prom`` or ``.txt``
+get the Prometheus text exposition format (latencies as a histogram),
+anything else gets JSON (with p50/p95/p99 latencies).
+"""
+import atexit
+import json
+import os
+import random
+import tempfile
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+METRICS_ENV = "CODELOOKUP_METRICS"
+PROMETHEUS_SUFFIXES = (".prom", ".txt")
+PROMETHEUS_PREFIX = "codelookup"
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# Latency samples kept per series for percentiles (reservoir sampling)
+RESERVOIR_SIZE = 4096
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _label(value: str) -> str:
+    # Prometheus label values escape backslash, double quote and newline
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Series:
+    """Counters and latency distribution for one instrumented function."""
+
+    __slots__ = ("calls", "seconds", "max_seconds", "rows", "bytes", "buckets", "samples", "_rng")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+        self.samples: List[float] = []
+        self._rng = random.Random(0)
+
+    def observe(self, seconds: float, rows: int = 0, nbytes: int = 0) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.rows += rows
+        self.bytes += nbytes
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(seconds)
+        else:
+            i = self._rng.randrange(self.calls)
+            if i < RESERVOIR_SIZE:
+                self.samples[i] = seconds
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "seconds_total": self.seconds,
+            "seconds_mean": self.seconds / self.calls if self.calls else 0.0,
+            "seconds_p50": self.percentile(50),
+            "seconds_p95": self.percentile(95),
+            "seconds_p99": self.percentile(99),
+            "seconds_max": self.max_seconds,
+            "rows_total": self.rows,
+            "bytes_total": self.bytes,
+        }
+
+
+class Metrics:
+    """Registry of Series keyed by function name."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.series: Dict[str, Series] = {}
+
+    def reset(self) -> None:
+        self.series.clear()
+
+    def observe(self, name: str, seconds: float, rows: int = 0, nbytes: int = 0) -> None:
+        series = self.series.get(name)
+        if series is None:
+            series = self.series[name] = Series()
+        series.observe(seconds, rows, nbytes)
+
+    def timed(
+        self,
+        name: str,
+        rows: Optional[Callable[[Any], int]] = None,
+        nbytes: Optional[Callable[[Any], int]] = None,
+    ) -> Callable[[F], F]:
+        """Decorator recording calls to ``name``.
+
+        ``rows`` and ``nbytes`` compute counts from the return value and are
+        only called while metrics are enabled.
+        """
+        def decorate(fn: F) -> F:
+            @wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                result = fn(*args, **kwargs)
+                elapsed = time.perf_counter() - start
+                self.observe(
+                    name,
+                    elapsed,
+                    rows(result) if rows else 0,
+                    nbytes(result) if nbytes else 0,
+                )
+                return result
+            return wrapper  # type: ignore[return-value]
+        return decorate
+
+    # === Export ===
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": time.time(),
+            "metrics": {name: s.summary() for name, s in sorted(self.series.items())},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2) + "\n"
+
+    def to_prometheus(self) -> str:
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {p}_calls_total Calls to each instrumented function.",
+            f"# TYPE {p}_calls_total counter",
+        ]
+        items = sorted(self.series.items())
+        for name, s in items:
+            lines.append(f'{p}_calls_total{{function="{_label(name)}"}} {s.calls}')
+        lines += [
+            f"# HELP {p}_rows_total SAS blocks (or validation errors) produced.",
+            f"# TYPE {p}_rows_total counter",
+        ]
+        for name, s in items:
+            lines.append(f'{p}_rows_total{{function="{_label(name)}"}} {s.rows}')
+        lines += [
+            f"# HELP {p}_output_bytes_total UTF-8 bytes of SAS code produced.",
+            f"# TYPE {p}_output_bytes_total counter",
+        ]
+        for name, s in items:
+            lines.append(f'{p}_output_bytes_total{{function="{_label(name)}"}} {s.bytes}')
+        lines += [
+            f"# HELP {p}_duration_seconds Latency of each instrumented function.",
+            f"# TYPE {p}_duration_seconds histogram",
+        ]
+        for name, s in items:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (None,), s.buckets):
+                cumulative += count
+                le = "+Inf" if bound is None else repr(bound)
+                lines.append(f'{p}_duration_seconds_bucket{{function="{_label(name)}",le="{le}"}} {cumulative}')
+            lines.append(f'{p}_duration_seconds_sum{{function="{_label(name)}"}} {s.seconds!r}')
+            lines.append(f'{p}_duration_seconds_count{{function="{_label(name)}"}} {s.calls}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Write metrics to ``path`` atomically; the extension picks the format."""
+        text = self.to_prometheus() if path.endswith(PROMETHEUS_SUFFIXES) else self.to_json()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(text)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+# Process-wide registry used by the sasgen hooks
+METRICS = Metrics()
+
+
+def count_blocks(parts: List[str]) -> int:
+    """SAS blocks in a parts list (each block is followed by a "" separator)."""
+    return len(parts) // 2
+
+
+def text_bytes(text: str) -> int:
+    # isascii() is a flag check, so ASCII programs aren't encoded just to be measured
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def metrics_from_env() -> Optional[str]:
+    """Enable METRICS if $CODELOOKUP_METRICS is set and dump there at exit.
+
+    Returns the output path, or None when metrics stay disabled.
+    """
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return None
+    if METRICS.enabled:
+        return path  # already enabled by another entry point in this process
+    METRICS.enabled = True
+    atexit.register(METRICS.dump, path)
+    return path
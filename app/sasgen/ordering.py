@@ -0,0 +1,122 @@
+"""Indicator_SortOrder numbering.
+
+Every variable is numbered 1, 2, ... within its group (topic id, subtopic id)
+in queue order; Topic_SortOrder, SubTopic_SortOrder and SortOrder come
+straight from TOPICS order and the level position (see sasgen.core).
+
+``number_in_groups`` numbers a whole batch in one pass. ``OrderIndex`` keeps
+the numbering for a queue that changes one variable at a time: appending a
+variable numbers only that variable, removing one renumbers only the later
+variables of its group, and swapping two renumbers only the variables queued
+between them. Each operation returns just the
+``{key: new order}`` entries that changed, so callers re-render only those.
+
+This module has no sasgen imports; callers pass the group key (see
+``sasgen.core.order_group``).
+"""
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+
+def number_in_groups(groups: Iterable[Hashable]) -> List[int]:
+    """1-based position of each item within its group, in input order."""
+    counters: Dict[Hashable, int] = {}
+    orders: List[int] = []
+    for group in groups:
+        n = counters[group] = counters.get(group, 0) + 1
+        orders.append(n)
+    return orders
+
+
+class OrderIndex:
+    """Incrementally maintained per-group numbering of a queue."""
+
+    def __init__(self) -> None:
+        self._seq: Dict[Hashable, int] = {}  # key -> queue sequence number
+        self._group: Dict[Hashable, Hashable] = {}
+        self._members: Dict[Hashable, List[Tuple[int, Hashable]]] = {}  # group -> sorted (seq, key)
+        self._next_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._seq)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._seq
+
+    def order(self, key: Hashable) -> int:
+        members = self._members[self._group[key]]
+        return bisect_left(members, (self._seq[key],)) + 1
+
+    def orders(self) -> Dict[Hashable, int]:
+        return {
+            key: n
+            for members in self._members.values()
+            for n, (_, key) in enumerate(members, start=1)
+        }
+
+    def _renumber_from(self, group: Hashable, start: int) -> Dict[Hashable, int]:
+        members = self._members.get(group, [])
+        return {key: n for n, (_, key) in enumerate(members[start:], start=start + 1)}
+
+    def append(self, key: Hashable, group: Hashable) -> Dict[Hashable, int]:
+        """Add ``key`` at the end of the queue."""
+        if key in self._seq:
+            raise KeyError(f"{key!r} is already in the index")
+        self._next_seq += 1
+        self._seq[key] = self._next_seq
+        self._group[key] = group
+        members = self._members.setdefault(group, [])
+        members.append((self._next_seq, key))
+        return {key: len(members)}
+
+    def remove(self, key: Hashable) -> Dict[Hashable, int]:
+        """Drop ``key``; later members of its group move up by one."""
+        seq = self._seq.pop(key)
+        group = self._group.pop(key)
+        members = self._members[group]
+        i = bisect_left(members, (seq,))
+        del members[i]
+        if not members:
+            del self._members[group]
+        return self._renumber_from(group, i)
+
+    def regroup(self, key: Hashable, group: Hashable) -> Dict[Hashable, int]:
+        """Move ``key`` to another group, keeping its queue position."""
+        old = self._group[key]
+        if old == group:
+            return {}
+        seq = self._seq[key]
+        changed = self.remove(key)
+        self._seq[key] = seq
+        self._group[key] = group
+        members = self._members.setdefault(group, [])
+        insort(members, (seq, key))
+        changed.update(self._renumber_from(group, bisect_left(members, (seq,))))
+        return changed
+
+    def swap(self, a: Hashable, b: Hashable) -> Dict[Hashable, int]:
+        """Exchange the queue positions of ``a`` and ``b`` (e.g. Move Up/Down)."""
+        seq_a, seq_b = self._seq[a], self._seq[b]
+        group_a, group_b = self._group[a], self._group[b]
+        self._seq[a], self._seq[b] = seq_b, seq_a
+        if group_a == group_b:
+            members = self._members[group_a]
+            i, j = bisect_left(members, (seq_a,)), bisect_left(members, (seq_b,))
+            members[i], members[j] = (seq_a, b), (seq_b, a)
+            return {a: j + 1, b: i + 1}
+        # Each key moves within its own group past the members queued between
+        # the two positions; only that range is renumbered.
+        low, high = min(seq_a, seq_b), max(seq_a, seq_b)
+        changed: Dict[Hashable, int] = {}
+        for key, group, old_seq, new_seq in ((a, group_a, seq_a, seq_b), (b, group_b, seq_b, seq_a)):
+            members = self._members[group]
+            del members[bisect_left(members, (old_seq,))]
+            insort(members, (new_seq, key))
+            start, stop = bisect_left(members, (low,)), bisect_left(members, (high + 1,))
+            changed.update({k: n for n, (_, k) in enumerate(members[start:stop], start=start + 1)})
+        return changed
+
+    def clear(self) -> None:
+        self._seq.clear()
+        self._group.clear()
+        self._members.clear()
@@ -0,0 +1,80 @@
+"""The queue behind the Shiny app's per-item edit, move and delete.
+
+``VariableQueue`` keeps the queued records in queue order, each under a
+stable item id, and numbers Indicator_SortOrder with an ``OrderIndex``.
+``update``, ``remove`` and ``move`` return the ids of the records they
+renumbered (besides the one updated), so the app only refreshes those items'
+outputs. Records are replaced, never changed in place, so a caller holding an
+old record keeps seeing the old values.
+"""
+import itertools
+from typing import Any, Dict, Iterator, List
+
+from .core import order_group
+from .ordering import OrderIndex
+
+
+class VariableQueue:
+    """Queued records by item id, in queue order."""
+
+    def __init__(self) -> None:
+        self.order: List[int] = []
+        self.records: Dict[int, Dict[str, Any]] = {}
+        self.index = OrderIndex()
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self.records
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.records[item_id] for item_id in self.order)
+
+    def add(self, var_data: Dict[str, Any]) -> int:
+        """Queue a copy of ``var_data`` at the end and return its item id."""
+        item_id = next(self._ids)
+        n = self.index.append(item_id, order_group(var_data))[item_id]
+        self.records[item_id] = dict(var_data, indicator_sort=n)
+        self.order.append(item_id)
+        return item_id
+
+    def update(self, item_id: int, var_data: Dict[str, Any]) -> List[int]:
+        """Replace a record in place in the queue; its topic or subtopic may change."""
+        changed = self.index.regroup(item_id, order_group(var_data))
+        n = changed.pop(item_id, None) or self.index.order(item_id)
+        self.records[item_id] = dict(var_data, indicator_sort=n)
+        return self._renumber(changed)
+
+    def remove(self, item_id: int) -> List[int]:
+        del self.records[item_id]
+        self.order.remove(item_id)
+        return self._renumber(self.index.remove(item_id))
+
+    def move(self, item_id: int, offset: int) -> List[int]:
+        """Swap a record with the one ``offset`` places later (-1 is Move Up).
+
+        Moves past either end of the queue are ignored.
+        """
+        pos = self.order.index(item_id)
+        other = pos + offset
+        if offset == 0 or not 0 <= other < len(self.order):
+            return []
+        other_id = self.order[other]
+        self.order[pos], self.order[other] = other_id, item_id
+        return self._renumber(self.index.swap(item_id, other_id))
+
+    def clear(self) -> None:
+        self.order.clear()
+        self.records.clear()
+        self.index.clear()
+
+    def _renumber(self, changed: Dict[Any, int]) -> List[int]:
+        renumbered = []
+        for item_id, n in changed.items():
+            record = self.records[item_id]
+            if record.get("indicator_sort") != n:
+                self.records[item_id] = dict(record, indicator_sort=n)
+                renumbered.append(item_id)
+        return renumbered
@@ -0,0 +1,443 @@
+"""Variable metadata from SAS datasets, read from the file headers only.
+
+``read_header`` returns the column names, labels and formats of a .sas7bdat
+or SAS XPORT (.xpt) file. SAS7BDAT files are read page by page only until the
+column metadata is complete, which is before the first data page, and XPORT
+files only up to the observation header, so a multi-GB dataset is onboarded
+in milliseconds. Everything here is pure Python and runs under Pyodide.
+
+Value labels (the variable's levels) come from format definitions, either a
+PROC FORMAT program (.sas) or a format catalog exported as a dataset with
+``proc format library=... cntlout=fmts;`` and saved as .xpt or .sas7bdat. The
+.sas7bcat catalog format itself is undocumented and is not read. Reading a
+CNTLOUT .sas7bdat needs pandas (its data pages may be compressed); the other
+sources don't.
+
+``import_files`` turns every column of the given datasets into a record like
+the ones the apps queue: ``var_code``, ``description`` and ``levels`` come
+from the column name, label and format, everything else from a base record
+(the apps pass the current form). ``var_name`` is left blank to fill in.
+"""
+import os
+import re
+import struct
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+DATASET_SUFFIXES = (".sas7bdat", ".xpt", ".xport")
+FORMAT_SOURCE_SUFFIXES = (".sas",)
+CATALOG_SUFFIX = ".sas7bcat"
+# Columns that identify a PROC FORMAT CNTLOUT= dataset
+CNTLOUT_COLUMNS = ("FMTNAME", "START", "LABEL")
+
+
+class ColumnInfo(NamedTuple):
+    name: str
+    label: str
+    format: str  # as stored, e.g. "YESNO" or "BEST12."; "" when none
+    numeric: bool
+    length: int
+
+
+class DatasetInfo(NamedTuple):
+    path: str
+    name: str  # member name from the header
+    columns: List[ColumnInfo]
+    rows: Optional[int]  # from the header, when the format records it
+
+
+class ImportResult(NamedTuple):
+    records: List[Dict[str, Any]]
+    datasets: List[DatasetInfo]
+    formats: int  # value-label formats loaded
+    seconds: float
+
+    def describe(self) -> str:
+        with_levels = sum(1 for r in self.records if r["levels"])
+        return (
+            f"{len(self.records)} variables from {len(self.datasets)} dataset(s), "
+            f"{with_levels} with value labels ({self.formats} formats) in {self.seconds * 1000:.1f} ms"
+        )
+
+
+def format_key(fmt: str) -> str:
+    """Normalize a format reference for lookup: ``"$sexf2."`` -> ``"$SEXF"``."""
+    return re.sub(r"[\d.]+$", "", fmt.strip().upper())
+
+
+# === SAS7BDAT ===
+
+SAS7BDAT_MAGIC = (
+    b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xc2\xea\x81\x60"
+    b"\xb3\x14\x11\xcf\xbd\x92\x08\x00\x09\xc7\x31\x8c\x18\x1f\x10\x11"
+)
+# Header byte 70; anything else is decoded as latin-1
+SAS_ENCODINGS = {20: "utf-8", 28: "ascii", 29: "latin-1", 40: "iso8859-15", 61: "cp1251", 62: "cp1252"}
+
+_PAGE_META, _PAGE_DATA, _PAGE_MIX, _PAGE_AMD, _PAGE_META2 = 0x0000, 0x0100, 0x0200, 0x0400, 0x4000
+_TRUNCATED_SUBHEADER = 1
+
+# Subheader signatures (32-bit/64-bit, either byte order) by kind
+_SIGNATURES = {
+    "rowsize": (b"\xf7\xf7\xf7\xf7", b"\x00\x00\x00\x00\xf7\xf7\xf7\xf7",
+                b"\xf7\xf7\xf7\xf7\x00\x00\x00\x00", b"\xf7\xf7\xf7\xf7\xff\xff\xfb\xfe"),
+    "colsize": (b"\xf6\xf6\xf6\xf6", b"\x00\x00\x00\x00\xf6\xf6\xf6\xf6",
+                b"\xf6\xf6\xf6\xf6\x00\x00\x00\x00", b"\xf6\xf6\xf6\xf6\xff\xff\xfb\xfe"),
+    "text": (b"\xfd\xff\xff\xff", b"\xff\xff\xff\xfd",
+             b"\xfd\xff\xff\xff\xff\xff\xff\xff", b"\xff\xff\xff\xff\xff\xff\xff\xfd"),
+    "name": (b"\xff\xff\xff\xff", b"\xff\xff\xff\xff\xff\xff\xff\xff"),
+    "attributes": (b"\xfc\xff\xff\xff", b"\xff\xff\xff\xfc",
+                   b"\xfc\xff\xff\xff\xff\xff\xff\xff", b"\xff\xff\xff\xff\xff\xff\xff\xfc"),
+    "format": (b"\xfe\xfb\xff\xff", b"\xff\xff\xfb\xfe",
+               b"\xfe\xfb\xff\xff\xff\xff\xff\xff", b"\xff\xff\xff\xff\xff\xff\xfb\xfe"),
+}
+_SIGNATURE_KINDS = {sig: kind for kind, sigs in _SIGNATURES.items() for sig in sigs}
+
+
+class _Sas7bdatMeta:
+    """Column metadata collected from the subheaders of the metadata pages."""
+
+    def __init__(self, u64: bool, byte_order: str):
+        self.int_len = 8 if u64 else 4
+        self.bit_offset = 32 if u64 else 16
+        self.pointer_len = 24 if u64 else 12
+        self.byte_order = byte_order
+        self.row_count: Optional[int] = None
+        self.column_count: Optional[int] = None
+        self.texts: List[bytes] = []
+        self.names: List[bytes] = []
+        self.lengths: List[int] = []
+        self.numeric: List[bool] = []
+        self.formats: List[Tuple[bytes, bytes]] = []  # (format, label)
+        self.saw_data = False  # compressed files keep rows in subheaders
+
+    def uint(self, page: bytes, offset: int, width: int) -> int:
+        code = {1: "B", 2: "H", 4: "I", 8: "Q"}[width]
+        return struct.unpack_from(self.byte_order + code, page, offset)[0]
+
+    @property
+    def complete(self) -> bool:
+        return self.column_count is not None and len(self.formats) >= self.column_count
+
+    def process_page(self, page: bytes) -> int:
+        page_type = self.uint(page, self.bit_offset, 2) & 0xFF00
+        if page_type in (_PAGE_META, _PAGE_META2, _PAGE_AMD, _PAGE_MIX):
+            count = self.uint(page, self.bit_offset + 4, 2)
+            for i in range(count):
+                pointer = self.bit_offset + 8 + i * self.pointer_len
+                offset = self.uint(page, pointer, self.int_len)
+                length = self.uint(page, pointer + self.int_len, self.int_len)
+                compression = page[pointer + 2 * self.int_len]
+                if length == 0 or compression == _TRUNCATED_SUBHEADER:
+                    continue
+                kind = _SIGNATURE_KINDS.get(page[offset:offset + self.int_len])
+                if kind is None:
+                    self.saw_data = True  # a compressed row
+                else:
+                    getattr(self, "_" + kind)(page, offset, length)
+        return page_type
+
+    def _rowsize(self, page: bytes, offset: int, length: int) -> None:
+        self.row_count = self.uint(page, offset + 6 * self.int_len, self.int_len)
+
+    def _colsize(self, page: bytes, offset: int, length: int) -> None:
+        self.column_count = self.uint(page, offset + self.int_len, self.int_len)
+
+    def _text(self, page: bytes, offset: int, length: int) -> None:
+        size = self.uint(page, offset + self.int_len, 2)
+        self.texts.append(page[offset + self.int_len:offset + self.int_len + size])
+
+    def _text_slice(self, page: bytes, at: int) -> bytes:
+        index = min(self.uint(page, at, 2), len(self.texts) - 1)
+        start = self.uint(page, at + 2, 2)
+        return self.texts[index][start:start + self.uint(page, at + 4, 2)]
+
+    def _name(self, page: bytes, offset: int, length: int) -> None:
+        for i in range((length - 2 * self.int_len - 12) // 8):
+            self.names.append(self._text_slice(page, offset + self.int_len + 8 * (i + 1)))
+
+    def _attributes(self, page: bytes, offset: int, length: int) -> None:
+        step = self.int_len + 8
+        for i in range((length - 2 * self.int_len - 12) // step):
+            base = offset + 2 * self.int_len + i * step
+            self.lengths.append(self.uint(page, base + 8, 4))
+            self.numeric.append(page[base + 14] == 1)
+
+    def _format(self, page: bytes, offset: int, length: int) -> None:
+        base = offset + 3 * self.int_len
+        self.formats.append((self._text_slice(page, base + 22), self._text_slice(page, base + 28)))
+
+
+def read_sas7bdat_header(path: str, encoding: Optional[str] = None) -> DatasetInfo:
+    """Column metadata of a .sas7bdat file; no data page is read.
+
+    ``encoding`` overrides the one recorded in the file. Raises ValueError for
+    files that aren't SAS7BDAT or end inside the metadata.
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(288)
+        if len(head) < 288 or head[:32] != SAS7BDAT_MAGIC:
+            raise ValueError(f"{os.path.basename(path)}: not a SAS7BDAT file")
+        u64 = head[32:33] == b"3"
+        align = 4 if head[35:36] == b"3" else 0
+        byte_order = "<" if head[37:38] == b"\x01" else ">"
+        encoding = encoding or SAS_ENCODINGS.get(head[70], "latin-1")
+        header_length, page_length = struct.unpack_from(byte_order + "II", head, 196 + align)
+        meta = _Sas7bdatMeta(u64, byte_order)
+        fh.seek(header_length)
+        while not meta.complete:
+            page = fh.read(page_length)
+            if len(page) < page_length:
+                break
+            page_type = meta.process_page(page)
+            if page_type in (_PAGE_DATA, _PAGE_MIX) or meta.saw_data:
+                break  # rows start here; metadata always comes first
+
+    if meta.column_count is None or len(meta.formats) < meta.column_count:
+        raise ValueError(f"{os.path.basename(path)}: column metadata is incomplete")
+
+    def text(raw: bytes) -> str:
+        return raw.decode(encoding, errors="replace").strip("\x00 ")
+
+    columns = [
+        ColumnInfo(text(name), text(label), text(fmt), numeric, length)
+        for name, (fmt, label), numeric, length in zip(meta.names, meta.formats, meta.numeric, meta.lengths)
+    ]
+    return DatasetInfo(path, text(head[92:156]), columns, meta.row_count)
+
+
+# === XPORT ===
+
+XPORT_LIBRARY_HEADER = b"HEADER RECORD*******LIBRARY HEADER RECORD!!!!!!!000000000000000000000000000000  "
+_XPORT_MEMBER_HEADER = b"HEADER RECORD*******MEMBER  HEADER RECORD!!!!!!!"
+_XPORT_OBS_HEADER = b"HEADER RECORD*******OBS     HEADER RECORD!!!!!!!"
+_NAMESTR = struct.Struct(">hhhh8s40s8shhh2s8shhl52s")
+
+
+class _XportLayout(NamedTuple):
+    info: DatasetInfo
+    positions: List[int]  # byte offset of each column within a row
+    record_start: int
+    record_length: int
+
+
+def _read_xport_layout(path: str, encoding: str) -> _XportLayout:
+    name = os.path.basename(path)
+    with open(path, "rb") as fh:
+        line = fh.read(80)
+        if line.startswith(b"HEADER RECORD*******LIBV8"):
+            raise ValueError(f"{name}: XPORT version 8 files are not supported; save with the XPORT engine (V5)")
+        if line != XPORT_LIBRARY_HEADER:
+            raise ValueError(f"{name}: not a SAS XPORT file")
+        fh.read(160)  # library creation info
+        member = fh.read(80)
+        fh.read(80)  # descriptor header
+        if not member.startswith(_XPORT_MEMBER_HEADER):
+            raise ValueError(f"{name}: XPORT member header not found")
+        namestr_length = int(member[75:78])
+        member_name = fh.read(80)[8:16].decode(encoding).strip()
+        fh.read(80)  # member dates, label and type
+        count = int(fh.read(80)[54:58])
+        size = namestr_length * count
+        data = fh.read(size + (-size) % 80)
+        columns: List[ColumnInfo] = []
+        positions: List[int] = []
+        record_length = 0
+        for i in range(count):
+            raw = data[i * namestr_length:(i + 1) * namestr_length].ljust(_NAMESTR.size, b" ")
+            ntype, _, length, _, cname, label, fmt, fmt_width, fmt_decimals, _, _, _, _, _, position, _ = (
+                _NAMESTR.unpack(raw)
+            )
+            fmt_text = fmt.decode(encoding).strip()
+            if fmt_text and (fmt_width or fmt_decimals):
+                fmt_text += f"{fmt_width or ''}.{fmt_decimals or ''}"
+            columns.append(ColumnInfo(
+                cname.decode(encoding).strip(), label.decode(encoding).strip(), fmt_text, ntype == 1, length
+            ))
+            positions.append(position)
+            record_length += length
+        if not fh.read(80).startswith(_XPORT_OBS_HEADER):
+            raise ValueError(f"{name}: XPORT observation header not found")
+        record_start = fh.tell()
+        total = os.fstat(fh.fileno()).st_size
+    # Rows are padded to a multiple of 80 bytes at the end; blank rows are not counted
+    rows = (total - record_start) // record_length if record_length else 0
+    return _XportLayout(DatasetInfo(path, member_name, columns, rows), positions, record_start, record_length)
+
+
+def read_xport_header(path: str, encoding: str = "latin-1") -> DatasetInfo:
+    """Column metadata of the first member of a SAS XPORT (V5) file.
+
+    ``rows`` is an upper bound: the last 80-byte record may hold padding.
+    """
+    return _read_xport_layout(path, encoding).info
+
+
+def _xport_char_rows(path: str, columns: Sequence[str], encoding: str = "latin-1") -> Iterator[Dict[str, str]]:
+    """Character ``columns`` of every row of an XPORT file (numeric columns aren't decoded)."""
+    layout = _read_xport_layout(path, encoding)
+    wanted = [
+        (c.name.upper(), pos, c.length)
+        for c, pos in zip(layout.info.columns, layout.positions)
+        if not c.numeric and c.name.upper() in columns
+    ]
+    with open(path, "rb") as fh:
+        fh.seek(layout.record_start)
+        while True:
+            row = fh.read(layout.record_length)
+            if len(row) < layout.record_length or not row.strip(b" "):
+                break  # end of file or trailing padding
+            yield {name: row[pos:pos + length].decode(encoding).rstrip() for name, pos, length in wanted}
+
+
+def read_header(path: str, encoding: Optional[str] = None, name: Optional[str] = None) -> DatasetInfo:
+    """Column metadata of a .sas7bdat or .xpt file, picked by the extension of ``name or path``."""
+    if (name or path).lower().endswith(".sas7bdat"):
+        return read_sas7bdat_header(path, encoding)
+    return read_xport_header(path, encoding or "latin-1")
+
+
+# === Value labels ===
+
+_SAS_TOKEN = re.compile(r"""/\*.*?\*/|'(?:[^']|'')*'|"(?:[^"]|"")*"|;|[^;'"/]+|/""", re.S)
+_VALUE_TOKEN = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|=|\(|\)|[^\s='"()]+""")
+
+
+def _sas_statements(text: str) -> Iterator[str]:
+    """Statements of a SAS program with /* */ and * ...; comments removed."""
+    current: List[str] = []
+    for token in _SAS_TOKEN.findall(text):
+        if token.startswith("/*"):
+            current.append(" ")
+        elif token == ";":
+            statement = "".join(current).strip()
+            if statement and not statement.startswith("*"):
+                yield statement
+            current = []
+        else:
+            current.append(token)
+
+
+def _unquote(token: str) -> str:
+    if token[:1] in ("'", '"') and token[-1:] == token[:1]:
+        return token[1:-1].replace(token[0] * 2, token[0])
+    return token
+
+
+def _add_labels(formats: Dict[str, List[str]], key: str, labels: Iterable[str]) -> None:
+    levels = formats.setdefault(key, [])
+    for label in labels:
+        if label and label not in levels:  # ranges that share a label give one level
+            levels.append(label)
+
+
+def parse_format_source(text: str) -> Dict[str, List[str]]:
+    """``{format name: value labels}`` from the VALUE statements of a PROC FORMAT program."""
+    formats: Dict[str, List[str]] = {}
+    for statement in _sas_statements(text):
+        tokens = _VALUE_TOKEN.findall(statement)
+        if len(tokens) < 2 or tokens[0].lower() != "value":
+            continue
+        labels = []
+        depth = 0
+        for i, token in enumerate(tokens[2:], start=2):
+            if token == "(":
+                depth += 1  # format options, e.g. (default=20)
+            elif token == ")":
+                depth -= 1
+            elif token == "=" and depth == 0 and i + 1 < len(tokens):
+                labels.append(_unquote(tokens[i + 1]).strip())
+        _add_labels(formats, format_key(tokens[1]), labels)
+    return formats
+
+
+def _cntlout_formats(rows: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    formats: Dict[str, List[str]] = {}
+    for row in rows:
+        fmt_type = str(row.get("TYPE") or "").strip().upper()
+        if fmt_type not in ("", "N", "C"):
+            continue  # informats and pictures
+        name = format_key(str(row.get("FMTNAME") or ""))
+        if fmt_type == "C" and not name.startswith("$"):
+            name = "$" + name
+        _add_labels(formats, name, [str(row.get("LABEL") or "").strip()])
+    return formats
+
+
+def is_cntlout(info: DatasetInfo) -> bool:
+    names = {c.name.upper() for c in info.columns}
+    return all(c in names for c in CNTLOUT_COLUMNS)
+
+
+def read_cntlout(info: DatasetInfo) -> Dict[str, List[str]]:
+    """Value labels from a PROC FORMAT CNTLOUT= dataset (reads its rows).
+
+    Raises ImportError for a .sas7bdat when pandas isn't installed.
+    """
+    if info.path.lower().endswith(".sas7bdat"):
+        import pandas as pd
+
+        frame = pd.read_sas(info.path, format="sas7bdat", encoding="infer")
+        frame.columns = [str(c).upper() for c in frame.columns]
+        return _cntlout_formats(frame.fillna("").to_dict("records"))
+    return _cntlout_formats(_xport_char_rows(info.path, ("FMTNAME", "TYPE", "START", "LABEL")))
+
+
+# === Records ===
+
+def column_records(
+    info: DatasetInfo, formats: Dict[str, List[str]], base: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """One record per column: ``base`` plus the column's code, label and levels."""
+    records = []
+    for column in info.columns:
+        record = dict(base)
+        record.pop("level_set", None)
+        record.update(
+            var_code=column.name,
+            var_name="",
+            description=column.label,
+            levels=list(formats.get(format_key(column.format), ())) if column.format else [],
+        )
+        records.append(record)
+    return records
+
+
+def import_files(
+    paths: Sequence[str],
+    base: Dict[str, Any],
+    names: Optional[Sequence[str]] = None,
+    encoding: Optional[str] = None,
+) -> ImportResult:
+    """Records for every column of the datasets in ``paths``.
+
+    ``paths`` may mix datasets (.sas7bdat/.xpt), PROC FORMAT programs (.sas)
+    and CNTLOUT datasets, which are recognised by their columns; ``names``
+    gives the original file names when ``paths`` are upload temp files.
+    Raises ValueError for unsupported or unreadable files.
+    """
+    start = time.perf_counter()
+    formats: Dict[str, List[str]] = {}
+    datasets: List[DatasetInfo] = []
+    for path, name in zip(paths, names or paths):
+        suffix = os.path.splitext(name)[1].lower()
+        if suffix in FORMAT_SOURCE_SUFFIXES:
+            with open(path, encoding="utf-8", errors="replace") as fh:
+                for key, labels in parse_format_source(fh.read()).items():
+                    _add_labels(formats, key, labels)
+        elif suffix == CATALOG_SUFFIX:
+            raise ValueError(
+                f"{name}: format catalogs can't be read directly; export them with "
+                "proc format library=... cntlout=fmts; and save fmts as .xpt or .sas7bdat"
+            )
+        elif suffix in DATASET_SUFFIXES:
+            info = read_header(path, encoding, name)
+            if is_cntlout(info):
+                for key, labels in read_cntlout(info).items():
+                    _add_labels(formats, key, labels)
+            else:
+                datasets.append(info)
+        else:
+            raise ValueError(f"{name}: expected .sas7bdat, .xpt or .sas (PROC FORMAT) files")
+    records = [record for info in datasets for record in column_records(info, formats, base)]
+    return ImportResult(records, datasets, len(formats), time.perf_counter() - start)
@@ -0,0 +1,130 @@
+"""Per-session queue accounting for serverful (``shiny run``) deployments.
+
+Every Shiny session keeps its own queue. The registry tracks how many
+variables each session holds and roughly how many bytes they take, and
+enforces optional per-session caps so one analyst's import can't exhaust the
+server. Caps are read from ``CODELOOKUP_MAX_QUEUE`` (variables) and
+``CODELOOKUP_MAX_SESSION_BYTES``; 0 or unset means unlimited.
+"""
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+MAX_QUEUE_ENV = "CODELOOKUP_MAX_QUEUE"
+MAX_BYTES_ENV = "CODELOOKUP_MAX_SESSION_BYTES"
+
+
+def record_bytes(var_data: Dict[str, Any]) -> int:
+    """Approximate memory held by one record (dict, values and level strings).
+
+    Keys are shared interned strings and are not counted; nor are the level
+    names of a shared LevelSet (a tuple), only the reference to it.
+    """
+    total = sys.getsizeof(var_data)
+    for value in var_data.values():
+        if isinstance(value, tuple):
+            continue
+        total += sys.getsizeof(value)
+        if isinstance(value, list):
+            total += sum(sys.getsizeof(v) for v in value)
+    return total
+
+
+def format_bytes(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    if n < 1024 * 1024:
+        return f"{n / 1024:.1f} KB"
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+class SessionUsage:
+    __slots__ = ("session_id", "items", "bytes")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.items = 0
+        self.bytes = 0
+
+    def add(self, nbytes: int) -> None:
+        self.items += 1
+        self.bytes += nbytes
+
+    def remove(self, nbytes: int) -> None:
+        self.items -= 1
+        self.bytes -= nbytes
+
+    def resize(self, old_bytes: int, new_bytes: int) -> None:
+        self.bytes += new_bytes - old_bytes
+
+    def describe(self) -> str:
+        return f"Queue: {self.items} variable(s), ~{format_bytes(self.bytes)}"
+
+
+class SessionRegistry:
+    """Usage of every live session plus the configured caps."""
+
+    def __init__(self, max_items: int = 0, max_bytes: int = 0):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._sessions: Dict[str, SessionUsage] = {}
+
+    def open(self, session_id: str) -> SessionUsage:
+        usage = self._sessions[session_id] = SessionUsage(session_id)
+        return usage
+
+    def close(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def check_add(self, usage: SessionUsage, nbytes: int) -> Optional[str]:
+        """Warning text if adding ``nbytes`` more would exceed a cap, else None."""
+        if self.max_items and usage.items + 1 > self.max_items:
+            return (
+                f"Queue limit reached: this session already holds {usage.items} variables "
+                f"(limit {self.max_items}). Generate or clear the queue before adding more."
+            )
+        return self._check_bytes(usage, nbytes)
+
+    def check_resize(self, usage: SessionUsage, old_bytes: int, new_bytes: int) -> Optional[str]:
+        """Warning text if replacing a record of ``old_bytes`` with ``new_bytes`` would exceed a cap."""
+        return self._check_bytes(usage, new_bytes - old_bytes)
+
+    def _check_bytes(self, usage: SessionUsage, delta: int) -> Optional[str]:
+        # Shrinking is always allowed, even over a cap that was lowered
+        if self.max_bytes and delta > 0 and usage.bytes + delta > self.max_bytes:
+            return (
+                f"Queue memory limit reached: ~{format_bytes(usage.bytes)} in use "
+                f"(limit {format_bytes(self.max_bytes)}). Generate or clear the queue before adding more."
+            )
+        return None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {"session": u.session_id, "items": u.items, "bytes": u.bytes}
+            for u in self._sessions.values()
+        ]
+
+    def totals(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "items": sum(u.items for u in self._sessions.values()),
+            "bytes": sum(u.bytes for u in self._sessions.values()),
+        }
+
+
+def _cap_from_env(name: str) -> int:
+    raw = (os.environ.get(name) or "").strip()
+    if not raw:
+        return 0
+    try:
+        value = int(raw)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise ValueError(f"{name} must be a whole number of 0 or more (0 = unlimited), got {raw!r}")
+    return value
+
+
+def registry_from_env() -> SessionRegistry:
+    """Registry with the caps in $CODELOOKUP_MAX_QUEUE and $CODELOOKUP_MAX_SESSION_BYTES."""
+    return SessionRegistry(max_items=_cap_from_env(MAX_QUEUE_ENV), max_bytes=_cap_from_env(MAX_BYTES_ENV))
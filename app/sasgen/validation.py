@@ -0,0 +1,180 @@
+"""Bulk validation of variable records.
+
+The interactive checks in the apps stop at the first problem in one form. A
+``RuleSet`` compiles the same checks once (required fields, Indicator
+topic/subtopic consistency, level count and empty level names) and runs them
+over whole batches of records, returning every problem as a flat error table.
+Results are cached per record content, so re-validating a batch after a few
+edits only re-checks the records that changed.
+
+The forms cap a variable at MAX_LEVELS levels, but batches come from
+codebooks and SAS metadata too, where longer value lists are normal. A
+``RuleSet`` therefore only enforces MIN_LEVELS unless it is given
+``max_levels``; pass ``max_levels=MAX_LEVELS`` to apply the form's limit.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .core import SURVEYS, TOPICS
+from .metrics import METRICS
+
+REQUIRED_FIELDS = (
+    ("dataset", "Survey Dataset"),
+    ("var_code", "Variable Code"),
+    ("var_name", "Variable Name"),
+    ("description", "Description"),
+)
+VAR_TYPES = ("Indicator", "Demographic")
+MIN_LEVELS = 2
+MAX_LEVELS = 6  # the interactive forms' limit; batches are not capped by default
+
+# Fields that feed into validation; together with the levels they form the cache key.
+KEY_FIELDS = ("dataset", "var_code", "var_name", "description", "var_type", "topic", "sub_topic")
+
+Issue = Tuple[str, str]  # (field, message)
+Rule = Callable[[Dict[str, Any]], Iterator[Issue]]
+
+
+class ValidationError(NamedTuple):
+    index: int
+    field: str
+    message: str
+
+
+def _text(record: Dict[str, Any], field: str) -> str:
+    return str(record.get(field) or "").strip()
+
+
+class RuleSet:
+    """Compiled validation rules with a bounded per-record result cache."""
+
+    def __init__(
+        self,
+        topics: Dict[str, Any] = TOPICS,
+        surveys: Dict[str, Any] = SURVEYS,
+        min_levels: int = MIN_LEVELS,
+        max_levels: Optional[int] = None,
+        cache_size: int = 100_000,
+    ):
+        self._subtopics = {name: frozenset(t["subtopics"]) for name, t in topics.items()}
+        self._surveys = frozenset(surveys)
+        self.min_levels = min_levels
+        self.max_levels = max_levels
+        self.rules: List[Rule] = [
+            self._check_required,
+            self._check_var_type,
+            self._check_topic,
+            self._check_levels,
+        ]
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, Tuple[Issue, ...]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # === Rules ===
+
+    def _check_required(self, record: Dict[str, Any]) -> Iterator[Issue]:
+        for field, label in REQUIRED_FIELDS:
+            if not _text(record, field):
+                yield field, f"{label} is required"
+        dataset = _text(record, "dataset")
+        if dataset and dataset not in self._surveys:
+            yield "dataset", f"Unknown Survey Dataset '{dataset}'"
+
+    def _check_var_type(self, record: Dict[str, Any]) -> Iterator[Issue]:
+        if _text(record, "var_type") not in VAR_TYPES:
+            yield "var_type", "Variable Type must be Indicator or Demographic"
+
+    def _check_topic(self, record: Dict[str, Any]) -> Iterator[Issue]:
+        if _text(record, "var_type") != "Indicator":
+            return
+        topic = _text(record, "topic")
+        sub_topic = _text(record, "sub_topic")
+        if not topic:
+            yield "topic", "Topic is required for Indicators"
+        elif topic not in self._subtopics:
+            yield "topic", f"Unknown Topic '{topic}'"
+        elif not self._subtopics[topic]:
+            yield "topic", f"Topic '{topic}' has no Sub-Topics"
+        if not sub_topic:
+            yield "sub_topic", "Sub-Topic is required for Indicators"
+        elif topic in self._subtopics and self._subtopics[topic] and sub_topic not in self._subtopics[topic]:
+            yield "sub_topic", f"Sub-Topic '{sub_topic}' does not belong to Topic '{topic}'"
+
+    def _check_levels(self, record: Dict[str, Any]) -> Iterator[Issue]:
+        levels = record.get("levels") or []
+        if self.max_levels is None:
+            if len(levels) < self.min_levels:
+                yield "levels", f"Number of Levels must be at least {self.min_levels} (got {len(levels)})"
+        elif not (self.min_levels <= len(levels) <= self.max_levels):
+            yield "levels", (
+                f"Number of Levels must be {self.min_levels}-{self.max_levels} (got {len(levels)})"
+            )
+        for i, name in enumerate(levels, start=1):
+            if not str(name or "").strip():
+                yield f"levels[{i}]", f"Level {i} Name is required"
+
+    # === Evaluation ===
+
+    @staticmethod
+    def _key(record: Dict[str, Any]) -> Optional[tuple]:
+        try:
+            key = tuple(record.get(f) for f in KEY_FIELDS) + tuple(record.get("levels") or ())
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def check(self, record: Dict[str, Any]) -> Tuple[Issue, ...]:
+        """Return the (field, message) issues for one record, using the cache."""
+        key = self._key(record)
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+        self.misses += 1
+        issues = tuple(issue for rule in self.rules for issue in rule(record))
+        if key is not None:
+            self._cache[key] = issues
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return issues
+
+    def validate(self, records: Iterable[Dict[str, Any]]) -> List[ValidationError]:
+        """Check every record and return all problems as (index, field, message) rows."""
+        errors: List[ValidationError] = []
+        for index, record in enumerate(records):
+            for field, message in self.check(record):
+                errors.append(ValidationError(index, field, message))
+        return errors
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+
+_default_rules: Optional[RuleSet] = None
+
+
+def default_rules() -> RuleSet:
+    """Shared RuleSet for the built-in taxonomy (created on first use)."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = RuleSet()
+    return _default_rules
+
+
+@METRICS.timed("validate_records", rows=len)
+def validate_records(records: Iterable[Dict[str, Any]]) -> List[ValidationError]:
+    """Validate ``records`` with the default rules; see RuleSet.validate."""
+    return default_rules().validate(records)
+
+
+def format_errors(errors: List[ValidationError], limit: int = 50) -> str:
+    """Render an error table as text, one problem per line (1-based record numbers)."""
+    lines = [f"#{e.index + 1} {e.field}: {e.message}" for e in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"... and {len(errors) - limit} more")
+    return "\n".join(lines)
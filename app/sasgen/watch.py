@@ -0,0 +1,295 @@
+"""Incremental regeneration of a SAS program from a codebook CSV.
+
+The codebook is a CSV export with one variable per row and the columns
+dataset, var_code, var_name, description, var_type, topic, sub_topic and
+levels (level names separated by ``|``). Survey fields and taxonomy ids are
+filled in from SURVEYS/TOPICS as in the apps.
+
+``CodebookWatcher.refresh`` fingerprints every row by its raw cells. Only rows
+with a fingerprint it hasn't seen are turned into records and validated, and
+only rows that are new or whose Indicator_SortOrder moved are rendered;
+unchanged rows reuse their rendered text, so the work after a save is
+proportional to the number of edited rows (plus the later rows of their
+topic/subtopic group when rows are inserted or deleted). The output file is then
+rewritten with an atomic swap, so readers never see a half-written program.
+
+``watch`` polls the file's size and mtime (portable, including network drives
+and Pyodide) and refreshes once a change has settled.
+
+    python codelookup.py --watch codebook.csv --output codebook.sas
+    python -m sasgen.watch codebook.csv -o codebook.sas   # from app/, no Tk needed
+"""
+import argparse
+import csv
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .core import SURVEYS, compute_ids, generate_sas_for_variable, order_group
+from .validation import RuleSet, default_rules
+
+CODEBOOK_COLUMNS = ("dataset", "var_code", "var_name", "description", "var_type", "topic", "sub_topic", "levels")
+REQUIRED_COLUMNS = ("dataset", "var_code", "var_name", "description", "var_type", "levels")
+LEVELS_SEP = "|"
+DEFAULT_INTERVAL = 1.0
+
+
+class RefreshStats(NamedTuple):
+    rows: int
+    rendered: int  # rows that were new or changed Indicator_SortOrder
+    removed: int  # fingerprints no longer in the file
+    invalid: int  # rows skipped because they failed validation
+    seconds: float
+    errors: List[str]
+
+    def describe(self) -> str:
+        return (
+            f"{self.rows} rows: {self.rendered} re-rendered, {self.removed} removed, "
+            f"{self.invalid} invalid in {self.seconds * 1000:.1f} ms"
+        )
+
+
+class _Row(NamedTuple):
+    record: Dict[str, Any]
+    group: Tuple[int, int]  # Indicator_SortOrder group, see sasgen.core.order_group
+    errors: Tuple[str, ...]
+
+
+def row_fingerprint(cells: List[str]) -> str:
+    return hashlib.blake2b("\x1f".join(cells).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def row_to_record(row: Dict[str, str]) -> Dict[str, Any]:
+    """Build the same record dict the apps produce from one codebook row."""
+    dataset = (row.get("dataset") or "").strip()
+    survey = SURVEYS.get(dataset, {"full_name": "", "population": "", "tag_suffix": ""})
+    var_type = (row.get("var_type") or "").strip() or "Indicator"
+    topic = (row.get("topic") or "").strip() if var_type == "Indicator" else ""
+    sub_topic = (row.get("sub_topic") or "").strip() if var_type == "Indicator" else ""
+    ids = compute_ids(var_type, topic, sub_topic)
+    levels_text = row.get("levels") or ""
+    return {
+        "dataset": dataset,
+        "dataset_name": survey["full_name"],
+        "population": survey["population"],
+        "tag_suffix": survey["tag_suffix"],
+        "var_code": (row.get("var_code") or "").strip(),
+        "var_name": (row.get("var_name") or "").strip(),
+        "description": (row.get("description") or "").strip(),
+        "var_type": var_type,
+        "topic": topic,
+        "sub_topic": sub_topic,
+        "topic_id": ids["topic_id"],
+        "subtopic_id": ids["subtopic_id"],
+        "levels": [level.strip() for level in levels_text.split(LEVELS_SEP)] if levels_text.strip() else [],
+    }
+
+
+def write_atomic(path: str, chunks: Iterable[bytes]) -> None:
+    """Write ``chunks`` to a temporary file next to ``path`` and swap it in."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".codelookup-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.writelines(chunks)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class CodebookWatcher:
+    """Keeps ``output`` in sync with ``codebook``, re-rendering only changed rows."""
+
+    def __init__(
+        self,
+        codebook: str,
+        output: str,
+        rules: Optional[RuleSet] = None,
+        library: Optional[Any] = None,
+        cache: Optional[Any] = None,
+    ):
+        self.codebook = codebook
+        self.output = output
+        self.rules = rules or default_rules()
+        self.library = library  # optional sasgen.levelsets.LevelSetLibrary
+        self.cache = cache  # optional sasgen.cache.RenderCache
+        self._rows: Dict[str, _Row] = {}
+        # Rendered SAS (UTF-8) by (fingerprint, Indicator_SortOrder)
+        self._blocks: Dict[Tuple[str, int], bytes] = {}
+        self._order: Optional[List[Tuple[str, int]]] = None  # as last written
+
+    def _parse_row(self, row: Dict[str, str]) -> _Row:
+        record = row_to_record(row)
+        if self.library is not None:
+            self.library.bind(record)
+        errors = tuple(f"{e.field}: {e.message}" for e in self.rules.validate([record]))
+        return _Row(record, order_group(record), errors)
+
+    def _render(self, record: Dict[str, Any], indicator_sort: int) -> bytes:
+        text = "\n".join(generate_sas_for_variable(dict(record, indicator_sort=indicator_sort), self.cache))
+        return text.encode("utf-8")
+
+    def _chunks(self, order: List[Tuple[str, int]]) -> Iterator[bytes]:
+        # Same bytes as "\n".join(...) over the rows, without building one big string
+        first = True
+        for key in order:
+            data = self._blocks[key]
+            if data:
+                if not first:
+                    yield b"\n"
+                yield data
+                first = False
+
+    def refresh(self) -> RefreshStats:
+        """Re-read the codebook, render new rows and rewrite the output if it changed.
+
+        Valid rows are numbered within their (Topic_ID, SubTopic_ID) group as
+        they are read, so inserting or deleting a row only re-renders the rows
+        after it in the same group. Raises ValueError when required columns
+        are missing.
+        """
+        start = time.perf_counter()
+        with open(self.codebook, newline="", encoding="utf-8-sig") as fh:
+            reader = csv.reader(fh)
+            header = [h.strip().lower() for h in next(reader, [])]
+            missing = [c for c in REQUIRED_COLUMNS if c not in header]
+            if missing:
+                raise ValueError(f"Codebook is missing required columns: {', '.join(missing)}")
+            columns = [(c, header.index(c)) for c in CODEBOOK_COLUMNS if c in header]
+
+            rows: Dict[str, _Row] = {}
+            blocks: Dict[Tuple[str, int], bytes] = {}
+            counters: Dict[Tuple[int, int], int] = {}
+            order: List[Tuple[str, int]] = []
+            errors: List[str] = []
+            total = invalid = rendered = 0
+            for line_no, cells in enumerate(reader, start=2):
+                if not any(cell.strip() for cell in cells):
+                    continue
+                total += 1
+                picked = [cells[i] if i < len(cells) else "" for _, i in columns]
+                fp = row_fingerprint(picked)
+                row = rows.get(fp) or self._rows.get(fp)
+                if row is None:
+                    row = self._parse_row(dict(zip((c for c, _ in columns), picked)))
+                rows[fp] = row
+                if row.errors:
+                    invalid += 1
+                    errors.extend(f"row {line_no}: {e}" for e in row.errors)
+                    continue
+                n = counters[row.group] = counters.get(row.group, 0) + 1
+                key = (fp, n)
+                if key not in blocks:
+                    data = self._blocks.get(key)
+                    if data is None:
+                        data = self._render(row.record, n)
+                        rendered += 1
+                    blocks[key] = data
+                order.append(key)
+
+        removed = sum(1 for fp in self._rows if fp not in rows)
+        self._rows = rows
+        self._blocks = blocks
+        if order != self._order or not os.path.exists(self.output):
+            write_atomic(self.output, self._chunks(order))
+            self._order = order
+        return RefreshStats(
+            rows=total,
+            rendered=rendered,
+            removed=removed,
+            invalid=invalid,
+            seconds=time.perf_counter() - start,
+            errors=errors,
+        )
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def watch(
+    watcher: CodebookWatcher,
+    interval: float = DEFAULT_INTERVAL,
+    report: Callable[[str], None] = print,
+    stop: Optional[Callable[[], bool]] = None,
+) -> None:
+    """Refresh whenever the codebook changes, until ``stop()`` returns True.
+
+    A change is handled once the file's size and mtime have been stable for
+    one polling interval, so a spreadsheet mid-save isn't read half-written.
+    """
+    seen = None
+    pending = None
+    while not (stop and stop()):
+        sig = _signature(watcher.codebook)
+        if sig is not None and sig != seen:
+            if sig == pending:
+                seen = sig
+                try:
+                    stats = watcher.refresh()
+                except (OSError, ValueError, csv.Error) as e:
+                    report(f"{watcher.codebook}: {e}")
+                else:
+                    report(f"{watcher.output}: {stats.describe()}")
+                    for line in stats.errors[:20]:
+                        report(f"  {line}")
+            else:
+                pending = sig  # settle for one interval before reading
+        time.sleep(interval)
+
+
+def default_output(codebook: str) -> str:
+    return os.path.splitext(codebook)[0] + ".sas"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--output", "-o", help="SAS file to write (default: codebook name with .sas)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="polling interval in seconds")
+    parser.add_argument("--once", action="store_true", help="generate once and exit instead of watching")
+
+
+def run(codebook: str, output: Optional[str], interval: float, once: bool) -> int:
+    """Command-line driver shared by codelookup.py and ``python -m sasgen.watch``."""
+    from .cache import cache_from_env
+    from .levelsets import library_from_env
+
+    watcher = CodebookWatcher(
+        codebook, output or default_output(codebook), library=library_from_env(), cache=cache_from_env()
+    )
+    if once:
+        try:
+            stats = watcher.refresh()
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"{codebook}: {e}", file=sys.stderr)
+            return 1
+        print(f"{watcher.output}: {stats.describe()}")
+        for line in stats.errors:
+            print(f"  {line}", file=sys.stderr)
+        return 1 if stats.errors else 0
+    print(f"Watching {codebook} -> {watcher.output} (Ctrl+C to stop)")
+    try:
+        watch(watcher, interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Regenerate SAS code whenever a codebook CSV changes.")
+    parser.add_argument("codebook")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return run(args.codebook, args.output, args.interval, args.once)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
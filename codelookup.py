@@ -1,193 +1,66 @@
+import argparse
+import os
+import sys
+
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
 import tkinter as tk
-from tkinter import messagebox
-
-SAS_TEMPLATE = """
-/* {var_value} */
-data new_varxx;
-YearNum = 2023;
-VarValID = {varvalid};
-Topic_ID = {topic_id};
-SubTopic_ID = {subtopic_id};
-ExcludeInclude = 1;
-SortOrder = 1;
-Topic_SortOrder = 1;
-SubTopic_SortOrder = 1;
-Topic_DefaultID = 1;
-DefaultID = 1;
-Indicator_SortOrder = ;
-YearDate = "2023-01-01";
-Dataset = "{dataset}";
-Dataset_Name = "{dataset_name}";
-Dataset_Type = "Health Surveys";
-VarCode = "{var_code}";
-VarValue = "{var_value}";
-VarType = "{var_type}";
-VarName = "{var_name}";
-Description = "{description}";
-Topic = "{topic}";
-Sub_Topic = "{sub_topic}";
-PopulationDatasource = "{population}";
-Note1 = "";
-Note2 = "";
-Note3 = "";
-CrossNotes = "";
-MapTitlePrefix = "";
-MapTitleSuffix = "";
-MapInsert = "";
-VarComments = "";
-Tag = "{var_name}_{tag_suffix}";
-DefaultPopulationSource = "{population}";
-output;
-run;
-"""
-
-TOPICS = {
-    "Children and Youth": {
-        "id": 5,
-        "subtopics": {
-            "Child Development and Disabilities": 26,
-            "Day Care and School": 34,
-            "Drug and Alcohol Use": 10,
-            "Health Care Use": 17,
-            "Health Insurance": 15,
-            "Household and Neighborhood": 16,
-            "Health Status": 18,
-            "Mental Health": 3,
-            "Nutrition": 23,
-            "Physical Activity": 35,
-            "Physical Health Conditions": 12,
-            "Population Characteristics": 11,
-            "Safety": 4,
-            "Sleep": 33,
-            "Sexual Behavior": 30,
-            "Smoking": 7,
-            "Violence": 1,
-        },
-    },
-    "Healthy Living": {
-        "id": 4,
-        "subtopics": {
-            "Vaccinations": 29,
-            "Drug and Alcohol Use": 10,
-            "Health Status": 18,
-            "Nutrition": 23,
-            "Physical Activity": 35,
-            "Safety": 4,
-            "Screening": 19,
-            "Sexual Behavior": 30,
-        },
-    },
-    "Sleep": {"id": 33, "subtopics": {}},
-    "Smoking": {"id": 7, "subtopics": {}},
-    "Vaccinations": {"id": 29, "subtopics": {}},
-    "Violence": {"id": 1, "subtopics": {}},
-    "Community Characteristics": {
-        "id": 6,
-        "subtopics": {
-            "Day Care and School": 34,
-            "Economic Factors": 31,
-            "Population Characteristics": 11,
-            "Social Factors": 13,
-        },
-    },
-    "Living and Environmental Conditions": {
-        "id": 7,
-        "subtopics": {
-            "Built Environment": 28,
-            "Housing": 14,
-        },
-    },
-    "Safety": {"id": 4, "subtopics": {}},
-    "Social Factors": {"id": 13, "subtopics": {}},
-    "Mental Health": {
-        "id": 3,
-        "subtopics": {
-            "Drug and Alcohol Use": 10,
-            "Mental Health Conditions": 20,
-            "Mental Health Counseling and Treatment": 27,
-        },
-    },
-    "Diseases and Conditions": {
-        "id": 1,
-        "subtopics": {
-            "Child Development and Disabilities": 26,
-            "Chronic Diseases": 24,
-            "Dental Health": 21,
-            "Foodborne or Waterborne Infections": 43,
-            "HIV-AIDS": 8,
-            "Hearing and Vision Health": 36,
-            "Hepatitis Infections": 48,
-            "Invasive Bacterial Infections": 45,
-            "Mosquitoborne Infections": 37,
-            "Other and Rare Diseases": 46,
-            "Person-to-Person Infections": 44,
-            "Respiratory Infections": 41,
-            "Sexually Transmitted Infections": 5,
-            "Syndromic Surveillance": 39,
-            "Tickborne Infections": 42,
-            "Tuberculosis": 53,
-            "Vaccine-Preventable Diseases": 47,
-            "Zoonotic Infections": 40,
-        },
-    },
-    "Health Care Access and Use": {
-        "id": 2,
-        "subtopics": {
-            "Health Care Use": 17,
-            "Health Insurance": 15,
-            "Mental Health Counseling and Treatment": 27,
-            "Screening": 19,
-            "Vaccinations": 29,
-        },
-    },
-    "Birth and Death": {
-        "id": 8,
-        "subtopics": {
-            "Birth": 38,
-            "Infant Mortality": 51,
-            "Leading Cause of Death": 52,
-            "Mortality and Premature Mortality": 49,
-        },
-    },
-}
-
-SURVEYS = {
-    "YRBS": {
-        "full_name": "NYC Youth Risk Behavior Survey",
-        "population": "Youth",
-        "tag_suffix": "YRBS",
-    },
-    "CHS": {
-        "full_name": "Community Health Survey",
-        "population": "Adult",
-        "tag_suffix": "CHS",
-    },
-    "HANES": {
-        "full_name": "NYC Health and Nutrition Examination Survey",
-        "population": "Adult",
-        "tag_suffix": "HANES",
-    },
-    "CCHS": {
-        "full_name": "NYC Child Health Data",
-        "population": "Youth",
-        "tag_suffix": "CCHS",
-    },
-}
+from tkinter import filedialog, messagebox, simpledialog
+
+# The template, taxonomy and renderer are shared with the Shiny app in app/sasgen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+
+from sasgen import SURVEYS, TOPICS, generate_sas_code, watch
+from sasgen.cache import cache_from_env
+from sasgen.dictionary import catalog_from_env, check_records
+from sasgen.levelsets import DuplicateLevelSet, library_from_env
+from sasgen.metrics import metrics_from_env
+from sasgen.preview import PREVIEW_DEBOUNCE_MS, VariablePreview
+from sasgen.sasmeta import import_files
+from sasgen.search import KIND_VARIABLE, format_result, taxonomy_index
+from sasgen.validation import MAX_LEVELS, MIN_LEVELS
 
 
 class SASGeneratorApp(tb.Window):
     def __init__(self):
-        super().__init__(title="SAS Code Generator", size=(900, 750))
+        super().__init__(title="SAS Code Generator", size=(1400, 750))
 
         self.variables = []  # List to store multiple variables info
         self.current_var_index = -1
+        self.render_cache = cache_from_env()  # None unless CODELOOKUP_CACHE_DIR is set
+        self.search_index = taxonomy_index()
+        self.search_docs = {}  # id(variable dict) -> search doc id
+        self.search_hits = []
+        self.level_sets = library_from_env()  # built-in sets plus $CODELOOKUP_LEVEL_SETS
+        self.dictionaries = catalog_from_env()  # data dictionaries in $CODELOOKUP_DICTIONARIES
+        self.preview_renderer = VariablePreview()
+        self.preview_job = None  # pending after() id for the debounced preview
 
         self.create_widgets()
         self.initialize_defaults()
 
     def create_widgets(self):
+        # === Live preview of the variable being edited (right-hand pane) ===
+        # Packed first so it takes the full height on the right
+        preview_frame = tb.Frame(self)
+        preview_frame.pack(side="right", fill="both", expand=True, padx=(0, 15), pady=15)
+        tb.Label(preview_frame, text="Preview:").pack(anchor="w")
+        self.preview_text = tk.Text(preview_frame, wrap="none", width=60, state="disabled")
+        preview_scroll = tk.Scrollbar(preview_frame, command=self.preview_text.yview)
+        preview_scroll.pack(side="right", fill="y")
+        self.preview_text.pack(side="left", fill="both", expand=True)
+        self.preview_text.config(yscrollcommand=preview_scroll.set)
+
+        # === Search over topics, subtopics and saved variables ===
+        tb.Label(self, text="Search:").pack(pady=(15, 3), anchor="w", padx=15)
+        self.search_entry = tb.Entry(self)
+        self.search_entry.pack(fill="x", padx=15)
+        self.search_entry.bind("<KeyRelease>", self.on_search_change)
+        self.search_list = tk.Listbox(self, height=4)
+        self.search_list.pack(fill="x", padx=15)
+        self.search_list.bind("<Double-Button-1>", self.on_search_pick)
+        self.search_list.bind("<Return>", self.on_search_pick)
+
         # === Dataset selection ===
         tb.Label(self, text="Select Survey Dataset:").pack(pady=(15, 3), anchor="w", padx=15)
         self.dataset_var = tb.StringVar()
@@ -200,16 +73,19 @@ class SASGeneratorApp(tb.Window):
         tb.Label(self, text="Variable Code:").pack(pady=(15, 3), anchor="w", padx=15)
         self.var_code_entry = tb.Entry(self)
         self.var_code_entry.pack(fill="x", padx=15)
+        self.var_code_entry.bind("<KeyRelease>", self.schedule_preview)
 
         # Variable Name
         tb.Label(self, text="Variable Name:").pack(pady=(15, 3), anchor="w", padx=15)
         self.var_name_entry = tb.Entry(self)
         self.var_name_entry.pack(fill="x", padx=15)
+        self.var_name_entry.bind("<KeyRelease>", self.schedule_preview)
 
         # Description
         tb.Label(self, text="Description:").pack(pady=(15, 3), anchor="w", padx=15)
         self.description_entry = tb.Entry(self)
         self.description_entry.pack(fill="x", padx=15)
+        self.description_entry.bind("<KeyRelease>", self.schedule_preview)
 
         # Variable Type (Indicator/Demographic)
         tb.Label(self, text="Variable Type:").pack(pady=(15, 3), anchor="w", padx=15)
@@ -234,12 +110,21 @@ class SASGeneratorApp(tb.Window):
         self.subtopic_var = tb.StringVar()
         self.subtopic_dropdown = tb.Combobox(self, textvariable=self.subtopic_var, state="readonly")
         self.subtopic_dropdown.pack(fill="x", padx=15)
+        self.subtopic_dropdown.bind("<<ComboboxSelected>>", self.schedule_preview)
+
+        # Level set library: pick a saved set to fill in the levels in one go
+        tb.Label(self, text="Level Set:").pack(pady=(15, 3), anchor="w", padx=15)
+        self.level_set_var = tb.StringVar()
+        self.level_set_dropdown = tb.Combobox(self, textvariable=self.level_set_var, state="readonly")
+        self.level_set_dropdown.pack(fill="x", padx=15)
+        self.level_set_dropdown.bind("<<ComboboxSelected>>", self.on_level_set_pick)
+        self.refresh_level_sets()
 
-        # Number of Levels dropdown (2-6)
+        # Number of Levels dropdown, with the bounds of the batch rules
         tb.Label(self, text="Number of Levels:").pack(pady=(15, 3), anchor="w", padx=15)
         self.levels_var = tb.StringVar()
         self.levels_dropdown = tb.Combobox(self, textvariable=self.levels_var, state="readonly")
-        self.levels_dropdown["values"] = [str(i) for i in range(2, 7)]
+        self.levels_dropdown["values"] = [str(i) for i in range(MIN_LEVELS, MAX_LEVELS + 1)]
         self.levels_dropdown.pack(fill="x", padx=15)
         self.levels_dropdown.bind("<<ComboboxSelected>>", self.on_levels_change)
 
@@ -248,6 +133,11 @@ class SASGeneratorApp(tb.Window):
         self.level_names_frame.pack(fill="x", padx=15, pady=(5, 15))
         self.level_name_entries = []
 
+        self.save_level_set_btn = tb.Button(
+            self, text="Save Levels as Set", bootstyle="secondary-outline", command=self.save_level_set
+        )
+        self.save_level_set_btn.pack(anchor="e", padx=15, pady=(0, 10))
+
         # Navigation Frame with Previous / Next variable and Add Variable buttons
         nav_frame = tb.Frame(self)
         nav_frame.pack(fill="x", padx=15, pady=(0, 10))
@@ -268,6 +158,18 @@ class SASGeneratorApp(tb.Window):
         )
         self.delete_var_btn.pack(side="right", padx=(0, 10))
 
+        # Queue one variable per column of SAS datasets, read from their headers
+        self.import_btn = tb.Button(
+            self, text="Import SAS Metadata...", bootstyle="info-outline", command=self.import_sas_metadata
+        )
+        self.import_btn.pack(pady=(0, 10))
+
+        # Cross-check the queue against the surveys' data dictionaries
+        self.check_btn = tb.Button(
+            self, text="Check Against Dictionaries...", bootstyle="info-outline", command=self.check_dictionaries
+        )
+        self.check_btn.pack(pady=(0, 10))
+
         # Generate SAS Code button (green)
         self.generate_btn = tb.Button(
             self, text="Generate SAS Code", bootstyle="success", command=self.generate_sas_code
@@ -297,6 +199,7 @@ class SASGeneratorApp(tb.Window):
     def on_survey_change(self, event=None):
         self.topic_var.set("")
         self.subtopic_var.set("")
+        self.schedule_preview()
 
     def on_vartype_change(self, event=None):
         vt = self.var_type_var.get()
@@ -308,6 +211,7 @@ class SASGeneratorApp(tb.Window):
         else:
             self.topic_dropdown.configure(state="readonly")
             self.subtopic_dropdown.configure(state="readonly")
+        self.schedule_preview()
 
     def on_topic_change(self, event=None):
         topic = self.topic_var.get()
@@ -318,6 +222,7 @@ class SASGeneratorApp(tb.Window):
         subtopics = sorted(TOPICS[topic]["subtopics"].keys())
         self.subtopic_dropdown["values"] = subtopics
         self.subtopic_var.set("")
+        self.schedule_preview()
 
     def on_levels_change(self, event=None):
         for widget in self.level_names_frame.winfo_children():
@@ -334,12 +239,108 @@ class SASGeneratorApp(tb.Window):
             label.grid(row=i, column=0, sticky="w", pady=2, padx=5)
             entry = tb.Entry(self.level_names_frame)
             entry.grid(row=i, column=1, sticky="ew", pady=2, padx=5)
+            entry.bind("<KeyRelease>", self.schedule_preview)
             self.level_name_entries.append(entry)
 
         self.level_names_frame.columnconfigure(1, weight=1)
+        self.schedule_preview()
+
+    def refresh_level_sets(self):
+        self.level_set_labels = {s.label(): s for s in sorted(self.level_sets, key=lambda s: s.name.lower())}
+        self.level_set_dropdown["values"] = [""] + list(self.level_set_labels)
+
+    def on_level_set_pick(self, event=None):
+        level_set = self.level_set_labels.get(self.level_set_var.get())
+        if level_set is None:
+            return
+        self.levels_var.set(str(len(level_set)))
+        self.on_levels_change()
+        for entry, val in zip(self.level_name_entries, level_set):
+            entry.insert(0, val)
+
+    def save_level_set(self):
+        levels = [entry.get().strip() for entry in self.level_name_entries]
+        name = simpledialog.askstring("Save Level Set", "Name for this level set:", parent=self)
+        if name is None:
+            return
+        try:
+            level_set = self.level_sets.add(name, levels, exist_ok=False)
+        except DuplicateLevelSet as e:
+            messagebox.showinfo("Save Level Set", str(e))
+            level_set = e.existing
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Could not save level set: {e}")
+            return
+        self.refresh_level_sets()
+        self.level_set_var.set(level_set.label())
+
+    def schedule_preview(self, event=None):
+        """Refresh the preview once typing has paused for PREVIEW_DEBOUNCE_MS."""
+        if self.preview_job is not None:
+            self.after_cancel(self.preview_job)
+        self.preview_job = self.after(PREVIEW_DEBOUNCE_MS, self.update_preview)
+
+    def update_preview(self):
+        self.preview_job = None
+        sas = self.preview_renderer.render(self.form_data())
+        self.preview_text.config(state="normal")
+        self.preview_text.delete("1.0", "end")
+        self.preview_text.insert("1.0", sas)
+        self.preview_text.config(state="disabled")
+
+    def on_search_change(self, event=None):
+        self.search_hits = self.search_index.search(self.search_entry.get(), limit=20)
+        self.search_list.delete(0, "end")
+        for hit in self.search_hits:
+            self.search_list.insert("end", format_result(hit))
+
+    def on_search_pick(self, event=None):
+        selection = self.search_list.curselection()
+        if not selection:
+            return
+        hit = self.search_hits[selection[0]]
+        if hit.kind == KIND_VARIABLE:
+            index = next((i for i, v in enumerate(self.variables) if v is hit.payload), -1)
+            if index < 0 or index == self.current_var_index:
+                return
+            if not self.save_current_variable():
+                return
+            self.load_variable(index)
+            return
+        topic, sub_topic = hit.payload
+        if self.var_type_var.get() != "Indicator":
+            self.var_type_var.set("Indicator")
+            self.on_vartype_change()
+        self.topic_var.set(topic)
+        self.on_topic_change()
+        self.subtopic_var.set(sub_topic)
 
     # === Variable Data Management ===
 
+    def form_data(self):
+        """The variable described by the form as it stands (not validated)."""
+        survey = SURVEYS.get(self.dataset_var.get(), {"full_name": "", "population": "", "tag_suffix": ""})
+        return {
+            "dataset": self.dataset_var.get(),
+            "dataset_name": survey["full_name"],
+            "population": survey["population"],
+            "tag_suffix": survey["tag_suffix"],
+            "var_code": self.var_code_entry.get().strip(),
+            "var_name": self.var_name_entry.get().strip(),
+            "description": self.description_entry.get().strip(),
+            "var_type": self.var_type_var.get(),
+            "topic": self.topic_var.get() if self.var_type_var.get() == "Indicator" else "",
+            "sub_topic": self.subtopic_var.get() if self.var_type_var.get() == "Indicator" else "",
+            "topic_id": TOPICS[self.topic_var.get()]["id"] if self.topic_var.get() in TOPICS else 0,
+            "subtopic_id": (
+                TOPICS[self.topic_var.get()]["subtopics"][self.subtopic_var.get()]
+                if self.var_type_var.get() == "Indicator"
+                and self.subtopic_var.get() in TOPICS.get(self.topic_var.get(), {}).get("subtopics", {})
+                else 0
+            ),
+            "levels": [entry.get().strip() for entry in self.level_name_entries],
+        }
+
     def save_current_variable(self):
         if not self.dataset_var.get():
             messagebox.showerror("Error", "Please select a Survey Dataset.")
@@ -368,35 +369,51 @@ class SASGeneratorApp(tb.Window):
                 messagebox.showerror("Error", f"Please enter a name for Level {idx}.")
                 return False
 
-        data = {
-            "dataset": self.dataset_var.get(),
-            "dataset_name": SURVEYS[self.dataset_var.get()]["full_name"],
-            "population": SURVEYS[self.dataset_var.get()]["population"],
-            "tag_suffix": SURVEYS[self.dataset_var.get()]["tag_suffix"],
-            "var_code": self.var_code_entry.get().strip(),
-            "var_name": self.var_name_entry.get().strip(),
-            "description": self.description_entry.get().strip(),
-            "var_type": self.var_type_var.get(),
-            "topic": self.topic_var.get() if self.var_type_var.get() == "Indicator" else "",
-            "sub_topic": self.subtopic_var.get() if self.var_type_var.get() == "Indicator" else "",
-            "topic_id": TOPICS[self.topic_var.get()]["id"] if self.topic_var.get() in TOPICS else 0,
-            "subtopic_id": (
-                TOPICS[self.topic_var.get()]["subtopics"][self.subtopic_var.get()]
-                if self.var_type_var.get() == "Indicator"
-                and self.subtopic_var.get() in TOPICS.get(self.topic_var.get(), {}).get("subtopics", {})
-                else 0
-            ),
-            "levels": [entry.get().strip() for entry in self.level_name_entries],
-        }
+        data = self.form_data()
+        # Share the library's copy of the levels when they match a saved set
+        self.level_sets.bind(data)
 
         if 0 <= self.current_var_index < len(self.variables):
+            self.unindex_variable(self.variables[self.current_var_index])
             self.variables[self.current_var_index] = data
         else:
             self.variables.append(data)
             self.current_var_index = len(self.variables) - 1
+        self.search_docs[id(data)] = self.search_index.add_variable(data)
 
         return True
 
+    def import_sas_metadata(self):
+        paths = filedialog.askopenfilenames(
+            title="Import SAS metadata (datasets plus optional formats)",
+            filetypes=[
+                ("SAS datasets and formats", "*.sas7bdat *.xpt *.xport *.sas"),
+                ("All files", "*.*"),
+            ],
+        )
+        if not paths:
+            return
+        # Dataset, type and topic come from the form; code, label and levels
+        # from each column's header metadata
+        try:
+            result = import_files(paths, self.form_data())
+        except (OSError, ValueError, ImportError) as e:
+            messagebox.showerror("Import Failed", str(e))
+            return
+        first = len(self.variables)
+        for data in result.records:
+            self.level_sets.bind(data)
+            self.variables.append(data)
+            self.search_docs[id(data)] = self.search_index.add_variable(data)
+        if result.records:
+            self.load_variable(first)
+        messagebox.showinfo("Import", f"Imported {result.describe()}.\nFill in the Variable Name for each.")
+
+    def unindex_variable(self, var_data):
+        doc_id = self.search_docs.pop(id(var_data), None)
+        if doc_id is not None:
+            self.search_index.remove(doc_id)
+
     def load_variable(self, index):
         if not self.variables or index < 0 or index >= len(self.variables):
             # Clear form if out of range
@@ -426,6 +443,8 @@ class SASGeneratorApp(tb.Window):
 
         self.subtopic_var.set(var_data["sub_topic"])
 
+        level_set = self.level_sets.get(var_data.get("level_set"))
+        self.level_set_var.set(level_set.label() if level_set is not None else "")
         self.levels_var.set(str(len(var_data["levels"])))
         self.on_levels_change()
 
@@ -444,6 +463,7 @@ class SASGeneratorApp(tb.Window):
         self.topic_var.set("")
         self.subtopic_var.set("")
         self.subtopic_dropdown["values"] = []
+        self.level_set_var.set("")
         self.levels_var.set("")
         self.on_levels_change()
         self.update_nav_buttons()
@@ -513,6 +533,7 @@ class SASGeneratorApp(tb.Window):
         if not result:
             return
 
+        self.unindex_variable(self.variables[self.current_var_index])
         del self.variables[self.current_var_index]
 
         if not self.variables:
@@ -527,6 +548,35 @@ class SASGeneratorApp(tb.Window):
         self.update_nav_buttons()
         messagebox.showinfo("Success", f"Variable '{var_name}' has been deleted.")
 
+    # === Data dictionary cross-check ===
+
+    def cross_check(self):
+        """Check the queue against the data dictionaries; None if the check could not run."""
+        try:
+            return check_records(self.variables, self.dictionaries)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Cross-Check Failed", str(e))
+            return None
+
+    def check_dictionaries(self):
+        if not self.save_current_variable():
+            return
+        if not self.variables:
+            messagebox.showerror("Error", "No variables to check.")
+            return
+        if not len(self.dictionaries):
+            directory = filedialog.askdirectory(title="Folder of data dictionaries (<SURVEY>.csv)")
+            if not directory:
+                return
+            if not self.dictionaries.add_dir(directory):
+                messagebox.showerror(
+                    "No Dictionaries", f"No dictionaries found. Name each CSV after its survey ({', '.join(SURVEYS)})."
+                )
+                return
+        check = self.cross_check()
+        if check is not None:
+            self.show_output_popup(check.describe(), title="Dictionary Cross-Check")
+
     # === Generate SAS code ===
 
     def generate_sas_code(self):
@@ -535,39 +585,23 @@ class SASGeneratorApp(tb.Window):
         if not self.variables:
             messagebox.showerror("Error", "No variables to generate SAS code.")
             return
+        if len(self.dictionaries):
+            check = self.cross_check()
+            if check is None:
+                return
+            if check.errors and not messagebox.askyesno(
+                "Dictionary Mismatches", check.describe(limit=10) + "\n\nGenerate SAS code anyway?"
+            ):
+                return
 
-        sas_code_parts = []
-
-        for var_data in self.variables:
-            for idx, val in enumerate(var_data["levels"], start=1):
-                sas_code_parts.append(
-                    SAS_TEMPLATE.format(
-                        varvalid=idx,
-                        topic_id=var_data["topic_id"],
-                        subtopic_id=var_data["subtopic_id"],
-                        dataset=var_data["dataset"],
-                        dataset_name=var_data["dataset_name"],
-                        var_code=var_data["var_code"],
-                        var_value=val,
-                        var_type=var_data["var_type"],
-                        var_name=var_data["var_name"],
-                        description=var_data["description"],
-                        topic=var_data["topic"],
-                        sub_topic=var_data["sub_topic"],
-                        population=var_data["population"],
-                        tag_suffix=var_data["tag_suffix"],
-                    )
-                )
-                sas_code_parts.append("")  # blank line between entries
-
-        full_code = "\n".join(sas_code_parts)
+        full_code = generate_sas_code(self.variables, cache=self.render_cache)
         self.show_output_popup(full_code)
 
     # === Popup for SAS output ===
 
-    def show_output_popup(self, sas_code):
+    def show_output_popup(self, sas_code, title="Generated SAS Code"):
         popup = tk.Toplevel(self)
-        popup.title("Generated SAS Code")
+        popup.title(title)
         popup.geometry("850x650")
 
         text = tk.Text(popup, wrap="word", font=("Consolas", 11))
@@ -580,6 +614,20 @@ class SASGeneratorApp(tb.Window):
         text.config(yscrollcommand=scrollbar.set)
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SAS Code Generator")
+    parser.add_argument(
+        "--watch", metavar="CODEBOOK",
+        help="regenerate SAS code from a codebook CSV whenever it changes, without opening the window",
+    )
+    watch.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    metrics_from_env()  # writes $CODELOOKUP_METRICS on exit when set
+    if args.watch:
+        sys.exit(watch.run(args.watch, args.output, args.interval, args.once))
     app = SASGeneratorApp()
     app.mainloop()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# sasgen lives next to app.py (so Shinylive bundles it); the golden harness in tools/
+sys.path[:0] = [os.path.join(ROOT, "app"), os.path.join(ROOT, "tools")]
@@ -0,0 +1,213 @@
+"""Writes the SAS fixtures in this directory for tests/test_sasmeta.py.
+
+SAS itself isn't needed: the writers below produce the smallest files that
+follow the SAS7BDAT and XPORT (V5) layouts sasgen.sasmeta reads, with
+metadata and blank rows only.
+
+* survey.sas7bdat: 64-bit, little-endian, UTF-8, with one empty data page;
+* survey32be.sas7bdat: the same columns, 32-bit and big-endian;
+* survey.xpt: the same columns in XPORT, with formats carrying widths;
+* formats.xpt: a PROC FORMAT CNTLOUT= dataset;
+* formats.sas: the same value labels as a PROC FORMAT program.
+
+The files are committed; re-run after changing the columns or formats:
+
+    python tests/data/make_fixtures.py
+"""
+import os
+import struct
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SAS7BDAT_MAGIC = b"\x00" * 12 + b"\xc2\xea\x81\x60\xb3\x14\x11\xcf\xbd\x92\x08\x00\x09\xc7\x31\x8c\x18\x1f\x10\x11"
+
+# (name, label, format, numeric, length)
+COLUMNS = [
+    ("SMOKER", "Current smoker", "YESNO", True, 8),
+    ("SEX", "Sex of respondent", "$SEXF", False, 1),
+    ("AGEGRP", "Age group", "AGEF", True, 8),
+    ("WEIGHT", "Survey weight", "BEST12.", True, 8),
+    ("BORO", "Borough of residence – NYC", "", False, 13),
+]
+
+# (format name, type, start, label); ranges that share a label give one level
+FORMATS = [
+    ("YESNO", "N", "1", "Yes"),
+    ("YESNO", "N", "2", "No"),
+    ("SEXF", "C", "M", "Male"),
+    ("SEXF", "C", "F", "Female"),
+    ("AGEF", "N", "18", "18-24"),
+    ("AGEF", "N", "25", "25-44"),
+    ("AGEF", "N", "35", "25-44"),
+    ("AGEF", "N", "45", "45-64"),
+    ("AGEF", "N", "65", "65+"),
+    ("AGEPIC", "P", "0", "009"),  # pictures are not value labels
+]
+
+FORMAT_SOURCE = """\
+/* Value labels for survey.sas7bdat */
+proc format;
+  value yesno 1 = 'Yes' 2 = 'No';
+  value $sexf 'M' = "Male" 'F' = "Female";
+  * value unused 1 = 'commented out';
+  value agef (default=8)
+    18-24 = '18-24'
+    25-34, 35-44 = '25-44'
+    45-64 = '45-64'
+    65-high = '65+';
+run;
+"""
+
+
+# === SAS7BDAT ===
+
+def _signature(kind, u64, big):
+    sig = {
+        "rowsize": b"\xf7\xf7\xf7\xf7", "colsize": b"\xf6\xf6\xf6\xf6", "text": b"\xfd\xff\xff\xff",
+        "name": b"\xff\xff\xff\xff", "attributes": b"\xfc\xff\xff\xff", "format": b"\xfe\xfb\xff\xff",
+    }[kind]
+    if big:
+        sig = sig[::-1]
+    if u64:
+        pad = b"\xff" * 4 if kind in ("text", "name", "attributes", "format") else b"\x00" * 4
+        sig = pad + sig if big else sig + pad
+    return sig
+
+
+def write_sas7bdat(path, columns, u64=True, big=False, page_size=4096, data_pages=1):
+    order = ">" if big else "<"
+    int_len = 8 if u64 else 4
+    uint = "Q" if u64 else "I"
+    bit_offset = 32 if u64 else 16
+    pointer_len = 24 if u64 else 12
+    header_len = 8192 if u64 else 1024
+
+    head = bytearray(header_len)
+    head[0:32] = SAS7BDAT_MAGIC
+    head[32] = head[35] = ord("3") if u64 else 0x22
+    head[37] = 0 if big else 1
+    head[70] = 20  # utf-8
+    head[92:100] = b"SURVEY  "
+    align = 4 if u64 else 0
+    struct.pack_into(order + "III", head, 196 + align, header_len, page_size, 1 + data_pages)
+
+    # Column text: name, label and format of each column, 4-byte aligned
+    text = bytearray(44)
+    refs = []
+    for name, label, fmt, _, _ in columns:
+        ref = []
+        for value in (name, label, fmt):
+            raw = value.encode("utf-8")
+            ref.append((len(text), len(raw)))
+            text += raw + b"\x00" * (-(len(text) + len(raw)) % 4)
+        refs.append(ref)
+    struct.pack_into(order + "H", text, 0, len(text))
+
+    subheaders = []
+    rowsize = bytearray(808 if u64 else 480)
+    rowsize[0:int_len] = _signature("rowsize", u64, big)
+    struct.pack_into(order + uint, rowsize, 5 * int_len, sum(c[4] for c in columns))
+    struct.pack_into(order + uint, rowsize, 9 * int_len, len(columns))
+    subheaders.append(rowsize)
+    colsize = bytearray(3 * int_len)
+    colsize[0:int_len] = _signature("colsize", u64, big)
+    struct.pack_into(order + uint, colsize, int_len, len(columns))
+    subheaders.append(colsize)
+    textsub = bytearray(int_len) + text
+    textsub[0:int_len] = _signature("text", u64, big)
+    subheaders.append(textsub + b"\x00" * (-len(textsub) % 8))
+    names = bytearray(2 * int_len + 12 + 8 * len(columns))
+    names[0:int_len] = _signature("name", u64, big)
+    for i, ref in enumerate(refs):
+        struct.pack_into(order + "HHH", names, int_len + 8 * (i + 1), 0, *ref[0])
+    subheaders.append(names)
+    step = int_len + 8
+    attributes = bytearray(2 * int_len + 12 + step * len(columns))
+    attributes[0:int_len] = _signature("attributes", u64, big)
+    offset = 0
+    for i, (_, _, _, numeric, length) in enumerate(columns):
+        base = 2 * int_len + i * step
+        struct.pack_into(order + uint, attributes, int_len + 8 + i * step, offset)
+        struct.pack_into(order + "I", attributes, base + 8, length)
+        attributes[base + 14] = 1 if numeric else 2
+        offset += length
+    subheaders.append(attributes)
+    for ref in refs:
+        fmt = bytearray(3 * int_len + 36 + (12 if u64 else 0))
+        fmt[0:int_len] = _signature("format", u64, big)
+        struct.pack_into(order + "HHH", fmt, 3 * int_len + 22, 0, *ref[2])
+        struct.pack_into(order + "HHH", fmt, 3 * int_len + 28, 0, *ref[1])
+        subheaders.append(fmt)
+
+    page = bytearray(page_size)
+    struct.pack_into(order + "HHH", page, bit_offset, 0, len(subheaders), len(subheaders))
+    end = page_size
+    for i, sub in enumerate(subheaders):
+        end -= len(sub)
+        end -= end % 8
+        page[end:end + len(sub)] = sub
+        struct.pack_into(order + uint + uint, page, bit_offset + 8 + i * pointer_len, end, len(sub))
+    if bit_offset + 8 + len(subheaders) * pointer_len > end:
+        raise ValueError("subheaders don't fit on one page; raise page_size")
+
+    data = bytearray(page_size)
+    struct.pack_into(order + "H", data, bit_offset, 0x0100)
+    with open(path, "wb") as fh:
+        fh.write(head + page + data * data_pages)
+
+
+# === XPORT ===
+
+def _record(text):
+    return text.encode("latin-1").ljust(80)[:80]
+
+
+def write_xport(path, columns, rows, member="SURVEY"):
+    """``rows`` hold a value per column; numeric values are written as missing."""
+    out = bytearray()
+    out += _record("HEADER RECORD*******LIBRARY HEADER RECORD!!!!!!!000000000000000000000000000000")
+    out += _record("SAS     SAS     SASLIB  9.4     X64_7PRO                        01JAN24:00:00:00")
+    out += _record("01JAN24:00:00:00")
+    out += _record("HEADER RECORD*******MEMBER  HEADER RECORD!!!!!!!000000000000000001600000000140")
+    out += _record("HEADER RECORD*******DSCRPTR HEADER RECORD!!!!!!!000000000000000000000000000000")
+    out += _record(f"SAS     {member:<8}SASDATA 9.4     X64_7PRO                        01JAN24:00:00:00")
+    out += _record("01JAN24:00:00:00")
+    out += _record("HEADER RECORD*******NAMESTR HEADER RECORD!!!!!!!000000%04d00000000000000000000" % len(columns))
+    namestrs = bytearray()
+    position = 0
+    for i, (name, label, fmt, numeric, length) in enumerate(columns):
+        # "BEST12." is stored as name BEST, width 12
+        fmt_name = fmt.rstrip(".").rstrip("0123456789")
+        width = int(fmt.rstrip(".")[len(fmt_name):] or 0)
+        namestrs += struct.pack(
+            ">hhhh8s40s8shhh2s8shhl52s", 1 if numeric else 2, 0, length, i + 1,
+            name.encode("latin-1").ljust(8), label.encode("latin-1").ljust(40), fmt_name.encode("latin-1").ljust(8),
+            width, 0, 0, b"  ", b" " * 8, 0, 0, position, b" " * 52,
+        )
+        position += length
+    out += namestrs + b" " * (-len(namestrs) % 80)
+    out += _record("HEADER RECORD*******OBS     HEADER RECORD!!!!!!!000000000000000000000000000000")
+    data = bytearray()
+    for row in rows:
+        for (_, _, _, numeric, length), value in zip(columns, row):
+            data += b"\x00" * length if numeric else str(value).encode("latin-1").ljust(length)[:length]
+    out += data + b" " * (-len(data) % 80)
+    with open(path, "wb") as fh:
+        fh.write(out)
+
+
+def main():
+    write_sas7bdat(os.path.join(HERE, "survey.sas7bdat"), COLUMNS)
+    write_sas7bdat(os.path.join(HERE, "survey32be.sas7bdat"), COLUMNS, u64=False, big=True)
+    # XPORT is latin-1 and has 40-character labels
+    latin = [(n, label.replace("–", "-"), f, num, ln) for n, label, f, num, ln in COLUMNS]
+    write_xport(os.path.join(HERE, "survey.xpt"), latin, [("", "F", "", "", "Bronx")] * 3)
+    cntlout = [("FMTNAME", "Format name", "", False, 8), ("TYPE", "Type", "", False, 1),
+               ("START", "Starting value", "", False, 8), ("LABEL", "Format value label", "", False, 16)]
+    write_xport(os.path.join(HERE, "formats.xpt"), cntlout, FORMATS, member="FMTS")
+    with open(os.path.join(HERE, "formats.sas"), "w", encoding="utf-8", newline="\n") as fh:
+        fh.write(FORMAT_SOURCE)
+
+
+if __name__ == "__main__":
+    main()
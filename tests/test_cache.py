@@ -0,0 +1,53 @@
+import os
+
+from golden import generate_corpus, reference_render
+from sasgen.cache import MARKER, RENDERER_VERSION, RenderCache, template_fingerprint
+from sasgen.core import generate_sas_code
+
+
+def test_program_read_back_after_restart(tmp_path):
+    records = generate_corpus(40, seed=1)
+    expected = reference_render(records)
+    assert generate_sas_code(records, RenderCache(str(tmp_path))) == expected
+
+    reopened = RenderCache(str(tmp_path))
+    assert generate_sas_code(records, reopened) == expected
+    assert reopened.hits == reopened.misses == 0  # no variable was looked up or rendered
+
+
+def test_edit_renders_only_the_edited_variable(tmp_path):
+    records = generate_corpus(40, seed=2)
+    cache = RenderCache(str(tmp_path))
+    generate_sas_code(records, cache)
+    edited = [dict(records[5], description="changed")] + records[:5] + records[6:]
+    cache.hits = cache.misses = 0
+    assert generate_sas_code(edited, cache) == reference_render(edited)
+    # Moving a variable renumbers Indicator_SortOrder for the ones it passed
+    assert cache.misses < 10
+    assert cache.hits > 30
+
+
+def test_renderer_version_changes_the_namespace():
+    assert template_fingerprint() != template_fingerprint(renderer_version=RENDERER_VERSION + 1)
+
+
+def test_only_marked_namespaces_are_dropped(tmp_path):
+    stale = tmp_path / "0123456789abcdef"
+    stale.mkdir()
+    (stale / MARKER).touch()
+    unrelated = tmp_path / "fedcba9876543210"  # looks like a namespace but isn't ours
+    unrelated.mkdir()
+    (unrelated / "keep.txt").write_text("data")
+
+    cache = RenderCache(str(tmp_path))
+    assert not stale.exists()
+    assert (unrelated / "keep.txt").exists()
+    assert os.path.isfile(os.path.join(cache.path, MARKER))
+
+
+def test_size_bounds(tmp_path):
+    records = generate_corpus(30, seed=3)
+    cache = RenderCache(str(tmp_path), max_bytes=1, memory_bytes=2000)
+    generate_sas_code(records, cache)
+    assert cache.total_bytes == 0  # the program doesn't fit on disk
+    assert 0 < cache.memory_used <= 2000
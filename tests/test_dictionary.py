@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import sasgen.dictionary as dictionary
+from sasgen.dictionary import DictionaryCatalog, build_index, check_records
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        fh.write(text)
+    return str(path)
+
+
+def test_variable_per_row(tmp_path):
+    path = _write(tmp_path / "CHS.csv", "Var_Code,Levels\nsmoker,Yes|No\nAGEGRP,18-24|25-44||45+\n")
+    index = build_index(path, "CHS")
+    assert index.counts == {"SMOKER": 2, "AGEGRP": 3}
+    assert "Smoker" in index
+
+
+def test_label_per_row(tmp_path):
+    path = _write(tmp_path / "YRBS.csv", "variable,value_label\nq1,Yes\nq1,No\nq2,\n")
+    assert build_index(path, "YRBS").counts == {"Q1": 2, "Q2": 0}
+
+
+def test_codes_only(tmp_path):
+    path = _write(tmp_path / "HANES.csv", "name,label\nbmi,Body mass index\n")
+    assert build_index(path, "HANES").counts == {"BMI": None}
+
+
+def test_missing_code_column(tmp_path):
+    path = _write(tmp_path / "CHS.csv", "code,levels\nx,a|b\n")
+    with pytest.raises(ValueError, match="no variable code column"):
+        build_index(path, "CHS")
+
+
+def _records():
+    return [
+        {"dataset": "CHS", "var_code": "smoker", "levels": ["Yes", "No"]},
+        {"dataset": "CHS", "var_code": "agegrp", "levels": ["18-24", "25+"]},
+        {"dataset": "CHS", "var_code": "nope", "levels": ["a", "b"]},
+        {"dataset": "CCHS", "var_code": "x", "levels": ["a", "b"]},
+    ]
+
+
+def test_check_records(tmp_path):
+    _write(tmp_path / "CHS.csv", "var_code,levels\nsmoker,Yes|No\nagegrp,18-24|25-44|45+\n")
+    catalog = DictionaryCatalog()
+    assert catalog.add_dir(str(tmp_path)) == ["CHS"]
+    check = check_records(_records(), catalog)
+    assert [(e.index, e.field) for e in check.errors] == [(1, "levels"), (2, "var_code")]
+    assert check.checked == 3
+    assert check.missing_dictionaries == ["CCHS"]
+
+
+def test_index_is_cached_until_the_csv_changes(tmp_path, monkeypatch):
+    path = _write(tmp_path / "CHS.csv", "var_code,levels\nsmoker,Yes|No\n")
+    first = DictionaryCatalog()
+    first.add_dir(str(tmp_path))
+    assert first.get("CHS").counts == {"SMOKER": 2}
+    assert os.listdir(tmp_path / ".index")
+
+    builds = []
+    real_build = dictionary.build_index
+    monkeypatch.setattr(dictionary, "build_index", lambda *a: builds.append(a) or real_build(*a))
+    # A new catalog reads the saved index instead of the CSV
+    second = DictionaryCatalog()
+    second.add_dir(str(tmp_path))
+    assert second.get("CHS").counts == {"SMOKER": 2}
+    assert builds == []
+
+    _write(path, "var_code,levels\nsmoker,Yes|No|Don't know\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert second.get("CHS").counts == {"SMOKER": 3}
+    assert len(builds) == 1
+    assert second.get("CHS").counts == {"SMOKER": 3}
+    assert len(builds) == 1  # held in memory once rebuilt
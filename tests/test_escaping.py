@@ -0,0 +1,62 @@
+from sasgen.core import generate_sas_for_variable
+from sasgen.escaping import sas_comment, sas_literal
+from sasgen.preview import VariablePreview
+
+
+def test_plain_text_is_double_quoted():
+    assert sas_literal("Current smoker") == '"Current smoker"'
+    assert sas_literal("") == '""'
+    assert sas_literal("it's") == '"it\'s"'
+
+
+def test_double_quotes_are_doubled():
+    assert sas_literal('Told "asthma"; ever') == '"Told ""asthma""; ever"'
+
+
+def test_macro_triggers_use_single_quotes():
+    assert sas_literal("R&D") == "'R&D'"
+    assert sas_literal("50% or more") == "'50% or more'"
+    assert sas_literal("It's 50% \"more\"") == "'It''s 50% \"more\"'"
+
+
+def test_comments():
+    assert sas_comment("a */ b") == "a * / b"
+    assert sas_comment("a & b") == "a & b"
+
+
+def _record(**fields):
+    record = {
+        "dataset": "CHS",
+        "dataset_name": "Community Health Survey",
+        "population": "Adult",
+        "tag_suffix": "CHS",
+        "var_code": "rd",
+        "var_name": "R&D",
+        "description": 'Share "above" 50%',
+        "var_type": "Demographic",
+        "topic": "",
+        "sub_topic": "",
+        "levels": ["0%", "O'Brien", '"quoted"'],
+    }
+    record.update(fields)
+    return record
+
+
+def test_rendered_literals():
+    block = generate_sas_for_variable(_record())[0]
+    assert "VarName = 'R&D';" in block
+    assert "Description = 'Share \"above\" 50%';" in block
+    assert "VarValue = '0%';" in block
+    assert "Tag = 'R&D_CHS';" in block
+    second = generate_sas_for_variable(_record())[2]
+    assert "VarValue = \"O'Brien\";" in second
+
+
+def test_tag_is_one_literal():
+    block = generate_sas_for_variable(_record(var_name='say "hi"'))[0]
+    assert 'Tag = "say ""hi""_CHS";' in block
+
+
+def test_preview_matches_renderer():
+    record = _record()
+    assert VariablePreview().render(record) == "\n".join(generate_sas_for_variable(record))
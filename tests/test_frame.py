@@ -0,0 +1,71 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from golden import generate_corpus, reference_render  # noqa: E402
+from sasgen.core import SURVEYS, generate_sas_code  # noqa: E402
+from sasgen.frame import generate_from_frame, iter_frame_batches, resolve_frame  # noqa: E402
+
+
+def _record(var_code, levels, **fields):
+    survey = SURVEYS["CHS"]
+    record = {
+        "dataset": "CHS",
+        "dataset_name": survey["full_name"],
+        "population": survey["population"],
+        "tag_suffix": survey["tag_suffix"],
+        "var_code": var_code,
+        "var_name": var_code.lower(),
+        "description": "",
+        "var_type": "Indicator",
+        "topic": "Smoking",
+        "sub_topic": "",
+        "levels": levels,
+    }
+    record.update(fields)
+    return record
+
+
+def test_matches_core_and_reference():
+    records = generate_corpus(300, seed=3)
+    expected = reference_render(records)
+    assert generate_sas_code(records) == expected
+    assert "\n".join(generate_from_frame(pd.DataFrame(records))) == expected
+    assert "\n".join(generate_from_frame(pd.DataFrame(records), batch_size=7)) == expected
+
+
+def test_empty_frame():
+    df = pd.DataFrame(columns=["dataset", "var_code", "var_name", "description", "var_type", "levels"])
+    assert generate_from_frame(df) == []
+    assert list(iter_frame_batches(df)) == []
+
+
+def test_missing_levels_render_nothing():
+    records = [_record("A", ["Yes", "No"]), _record("B", None), _record("C", float("nan")), _record("D", [])]
+    df = pd.DataFrame(records)
+    rows = resolve_frame(df)
+    assert rows["var_code"].tolist() == ['"A"', '"A"']
+    expected = generate_sas_code([dict(r, levels=r["levels"] if isinstance(r["levels"], list) else []) for r in records])
+    assert "\n".join(generate_from_frame(df)) == expected
+
+
+def test_delimited_levels():
+    df = pd.DataFrame([_record("A", "Yes|No|Don't know"), _record("B", ["x"])])
+    rows = resolve_frame(df)
+    assert rows["var_value"].tolist() == ['"Yes"', '"No"', '"Don\'t know"', '"x"']
+    assert rows["varvalid"].tolist() == [1, 2, 3, 1]
+    assert rows["indicator_sort"].tolist() == [1, 1, 1, 2]
+
+
+def test_missing_columns():
+    with pytest.raises(ValueError, match="levels"):
+        resolve_frame(pd.DataFrame([{"dataset": "CHS"}]))
+
+
+def test_braces_and_macro_characters():
+    records = [
+        _record("A", ["{0}", "50% & up", "a */ b"], description="Uses {braces} and 'quotes'"),
+        _record("B", "x|y", var_name="b&c"),
+    ]
+    expected = generate_sas_code([dict(r, levels=["x", "y"]) if r["var_code"] == "B" else r for r in records])
+    assert "\n".join(generate_from_frame(pd.DataFrame(records), batch_size=2)) == expected
@@ -0,0 +1,41 @@
+import pytest
+
+import golden
+from sasgen.core import SAS_TEMPLATE
+
+
+@pytest.fixture(scope="module")
+def frozen():
+    return golden.load_frozen_corpus(), golden._read(golden.FROZEN_EXPECTED)
+
+
+def test_frozen_template_is_current():
+    # Fails when SAS_TEMPLATE changes; run `python tools/golden.py --freeze`
+    # and commit tools/golden/ with the change if it was intentional.
+    assert golden.reference_template() == SAS_TEMPLATE
+
+
+def _same(expected, text):
+    # Plain bool, so a failure doesn't make pytest diff megabytes of SAS
+    return text == expected
+
+
+def test_reference_matches_expected(frozen):
+    records, expected = frozen
+    text = golden.reference_render(records)
+    assert _same(expected, text), golden.first_difference(expected, text)
+
+
+@pytest.mark.parametrize("name", sorted(golden.available_engines()))
+def test_engine_matches_expected(frozen, name):
+    records, expected = frozen
+    text = golden.available_engines()[name](records)
+    assert _same(expected, text), golden.first_difference(expected, text)
+
+
+def test_seeded_corpus_matches_reference():
+    records = golden.generate_corpus(400, seed=5)
+    expected = golden.reference_render(records)
+    for name, engine in golden.available_engines().items():
+        text = engine(records)
+        assert _same(expected, text), f"{name}: {golden.first_difference(expected, text)}"
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import pytest
+
+from sasgen.levelsets import DuplicateLevelSet, LevelSetLibrary, default_library
+
+
+def test_duplicate_levels_report_the_existing_set():
+    library = default_library()
+    with pytest.raises(DuplicateLevelSet) as info:
+        library.add("Agreement", ["Yes", "No"], exist_ok=False)
+    assert info.value.existing.name == "Yes/No"
+    assert "already saved as 'Yes/No'" in str(info.value)
+    assert isinstance(info.value, ValueError)
+
+
+def test_exist_ok_returns_the_existing_set():
+    library = default_library()
+    before = len(library)
+    assert library.add("Agreement", ["Yes", "No"]).name == "Yes/No"
+    assert len(library) == before
+
+
+def test_merge_counts_new_sets():
+    library = LevelSetLibrary()
+    library.add("Yes/No", ["Yes", "No"])
+    data = {"sets": [{"name": "Yes/No again", "levels": ["Yes", "No"]}, {"name": "AB", "levels": ["A", "B"]}]}
+    assert library.merge(data) == 1
+    assert sorted(s.name for s in library) == ["AB", "Yes/No"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "sets.json")
+    library = default_library(path)
+    library.add("Letters", ["A", "B", "C"])
+    with open(path, encoding="utf-8") as fh:
+        assert any(s["name"] == "Letters" for s in json.load(fh)["sets"])
+    reloaded = default_library(path)
+    assert [s.name for s in reloaded] == [s.name for s in library]
+
+
+def test_browser_storage_is_a_no_op_outside_pyodide():
+    library = default_library()
+    assert asyncio.run(library.load_browser()) == 0
+    asyncio.run(library.save_browser())
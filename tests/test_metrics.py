@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from golden import generate_corpus
+from sasgen.core import generate_sas_code
+from sasgen.metrics import LATENCY_BUCKETS, METRICS, Metrics, text_bytes
+
+
+def _recorded():
+    metrics = Metrics(enabled=True)
+
+    @metrics.timed("render", rows=len, nbytes=text_bytes)
+    def render(text):
+        return text
+
+    render("abc")
+    render("é")
+    return metrics, render
+
+
+def test_counters():
+    metrics, _ = _recorded()
+    series = metrics.series["render"]
+    assert series.calls == 2
+    assert series.rows == 4  # len() of each result
+    assert series.bytes == 5  # "é" is two UTF-8 bytes
+    assert sum(series.buckets) == 2
+    assert series.max_seconds <= series.seconds
+
+
+def test_json_output():
+    metrics, _ = _recorded()
+    data = json.loads(metrics.to_json())
+    summary = data["metrics"]["render"]
+    assert summary["calls"] == 2
+    assert summary["rows_total"] == 4
+    assert summary["bytes_total"] == 5
+    assert summary["seconds_p50"] <= summary["seconds_p99"] <= summary["seconds_max"]
+
+
+def test_prometheus_output():
+    metrics, _ = _recorded()
+    lines = metrics.to_prometheus().splitlines()
+    assert 'codelookup_calls_total{function="render"} 2' in lines
+    assert 'codelookup_rows_total{function="render"} 4' in lines
+    assert 'codelookup_output_bytes_total{function="render"} 5' in lines
+    assert 'codelookup_duration_seconds_bucket{function="render",le="+Inf"} 2' in lines
+    assert 'codelookup_duration_seconds_count{function="render"} 2' in lines
+    buckets = [line for line in lines if line.startswith("codelookup_duration_seconds_bucket")]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)  # cumulative
+
+
+def test_prometheus_label_escaping():
+    metrics = Metrics(enabled=True)
+    metrics.observe('a\\b"c\nd', 0.001)
+    assert 'codelookup_calls_total{function="a\\\\b\\"c\\nd"} 1' in metrics.to_prometheus().splitlines()
+
+
+def test_dump_picks_format_from_extension(tmp_path):
+    metrics, _ = _recorded()
+    metrics.dump(str(tmp_path / "m.json"))
+    metrics.dump(str(tmp_path / "m.prom"))
+    assert json.loads((tmp_path / "m.json").read_text())["metrics"]["render"]["calls"] == 2
+    assert (tmp_path / "m.prom").read_text().startswith("# HELP codelookup_calls_total")
+    assert [p.name for p in sorted(tmp_path.iterdir())] == ["m.json", "m.prom"]  # no temp files left
+
+
+def test_disabled_is_a_no_op():
+    metrics, render = _recorded()
+    metrics.enabled = False
+    metrics.reset()
+    assert render("xyz") == "xyz"
+    assert metrics.series == {}
+    assert json.loads(metrics.to_json())["metrics"] == {}
+
+
+@pytest.fixture
+def enabled():
+    METRICS.reset()
+    METRICS.enabled = True
+    yield METRICS
+    METRICS.enabled = False
+    METRICS.reset()
+
+
+def test_program_is_timed_once(enabled):
+    records = generate_corpus(20, seed=4)
+    text = generate_sas_code(records)
+    # One observation per program; the variables inside it aren't timed on their own
+    assert set(enabled.series) == {"generate_sas_code"}
+    series = enabled.series["generate_sas_code"]
+    assert series.calls == 1
+    assert series.bytes == len(text.encode("utf-8"))
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from sasgen.ordering import OrderIndex, number_in_groups
+
+
+def test_number_in_groups():
+    assert number_in_groups(["a", "b", "a", "a", "b"]) == [1, 1, 2, 3, 2]
+
+
+def _expected(queue, groups):
+    return dict(zip(queue, number_in_groups(groups[key] for key in queue)))
+
+
+def test_random_edits_match_a_full_renumbering():
+    rng = random.Random(7)
+    index = OrderIndex()
+    queue, groups, orders = [], {}, {}
+    for step in range(2000):
+        op = rng.random()
+        if op < 0.4 or len(queue) < 2:
+            key = step
+            groups[key] = rng.randrange(4)
+            queue.append(key)
+            changed = index.append(key, groups[key])
+        elif op < 0.6:
+            key = queue.pop(rng.randrange(len(queue)))
+            del groups[key], orders[key]
+            changed = index.remove(key)
+        elif op < 0.8:
+            key = rng.choice(queue)
+            groups[key] = rng.randrange(4)
+            changed = index.regroup(key, groups[key])
+        else:
+            i, j = rng.sample(range(len(queue)), 2)
+            queue[i], queue[j] = queue[j], queue[i]
+            changed = index.swap(queue[j], queue[i])
+        expected = _expected(queue, groups)
+        # Every entry whose number moved is reported, with its new number
+        assert {k: n for k, n in expected.items() if orders.get(k) != n}.items() <= changed.items()
+        orders.update(changed)
+        assert orders == expected == index.orders()
+    assert len(index) == len(queue)
+
+
+def test_changes_stay_local():
+    index = OrderIndex()
+    for key, group in enumerate("aababc"):
+        index.append(key, group)
+    assert index.remove(0) == {1: 1, 3: 2}
+    changed = index.swap(1, 4)
+    assert changed.items() <= index.orders().items()
+    assert 5 not in changed  # group c is untouched
+    assert index.regroup(4, "b") == {}  # already in b
+
+
+def test_duplicate_keys():
+    index = OrderIndex()
+    index.append("x", 1)
+    with pytest.raises(KeyError):
+        index.append("x", 2)
@@ -0,0 +1,61 @@
+import pytest
+
+from golden import generate_corpus
+from sasgen.core import generate_sas_for_variable
+from sasgen.preview import VariablePreview
+
+
+def _lines(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_matches_generate_sas_for_variable():
+    preview = VariablePreview()
+    for var_data in generate_corpus(60, seed=5):
+        assert preview.render(var_data) == "\n".join(generate_sas_for_variable(var_data))
+        numbered = dict(var_data, indicator_sort=3)
+        assert preview.render(numbered) == "\n".join(generate_sas_for_variable(numbered))
+
+
+def test_edits_rerender_from_cache():
+    var_data = generate_corpus(1, seed=6)[0]
+    var_data["levels"] = ["Yes", "No"]
+    preview = VariablePreview()
+    preview.render(var_data)
+    # Typing in a level, then editing a variable field
+    for edit in ({"levels": ["Yes", "Nope"]}, {"levels": ["Yes", "Nope", ""]}, {"description": 'Told "asthma" & 50%'}):
+        var_data = dict(var_data, **edit)
+        assert preview.render(var_data) == "\n".join(generate_sas_for_variable(var_data))
+
+
+def test_incomplete_form():
+    # What the Shiny form sends before anything is filled in: no survey
+    # fields, blank text and no levels yet
+    blank = {"dataset": "", "var_code": "", "var_name": "", "description": "", "var_type": "Indicator",
+             "topic": "", "sub_topic": "", "levels": []}
+    preview = VariablePreview()
+    assert preview.render(blank) == ""
+    with pytest.raises(KeyError):
+        generate_sas_for_variable(blank)  # the queue never sees a record like this
+
+    text = preview.render(dict(blank, levels=["", ""]))
+    assert _lines(text, "VarValID = ") == ["VarValID = 1;", "VarValID = 2;"]
+    assert _lines(text, "VarCode = ") == ['VarCode = "";', 'VarCode = "";']
+    assert _lines(text, "Dataset_Name = ") == ['Dataset_Name = "";'] * 2
+    assert _lines(text, "Tag = ") == ['Tag = "_";'] * 2
+    # Not queued yet, so not numbered
+    assert _lines(text, "Indicator_SortOrder = ") == ["Indicator_SortOrder = ;"] * 2
+
+
+def test_invalid_input():
+    var_data = {"dataset": "CHS", "var_code": "X", "var_name": None, "description": None, "var_type": "Indicator",
+                "topic": "No such topic", "sub_topic": "Nor this", "levels": ["a */ b", "R&D"]}
+    text = VariablePreview().render(var_data)
+    # Unknown taxonomy shows as 0 rather than failing
+    assert set(_lines(text, "Topic_ID = ")) == {"Topic_ID = 0;"}
+    assert set(_lines(text, "SubTopic_ID = ")) == {"SubTopic_ID = 0;"}
+    assert set(_lines(text, "Topic_SortOrder = ")) == {"Topic_SortOrder = 0;"}
+    # Missing text renders as empty literals; level names are still escaped
+    assert set(_lines(text, "Description = ")) == {'Description = "";'}
+    assert "/* a * / b */" in text
+    assert _lines(text, "VarValue = ") == ['VarValue = "a */ b";', "VarValue = 'R&D';"]
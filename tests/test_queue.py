@@ -0,0 +1,105 @@
+import random
+
+from sasgen.core import order_group
+from sasgen.ordering import number_in_groups
+from sasgen.queue import VariableQueue
+
+
+def _record(code, topic="Smoking", sub_topic="", var_type="Indicator"):
+    return {"var_code": code, "var_type": var_type, "topic": topic, "sub_topic": sub_topic}
+
+
+def _check(queue):
+    # Every record carries the number a full renumbering would give it
+    records = list(queue)
+    expected = number_in_groups(order_group(r) for r in records)
+    assert [r["indicator_sort"] for r in records] == expected
+    assert queue.index.orders() == dict(zip(queue.order, expected))
+    assert sorted(queue.records) == sorted(queue.order)
+
+
+def test_add_numbers_within_groups():
+    queue = VariableQueue()
+    ids = [queue.add(_record(c, topic=t)) for c, t in [("a", "Smoking"), ("b", "Asthma"), ("c", "Smoking")]]
+    assert ids == [1, 2, 3]
+    assert [r["indicator_sort"] for r in queue] == [1, 1, 2]
+    _check(queue)
+
+
+def test_add_copies_the_record():
+    queue = VariableQueue()
+    var_data = _record("a")
+    queue.add(var_data)
+    assert "indicator_sort" not in var_data
+
+
+def test_update_renumbers_old_and_new_group():
+    queue = VariableQueue()
+    a, b, c, d = (queue.add(_record(code)) for code in "abcd")
+    old = queue.records[c]
+    # b moves to another topic: c and d move up in Smoking
+    assert sorted(queue.update(b, _record("b", topic="Asthma"))) == [c, d]
+    assert queue.records[b]["indicator_sort"] == 1
+    assert queue.records[c]["indicator_sort"] == 2
+    assert old["indicator_sort"] == 3  # replaced, not changed in place
+    # Editing without changing the group renumbers nothing else
+    assert queue.update(a, _record("A")) == []
+    assert queue.records[a]["var_code"] == "A"
+    _check(queue)
+
+
+def test_remove_renumbers_later_members_only():
+    queue = VariableQueue()
+    a, b, c = (queue.add(_record(code)) for code in "abc")
+    other = queue.add(_record("x", topic="Asthma"))
+    assert queue.remove(b) == [c]
+    assert queue.order == [a, c, other]
+    assert b not in queue
+    assert queue.remove(other) == []
+    _check(queue)
+
+
+def test_move():
+    queue = VariableQueue()
+    a, b = queue.add(_record("a")), queue.add(_record("b"))
+    c = queue.add(_record("c", topic="Asthma"))
+    assert sorted(queue.move(b, -1)) == [a, b]
+    assert queue.order == [b, a, c]
+    # Across groups nobody is renumbered
+    assert queue.move(c, -1) == []
+    assert queue.order == [b, c, a]
+    # Moves past either end are ignored
+    assert queue.move(b, -1) == [] and queue.move(a, 1) == []
+    assert queue.order == [b, c, a]
+    _check(queue)
+
+
+def test_clear():
+    queue = VariableQueue()
+    for code in "abc":
+        queue.add(_record(code))
+    queue.clear()
+    assert len(queue) == 0 and list(queue) == []
+    assert queue.add(_record("d")) == 4  # ids are never reused
+    _check(queue)
+
+
+def test_random_handler_sequence():
+    rng = random.Random(11)
+    queue = VariableQueue()
+    topics = ["Smoking", "Asthma", "Unknown"]
+    for step in range(1500):
+        op = rng.random()
+        if op < 0.4 or len(queue) < 2:
+            queue.add(_record(str(step), topic=rng.choice(topics)))
+        elif op < 0.55:
+            queue.remove(rng.choice(queue.order))
+        elif op < 0.75:
+            item_id = rng.choice(queue.order)
+            before = {i: r["indicator_sort"] for i, r in queue.records.items()}
+            renumbered = queue.update(item_id, _record(str(step), topic=rng.choice(topics)))
+            # Only the reported records changed number
+            assert {i for i, r in queue.records.items() if i != item_id and r["indicator_sort"] != before[i]} == set(renumbered)
+        else:
+            queue.move(rng.choice(queue.order), rng.choice([-1, 1]))
+        _check(queue)
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from sasgen.sasmeta import import_files, parse_format_source, read_cntlout, read_header
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+NAMES = ["SMOKER", "SEX", "AGEGRP", "WEIGHT", "BORO"]
+FORMATS = ["YESNO", "$SEXF", "AGEF", "BEST12.", ""]
+NUMERIC = [True, False, True, True, False]
+LEVELS = {
+    "SMOKER": ["Yes", "No"],
+    "SEX": ["Male", "Female"],
+    "AGEGRP": ["18-24", "25-44", "45-64", "65+"],
+    "WEIGHT": [],
+    "BORO": [],
+}
+
+
+def _path(name):
+    return os.path.join(DATA, name)
+
+
+@pytest.mark.parametrize("name", ["survey.sas7bdat", "survey32be.sas7bdat", "survey.xpt"])
+def test_dataset_headers(name):
+    info = read_header(_path(name))
+    assert info.name == "SURVEY"
+    assert [c.name for c in info.columns] == NAMES
+    assert [c.format for c in info.columns] == FORMATS
+    assert [c.numeric for c in info.columns] == NUMERIC
+    assert [c.length for c in info.columns] == [8, 1, 8, 8, 13]
+    assert info.columns[0].label == "Current smoker"
+
+
+def test_labels_keep_their_encoding():
+    assert read_header(_path("survey.sas7bdat")).columns[-1].label == "Borough of residence – NYC"
+    assert read_header(_path("survey.xpt")).columns[-1].label == "Borough of residence - NYC"
+
+
+def test_cntlout_and_format_source_agree():
+    expected = {"YESNO": ["Yes", "No"], "$SEXF": ["Male", "Female"], "AGEF": ["18-24", "25-44", "45-64", "65+"]}
+    assert read_cntlout(read_header(_path("formats.xpt"))) == expected
+    with open(_path("formats.sas"), encoding="utf-8") as fh:
+        assert parse_format_source(fh.read()) == expected
+
+
+@pytest.mark.parametrize("formats", ["formats.xpt", "formats.sas"])
+@pytest.mark.parametrize("dataset", ["survey.sas7bdat", "survey.xpt"])
+def test_import_files(dataset, formats):
+    result = import_files([_path(dataset), _path(formats)], {"dataset": "CHS", "level_set": "ls-x"})
+    assert [d.name for d in result.datasets] == ["SURVEY"]
+    assert result.formats == 3
+    assert {r["var_code"]: r["levels"] for r in result.records} == LEVELS
+    assert all(r["dataset"] == "CHS" and r["var_name"] == "" and "level_set" not in r for r in result.records)
+
+
+def test_unsupported_files():
+    with pytest.raises(ValueError, match="not a SAS7BDAT"):
+        read_header(_path("survey.xpt"), name="survey.sas7bdat")
+    with pytest.raises(ValueError, match="format catalogs"):
+        import_files([_path("formats.sas")], {}, names=["formats.sas7bcat"])
+    with pytest.raises(ValueError, match="expected .sas7bdat"):
+        import_files([_path("formats.sas")], {}, names=["formats.csv"])
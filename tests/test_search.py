@@ -0,0 +1,95 @@
+from sasgen.search import (
+    EXACT_SCORING_LIMIT, KIND_SUBTOPIC, KIND_TOPIC, KIND_VARIABLE, VOCAB_MERGE_THRESHOLD, SearchIndex, search_many,
+    taxonomy_index,
+)
+
+
+def _variable(code, name, description=""):
+    return {"var_code": code, "var_name": name, "description": description}
+
+
+def test_prefix_fuzzy_and_multiword():
+    index = SearchIndex()
+    smoker = index.add_variable(_variable("SMOKE1", "Current smoker", "Smokes cigarettes daily"))
+    index.add_variable(_variable("ASTHMA", "Asthma ever", "Ever told asthma"))
+    assert [r.doc_id for r in index.search("smok")] == [smoker]
+    assert [r.doc_id for r in index.search("cigarets")] == [smoker]  # typo
+    assert [r.doc_id for r in index.search("current daily")] == [smoker]
+    assert index.search("current asthma") == []
+    assert index.search("") == []
+
+
+def test_remove_keeps_other_ids():
+    index = SearchIndex()
+    ids = [index.add_variable(_variable(f"V{i}", f"name {i}"), payload=i) for i in range(5)]
+    index.remove(ids[1])
+    index.remove(ids[1])  # already gone
+    assert len(index) == 4
+    assert {r.payload for r in index.search("name")} == {0, 2, 3, 4}
+    again = index.add_variable(_variable("V1", "name 1"), payload=1)
+    assert again not in ids
+    index.remove(ids[3])
+    assert {r.payload for r in index.search("name")} == {0, 1, 2, 4}
+
+
+def test_removed_documents_free_their_slots():
+    index = SearchIndex()
+    for i in range(10_000):
+        index.remove(index.add_variable(_variable(f"V{i}", "temporary")))
+    keep = index.add_variable(_variable("KEEP", "kept"))
+    assert len(index._docs) == 1
+    assert [r.doc_id for r in index.search("kept")] == [keep]
+
+
+def test_readded_tokens_are_not_duplicated():
+    index = SearchIndex()
+    doc = index.add_variable(_variable("X", "zebra"))
+    for _ in range(3):
+        index.remove(doc)
+        doc = index.add_variable(_variable("X", "zebra"))
+    vocab = index._vocab + index._pending
+    assert vocab.count("zebra") == 1
+    assert list(index._prefix_range("zeb")) == ["zebra"]
+
+
+def test_merge_drops_dead_and_duplicate_tokens():
+    index = SearchIndex()
+    doc = index.add_variable(_variable("X", "alpha"))
+    index.remove(doc)
+    index.add_variable(_variable("Y", "alpha beta"))
+    index.remove(index.add_variable(_variable("Z", "gamma")))
+    for i in range(VOCAB_MERGE_THRESHOLD):
+        index.add_variable(_variable(f"T{i}", f"token{i}"))  # forces merges along the way
+    index._merge_vocab()
+    assert index._vocab == sorted(set(index._vocab))
+    assert set(index._vocab) == set(index._postings)
+
+
+def test_taxonomy_and_search_many():
+    taxonomy = taxonomy_index()
+    queue = SearchIndex()
+    queue.add_variable(_variable("SLP", "Sleep hours"))
+    kinds = {r.kind for r in search_many([taxonomy, queue], "sleep", limit=20)}
+    assert kinds == {KIND_TOPIC, KIND_SUBTOPIC, KIND_VARIABLE}
+    top = taxonomy.search("mental health counseling")[0]
+    assert top.payload == ("Mental Health", "Mental Health Counseling and Treatment")
+
+
+def test_rare_combination_of_common_words():
+    index = SearchIndex()
+    for i in range(2 * EXACT_SCORING_LIMIT):
+        index.add_variable(_variable(f"Y{i}", "youth", f"item {i}"))
+        index.add_variable(_variable(f"S{i}", "smoking", f"item {i}"))
+    both = {index.add_variable(_variable(f"B{i}", "youth smoking")) for i in range(10)}
+    assert {r.doc_id for r in index.search("youth smoking", limit=20)} == both
+
+
+def test_exact_token_comes_first():
+    index = SearchIndex()
+    for word in ("agent", "agency", "age"):
+        index.add_variable(_variable(word.upper(), word))
+    index._merge_vocab()
+    index.add_variable(_variable("AG", "ag"))  # still in the pending list
+    term = index._term("ag")
+    assert list(index._term_tokens(term))[0] == "ag"
+    assert index.search("ag")[0].label == "AG - ag"
@@ -0,0 +1,83 @@
+import pytest
+
+from sasgen.levelsets import LevelSet
+from sasgen.sessions import MAX_BYTES_ENV, MAX_QUEUE_ENV, SessionRegistry, record_bytes, registry_from_env
+
+
+def _record(levels):
+    return {"dataset": "CHS", "var_code": "SMOKER", "var_name": "smoker", "levels": levels}
+
+
+def test_accounting():
+    registry = SessionRegistry()
+    usage = registry.open("a")
+    usage.add(100)
+    usage.add(50)
+    usage.resize(50, 80)
+    usage.remove(100)
+    assert (usage.items, usage.bytes) == (1, 80)
+    assert registry.snapshot() == [{"session": "a", "items": 1, "bytes": 80}]
+    assert usage.describe() == "Queue: 1 variable(s), ~80 B"
+
+
+def test_record_bytes_skips_shared_level_sets():
+    levels = ["Yes", "No", "Don't know"]
+    own = record_bytes(_record(list(levels)))
+    shared = record_bytes(_record(LevelSet("Yes/No", levels)))
+    assert own > shared
+    assert record_bytes(_record(levels + ["Refused"])) > own
+
+
+def test_item_cap():
+    registry = SessionRegistry(max_items=2)
+    usage = registry.open("a")
+    for _ in range(2):
+        assert registry.check_add(usage, 10) is None
+        usage.add(10)
+    assert "limit 2" in registry.check_add(usage, 10)
+    # An edit replaces a record, so the item cap doesn't apply
+    assert registry.check_resize(usage, 10, 10) is None
+
+
+def test_byte_cap_on_add_and_edit():
+    registry = SessionRegistry(max_bytes=1000)
+    usage = registry.open("a")
+    usage.add(600)
+    assert registry.check_add(usage, 400) is None
+    assert "memory limit" in registry.check_add(usage, 401)
+    # Edits are checked on the size difference
+    assert registry.check_resize(usage, 600, 1000) is None
+    assert "memory limit" in registry.check_resize(usage, 600, 1001)
+    # Shrinking is allowed even when the session is already over the cap
+    registry.max_bytes = 500
+    assert registry.check_resize(usage, 600, 550) is None
+    assert "memory limit" in registry.check_resize(usage, 600, 601)
+
+
+def test_closed_sessions_are_dropped():
+    registry = SessionRegistry(max_items=1)
+    a = registry.open("a")
+    a.add(10)
+    b = registry.open("b")
+    b.add(20)
+    assert registry.totals() == {"sessions": 2, "items": 2, "bytes": 30}
+    # Caps are per session
+    assert registry.check_add(a, 1) and registry.check_add(b, 1)
+    registry.close("a")
+    registry.close("a")  # closing twice is harmless
+    assert registry.totals() == {"sessions": 1, "items": 1, "bytes": 20}
+    assert [u["session"] for u in registry.snapshot()] == ["b"]
+
+
+def test_registry_from_env(monkeypatch):
+    monkeypatch.delenv(MAX_QUEUE_ENV, raising=False)
+    monkeypatch.setenv(MAX_BYTES_ENV, " 2048 ")
+    registry = registry_from_env()
+    assert (registry.max_items, registry.max_bytes) == (0, 2048)
+
+
+@pytest.mark.parametrize("value", ["lots", "1.5", "-1"])
+def test_registry_from_env_rejects_bad_values(monkeypatch, value):
+    monkeypatch.setenv(MAX_QUEUE_ENV, value)
+    with pytest.raises(ValueError, match=MAX_QUEUE_ENV):
+        registry_from_env()
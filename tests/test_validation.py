@@ -0,0 +1,43 @@
+from sasgen.validation import MAX_LEVELS, RuleSet, validate_records
+
+
+def _record(levels, **fields):
+    record = {
+        "dataset": "CHS",
+        "var_code": "smoker",
+        "var_name": "Smoker",
+        "description": "Current smoker",
+        "var_type": "Indicator",
+        "topic": "Healthy Living",
+        "sub_topic": "Screening",
+        "levels": levels,
+    }
+    record.update(fields)
+    return record
+
+
+def test_batches_accept_long_level_lists():
+    levels = [f"Level {i}" for i in range(1, 41)]
+    assert validate_records([_record(levels)]) == []
+
+
+def test_minimum_levels_still_enforced():
+    errors = validate_records([_record(["Only one"])])
+    assert [(e.index, e.field) for e in errors] == [(0, "levels")]
+    assert "at least 2" in errors[0].message
+
+
+def test_form_limit_on_request():
+    rules = RuleSet(max_levels=MAX_LEVELS)
+    errors = rules.validate([_record(["a", "b"]), _record([str(i) for i in range(MAX_LEVELS + 1)])])
+    assert [(e.index, e.field) for e in errors] == [(1, "levels")]
+    assert "2-6" in errors[0].message
+
+
+def test_reports_every_problem_and_caches():
+    rules = RuleSet()
+    bad = _record(["Yes", ""], var_code="", sub_topic="Housing")
+    errors = rules.validate([bad, _record(["Yes", "No"])])
+    assert {(e.index, e.field) for e in errors} == {(0, "var_code"), (0, "sub_topic"), (0, "levels[2]")}
+    rules.validate([bad])
+    assert rules.hits == 1
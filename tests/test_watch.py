@@ -0,0 +1,95 @@
+import csv
+import os
+
+import pytest
+
+from sasgen.core import generate_sas_code
+from sasgen.watch import CODEBOOK_COLUMNS, CodebookWatcher, row_to_record
+
+ROWS = [
+    ["CHS", "smoker", "Smoker", "Current smoker", "Indicator", "Healthy Living", "Screening", "Yes|No"],
+    ["CHS", "flu", "Flu shot", "Flu shot in the past year", "Indicator", "Healthy Living", "Screening", "Yes|No"],
+    ["YRBS", "sex", "Sex", "Sex of student", "Demographic", "", "", "Male|Female"],
+    ["CHS", "mammo", "Mammogram", "Mammogram in 2 years", "Indicator", "Healthy Living", "Screening", "Yes|No"],
+]
+
+
+def _write(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(CODEBOOK_COLUMNS)
+        writer.writerows(rows)
+
+
+def _expected(rows):
+    return generate_sas_code([row_to_record(dict(zip(CODEBOOK_COLUMNS, row))) for row in rows])
+
+
+def _output(path):
+    with open(path, encoding="utf-8", newline="") as fh:
+        return fh.read()
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "codebook.csv"), str(tmp_path / "codebook.sas")
+
+
+def _same(expected, text):
+    return text == expected
+
+
+def test_first_refresh_renders_everything(paths):
+    codebook, output = paths
+    _write(codebook, ROWS)
+    stats = CodebookWatcher(codebook, output).refresh()
+    assert (stats.rows, stats.rendered, stats.invalid) == (4, 4, 0)
+    assert _same(_expected(ROWS), _output(output))
+
+
+def test_only_edited_rows_are_rendered(paths):
+    codebook, output = paths
+    _write(codebook, ROWS)
+    watcher = CodebookWatcher(codebook, output)
+    watcher.refresh()
+    mtime = os.stat(output).st_mtime_ns
+    assert watcher.refresh().rendered == 0
+    assert os.stat(output).st_mtime_ns == mtime  # unchanged output isn't rewritten
+
+    edited = [list(row) for row in ROWS]
+    edited[2][3] = "Sex of student (self-reported)"
+    _write(codebook, edited)
+    stats = watcher.refresh()
+    assert (stats.rendered, stats.removed) == (1, 1)
+    assert _same(_expected(edited), _output(output))
+
+
+def test_insert_renumbers_later_rows_of_the_group(paths):
+    codebook, output = paths
+    _write(codebook, ROWS)
+    watcher = CodebookWatcher(codebook, output)
+    watcher.refresh()
+    new = ["CHS", "pap", "Pap test", "Pap test in 3 years", "Indicator", "Healthy Living", "Screening", "Yes|No"]
+    inserted = ROWS[:1] + [new] + ROWS[1:]
+    _write(codebook, inserted)
+    # The new row, then flu and mammo move down one in their group; sex is reused
+    assert watcher.refresh().rendered == 3
+    assert _same(_expected(inserted), _output(output))
+
+
+def test_invalid_rows_are_reported_and_skipped(paths):
+    codebook, output = paths
+    bad = ["CHS", "", "Blank code", "No code", "Indicator", "Healthy Living", "Screening", "Yes|No"]
+    _write(codebook, ROWS[:2] + [bad])
+    stats = CodebookWatcher(codebook, output).refresh()
+    assert stats.invalid == 1
+    assert stats.errors and stats.errors[0].startswith("row 4: var_code")
+    assert _same(_expected(ROWS[:2]), _output(output))
+
+
+def test_missing_columns(paths):
+    codebook, output = paths
+    with open(codebook, "w", encoding="utf-8") as fh:
+        fh.write("dataset,var_code\nCHS,x\n")
+    with pytest.raises(ValueError, match="missing required columns"):
+        CodebookWatcher(codebook, output).refresh()
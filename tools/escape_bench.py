@@ -0,0 +1,90 @@
+"""Overhead of SAS literal escaping in the renderer.
+
+Renders the golden corpus (see tools/golden.py) with ``generate_sas_code`` as
+shipped and again with sasgen.core's ``sas_literal``/``sas_comment`` swapped
+for functions that only add the double quotes, which is the unescaped output
+the renderer produced before escaping. Two corpora are timed: the golden one,
+where quotes, ``&``, ``%`` and ``*/`` are common, and a clean copy with those
+characters removed, where every field takes the fast path (and both variants
+must match exactly).
+
+    python tools/escape_bench.py --records 5000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from golden import generate_corpus  # noqa: E402
+
+import sasgen.core as core  # noqa: E402
+from sasgen.escaping import clear_caches  # noqa: E402
+
+
+def _unescaped_literal(text: str) -> str:
+    return '"' + text + '"'
+
+
+def _unescaped_comment(text: str) -> str:
+    return text
+
+
+def time_render(records: List[Dict[str, Any]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        clear_caches()  # each run starts cold, so cached escapes aren't free
+        start = time.perf_counter()
+        core.generate_sas_code(records)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def without_escaping(fn: Callable[[], Any]) -> Any:
+    saved = core.sas_literal, core.sas_comment
+    core.sas_literal, core.sas_comment = _unescaped_literal, _unescaped_comment
+    try:
+        return fn()
+    finally:
+        core.sas_literal, core.sas_comment = saved
+
+
+def clean(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def scrub(text: str) -> str:
+        for special in ('"', "&", "%", "*/"):
+            text = text.replace(special, "")
+        return text
+
+    out = []
+    for r in records:
+        r = {k: scrub(v) if isinstance(v, str) else v for k, v in r.items()}
+        r["levels"] = [scrub(level) for level in r["levels"]]
+        out.append(r)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per variant (best is kept)")
+    args = parser.parse_args()
+
+    golden = generate_corpus(args.records, args.seed)
+    for name, records in (("golden", golden), ("clean", clean(golden))):
+        fields = [v for r in records for v in (r["description"], r["var_name"], *r["levels"])]
+        quoted = sum(1 for v in fields if '"' in v or "&" in v or "%" in v)
+        escaped = time_render(records, args.repeat)
+        unescaped = without_escaping(lambda: time_render(records, args.repeat))
+        if name == "clean":
+            same = core.generate_sas_code(records) == without_escaping(lambda: core.generate_sas_code(records))
+            assert same, "escaping changed output with nothing to escape"
+        print(
+            f"{name:<7} {len(records)} records, {quoted}/{len(fields)} fields to escape: "
+            f"unescaped {unescaped:.3f}s, escaped {escaped:.3f}s ({(escaped / unescaped - 1) * 100:+.1f}%)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+"""Golden-output regression harness for the SAS renderers.
+
+Checks every rendering engine byte-for-byte against the reference renderer:
+the original ``template.format(**fields)`` loop from app/app.py, run on a
+frozen copy of the template in tools/golden/template.sas rather than on
+sasgen.core.SAS_TEMPLATE, so editing the template can't silently move the
+reference along with it. Two checks run:
+
+* the frozen corpus (tools/golden/corpus.jsonl) must render to exactly
+  tools/golden/expected.sas, with the reference and with every engine;
+* a large seeded corpus is rendered by every engine and compared with the
+  reference, and throughput is measured per engine.
+
+    python tools/golden.py --records 5000 --seed 1
+    python tools/golden.py --save golden/      # keep corpus.jsonl + reference.sas
+    python tools/golden.py --freeze            # after an intentional output change
+
+``--freeze`` copies the current SAS_TEMPLATE to tools/golden/template.sas
+and rewrites expected.sas. Commit both with the change that needed them.
+
+The corpus covers every survey in SURVEYS, every topic/subtopic pair in TOPICS,
+both variable types, unicode, braces, quotes, & and %, very long descriptions
+and 2-300 levels per variable. The pandas engines are skipped when pandas is missing.
+Exits non-zero if any engine differs from the reference.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from sasgen.core import (  # noqa: E402
+    SURVEYS, TOPICS, generate_sas_code, generate_sas_for_variable, order_group,
+)
+from sasgen.ordering import OrderIndex  # noqa: E402
+
+Engine = Callable[[List[Dict[str, Any]]], str]
+
+FROZEN_DIR = os.path.join(ROOT, "tools", "golden")
+FROZEN_TEMPLATE = os.path.join(FROZEN_DIR, "template.sas")
+FROZEN_CORPUS = os.path.join(FROZEN_DIR, "corpus.jsonl")
+FROZEN_EXPECTED = os.path.join(FROZEN_DIR, "expected.sas")
+
+WORDS = [
+    "adults", "youth", "smoking", "asthma", "diabetes", "ever", "told", "current", "daily",
+    "household", "income", "insurance", "borough", "weight", "obesity", "drinking", "sleep",
+]
+UNICODE_WORDS = ["Niño", "café", "Ünïcödé", "naïve", "中文", "русский", "ελληνικά", "日本語", "🙂", "–", "’"]
+# Text that has broken format-based renderers before: braces, quotes,
+# semicolons, and the macro triggers & and % that need single quotes
+AWKWARD = [
+    "{var_code}", "{0}", "{{", "}}", '"quoted"', 'say "', "semi;colon", "back\\slash", "100%", "*/", "/*",
+    "it's", "'", "R&D", "&sysdate", "%put", "50%-75%",
+]
+
+
+# === Reference renderer ===
+
+def reference_ids(var_type: str, topic: str, sub_topic: str) -> Dict[str, int]:
+    topic_id = TOPICS.get(topic, {}).get("id", 0) if topic else 0
+    subtopic_id = 0
+    if var_type == "Indicator" and topic in TOPICS:
+        subtopic_id = TOPICS.get(topic, {}).get("subtopics", {}).get(sub_topic, 0)
+    return {"topic_id": topic_id, "subtopic_id": subtopic_id}
+
+
+def reference_sort_orders(var_type: str, topic: str, sub_topic: str) -> Dict[str, int]:
+    topic_sort = list(TOPICS).index(topic) + 1 if topic in TOPICS else 0
+    subtopic_sort = 0
+    if var_type == "Indicator" and topic in TOPICS and sub_topic in TOPICS[topic]["subtopics"]:
+        subtopic_sort = list(TOPICS[topic]["subtopics"]).index(sub_topic) + 1
+    return {"topic_sort": topic_sort, "subtopic_sort": subtopic_sort}
+
+
+def reference_escape(text: str) -> str:
+    # Single quotes stop SAS from resolving &macro and %macro references
+    if "&" in text or "%" in text:
+        return "'" + text.replace("'", "''") + "'"
+    return '"' + text.replace('"', '""') + '"'  # codelookup.java's escapeQuotes
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="utf-8", newline="") as fh:
+        return fh.read()
+
+
+def reference_template() -> str:
+    """The frozen template the reference renders with."""
+    return _read(FROZEN_TEMPLATE)
+
+
+def reference_render(records: List[Dict[str, Any]], template: Optional[str] = None) -> str:
+    """The original per-level ``template.format`` loop, plus naive sort orders and escaping."""
+    template = reference_template() if template is None else template
+    esc = reference_escape
+    parts: List[str] = []
+    seen: Dict[Tuple[int, int], int] = {}
+    for var_data in records:
+        ids = reference_ids(var_data["var_type"], var_data.get("topic", ""), var_data.get("sub_topic", ""))
+        sorts = reference_sort_orders(var_data["var_type"], var_data.get("topic", ""), var_data.get("sub_topic", ""))
+        group = (ids["topic_id"], ids["subtopic_id"])
+        seen[group] = seen.get(group, 0) + 1
+        for idx, val in enumerate(var_data["levels"], start=1):
+            parts.append(
+                template.format(
+                    varvalid=idx,
+                    topic_id=ids["topic_id"],
+                    subtopic_id=ids["subtopic_id"],
+                    dataset=esc(var_data["dataset"]),
+                    dataset_name=esc(var_data["dataset_name"]),
+                    var_code=esc(var_data["var_code"]),
+                    var_value=esc(val),
+                    var_value_comment=val.replace("*/", "* /"),
+                    var_type=esc(var_data["var_type"]),
+                    var_name=esc(var_data["var_name"]),
+                    description=esc(var_data["description"]),
+                    topic=esc(var_data.get("topic", "")),
+                    sub_topic=esc(var_data.get("sub_topic", "")),
+                    population=esc(var_data["population"]),
+                    tag=esc(f"{var_data['var_name']}_{var_data['tag_suffix']}"),
+                    topic_sort=sorts["topic_sort"],
+                    subtopic_sort=sorts["subtopic_sort"],
+                    indicator_sort=seen[group],
+                )
+            )
+            parts.append("")  # blank line between entries
+    return "\n".join(parts)
+
+
+# === Corpus ===
+
+def _phrase(rng: random.Random, n: int) -> str:
+    pool = WORDS if rng.random() < 0.7 else WORDS + UNICODE_WORDS + AWKWARD
+    return " ".join(rng.choice(pool) for _ in range(n))
+
+
+def _level_count(rng: random.Random) -> int:
+    roll = rng.random()
+    if roll < 0.80:
+        return rng.randint(2, 6)
+    if roll < 0.97:
+        return rng.randint(7, 40)
+    return rng.randint(41, 300)
+
+
+def _taxonomy_pairs() -> List[Tuple[str, str]]:
+    return [(topic, sub) for topic, info in TOPICS.items() for sub in info["subtopics"]]
+
+
+def generate_corpus(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """``n`` deterministic records; the first ones walk every survey and taxonomy pair.
+
+    Many records share level lists from a small pool, as real codebooks do.
+    """
+    rng = random.Random(seed)
+    pairs = _taxonomy_pairs()
+    shared_levels = [[_phrase(rng, rng.randint(1, 3)) for _ in range(_level_count(rng))] for _ in range(20)]
+    surveys = list(SURVEYS)
+    records: List[Dict[str, Any]] = []
+    for i in range(n):
+        dataset = surveys[i % len(surveys)]
+        survey = SURVEYS[dataset]
+        if i < len(pairs):
+            topic, sub_topic = pairs[i]
+            var_type = "Indicator"
+        else:
+            var_type = rng.choice(("Indicator", "Demographic"))
+            topic, sub_topic = rng.choice(pairs)
+            roll = rng.random()
+            if var_type == "Demographic" and roll < 0.7:
+                topic = sub_topic = ""  # what the apps store for Demographics
+            elif roll < 0.03:
+                topic, sub_topic = "Unknown Topic", "Unknown Subtopic"
+        if rng.random() < 0.02:
+            description = _phrase(rng, rng.randint(500, 2000))  # very long
+        else:
+            description = _phrase(rng, rng.randint(0, 25))
+        if rng.random() < 0.4:
+            levels = list(rng.choice(shared_levels))
+        else:
+            levels = [
+                _phrase(rng, rng.randint(1, 4)) if rng.random() > 0.01 else ""
+                for _ in range(_level_count(rng))
+            ]
+        records.append({
+            "dataset": dataset,
+            "dataset_name": survey["full_name"],
+            "population": survey["population"],
+            "tag_suffix": survey["tag_suffix"],
+            "var_code": f"v{i:06d}",
+            "var_name": f"{_phrase(rng, 1)}_{i}",
+            "description": description,
+            "var_type": var_type,
+            "topic": topic,
+            "sub_topic": sub_topic,
+            "levels": levels,
+        })
+    return records
+
+
+# === Engines ===
+
+def engine_core(records: List[Dict[str, Any]]) -> str:
+    return generate_sas_code(records)
+
+
+def engine_per_variable(records: List[Dict[str, Any]]) -> str:
+    # How the Shiny app assembles the program from per-item outputs, each item
+    # numbered by the session's OrderIndex as it is queued
+    index = OrderIndex()
+    numbered = []
+    for i, var_data in enumerate(records):
+        index.append(i, order_group(var_data))
+        numbered.append(dict(var_data, indicator_sort=index.order(i)))
+    return "\n".join(p for var_data in numbered for p in generate_sas_for_variable(var_data))
+
+
+def engine_ordering_incremental(records: List[Dict[str, Any]]) -> str:
+    # Queue every record with a decoy before it, then remove the decoys and
+    # swap neighbours back and forth; only the reported changes are applied.
+    index = OrderIndex()
+    numbered: Dict[Any, Dict[str, Any]] = {}
+
+    def apply(changed: Dict[Any, int]) -> None:
+        for key, n in changed.items():
+            if key in numbered:
+                numbered[key]["indicator_sort"] = n
+
+    for i, var_data in enumerate(records):
+        index.append(("decoy", i), order_group(records[(i * 7) % len(records)]))
+        numbered[i] = dict(var_data)
+        apply(index.append(i, order_group(var_data)))
+    for i in range(len(records)):
+        apply(index.remove(("decoy", i)))
+    for i in range(0, len(records) - 1, 2):
+        apply(index.swap(i, i + 1))
+        apply(index.swap(i, i + 1))
+    return "\n".join(p for i in range(len(records)) for p in generate_sas_for_variable(numbered[i]))
+
+
+def engine_core_metrics(records: List[Dict[str, Any]]) -> str:
+    from sasgen.metrics import METRICS
+
+    METRICS.enabled = True
+    try:
+        return generate_sas_code(records)
+    finally:
+        METRICS.enabled = False
+        METRICS.reset()
+
+
+def _cache_engine(mode: str) -> Engine:
+    # "cold": empty cache. "reopen": the same program was rendered before a
+    # restart, so it is read back from disk. "edited": the queue was rendered
+    # with the first variable's description different, so that variable and the
+    # program are new but every other variable is in memory.
+    def render(records: List[Dict[str, Any]]) -> str:
+        from sasgen.cache import RenderCache
+
+        with tempfile.TemporaryDirectory() as path:
+            cache = RenderCache(path, max_bytes=1 << 40, memory_bytes=1 << 40)
+            if mode == "reopen":
+                generate_sas_code(records, cache)
+                cache = RenderCache(path, max_bytes=1 << 40, memory_bytes=1 << 40)
+            elif mode == "edited":
+                first = dict(records[0], description=records[0]["description"] + " (edited)")
+                generate_sas_code([first] + records[1:], cache)
+            start = time.perf_counter()
+            text = generate_sas_code(records, cache)
+            render.elapsed = time.perf_counter() - start  # exclude the priming pass
+            return text
+    return render
+
+
+def engine_level_sets(records: List[Dict[str, Any]]) -> str:
+    import copy
+
+    from sasgen.levelsets import LevelSetLibrary, intern_levels
+
+    bound = intern_levels(copy.deepcopy(records), LevelSetLibrary())
+    start = time.perf_counter()
+    text = generate_sas_code(bound)
+    engine_level_sets.elapsed = time.perf_counter() - start  # rendering only
+    return text
+
+
+def _frame_engine(batch_size: int) -> Engine:
+    def render(records: List[Dict[str, Any]]) -> str:
+        import pandas as pd
+        from sasgen.frame import generate_from_frame
+
+        return "\n".join(generate_from_frame(pd.DataFrame(records), batch_size=batch_size))
+    return render
+
+
+def available_engines() -> Dict[str, Engine]:
+    """Every engine/mode that must match the reference renderer."""
+    engines: Dict[str, Engine] = {
+        "core": engine_core,
+        "per-variable": engine_per_variable,
+        "ordering-incremental": engine_ordering_incremental,
+        "core+metrics": engine_core_metrics,
+        "cache-cold": _cache_engine("cold"),
+        "cache-reopen": _cache_engine("reopen"),
+        "cache-edited": _cache_engine("edited"),
+        "level-sets": engine_level_sets,
+    }
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        from sasgen.frame import DEFAULT_BATCH_SIZE
+
+        engines["frame"] = _frame_engine(DEFAULT_BATCH_SIZE)
+        engines["frame-batch7"] = _frame_engine(7)  # exercises batch boundaries
+    return engines
+
+
+# === Harness ===
+
+def first_difference(expected: str, actual: str) -> str:
+    for lineno, (a, b) in enumerate(zip(expected.splitlines(), actual.splitlines()), start=1):
+        if a != b:
+            return f"line {lineno}: expected {a!r}, got {b!r}"
+    return f"length differs: expected {len(expected)} chars, got {len(actual)}"
+
+
+def run_engine(engine: Engine, records: List[Dict[str, Any]], repeat: int) -> Tuple[str, float]:
+    best = float("inf")
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = engine(records)
+        elapsed = getattr(engine, "elapsed", None) or time.perf_counter() - start
+        best = min(best, elapsed)
+    return text, best
+
+
+def iter_results(
+    records: List[Dict[str, Any]], expected: str, engines: Dict[str, Engine], repeat: int
+) -> Iterator[Dict[str, Any]]:
+    nbytes = len(expected.encode("utf-8"))
+    for name, engine in engines.items():
+        text, seconds = run_engine(engine, records, repeat)
+        ok = text == expected
+        yield {
+            "engine": name,
+            "match": ok,
+            "seconds": round(seconds, 4),
+            "records_per_s": round(len(records) / seconds) if seconds else None,
+            "mb_per_s": round(nbytes / seconds / 1e6, 1) if seconds else None,
+            "difference": None if ok else first_difference(expected, text),
+        }
+
+
+def load_frozen_corpus() -> List[Dict[str, Any]]:
+    with open(FROZEN_CORPUS, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def freeze() -> None:
+    """Copy the current SAS_TEMPLATE and re-render expected.sas from the frozen corpus."""
+    from sasgen.core import SAS_TEMPLATE
+
+    with open(FROZEN_TEMPLATE, "w", encoding="utf-8", newline="") as fh:
+        fh.write(SAS_TEMPLATE)
+    records = load_frozen_corpus()
+    with open(FROZEN_EXPECTED, "w", encoding="utf-8", newline="") as fh:
+        fh.write(reference_render(records, SAS_TEMPLATE))
+
+
+def check_frozen(engines: Dict[str, Engine]) -> List[str]:
+    """Names of the engines (or "reference") whose output differs from expected.sas."""
+    records = load_frozen_corpus()
+    expected = _read(FROZEN_EXPECTED)
+    failed = []
+    for name, render in [("reference", reference_render)] + list(engines.items()):
+        text = render(records)
+        if text != expected:
+            print(f"FAIL frozen corpus, {name}: {first_difference(expected, text)}")
+            failed.append(name)
+    return failed
+
+
+def save_golden(path: str, records: List[Dict[str, Any]], expected: str) -> None:
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "corpus.jsonl"), "w", encoding="utf-8") as fh:
+        for record in records:
+            fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+    with open(os.path.join(path, "reference.sas"), "w", encoding="utf-8", newline="") as fh:
+        fh.write(expected)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per engine (best is kept)")
+    parser.add_argument("--engines", nargs="*", help="subset of engines to run")
+    parser.add_argument("--save", help="write corpus.jsonl and reference.sas to this directory")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--freeze", action="store_true", help="rewrite tools/golden/ from the current template")
+    args = parser.parse_args()
+
+    if args.freeze:
+        freeze()
+        print(f"wrote {FROZEN_TEMPLATE} and {FROZEN_EXPECTED}; review the diff before committing")
+        return
+
+    engines = available_engines()
+    if args.engines:
+        unknown = set(args.engines) - set(engines)
+        if unknown:
+            parser.error(f"unknown engines: {', '.join(sorted(unknown))} (have {', '.join(engines)})")
+        engines = {name: engines[name] for name in args.engines}
+
+    frozen_failed = check_frozen(engines)
+    if not frozen_failed:
+        print(f"frozen corpus: reference and {len(engines)} engine(s) match expected.sas")
+
+    records = generate_corpus(args.records, args.seed)
+    start = time.perf_counter()
+    expected = reference_render(records)
+    reference_seconds = time.perf_counter() - start
+    digest = hashlib.sha256(expected.encode("utf-8")).hexdigest()
+    print(
+        f"corpus: {len(records)} records, {sum(len(r['levels']) for r in records)} blocks, "
+        f"{len(expected.encode('utf-8')) / 1e6:.1f} MB, sha256 {digest[:16]}"
+    )
+    print(f"reference: {reference_seconds:.3f}s")
+    if args.save:
+        save_golden(args.save, records, expected)
+
+    results = []
+    for result in iter_results(records, expected, engines, args.repeat):
+        results.append(result)
+        status = "ok  " if result["match"] else "FAIL"
+        print(
+            f"{status} {result['engine']:<20} {result['seconds']:>8.3f}s "
+            f"{result['records_per_s']:>9} rec/s {result['mb_per_s']:>7} MB/s"
+        )
+        if result["difference"]:
+            print(f"     {result['difference']}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"seed": args.seed, "records": len(records), "sha256": digest, "results": results}, fh, indent=2)
+    if frozen_failed or not all(r["match"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Local load test for the serverful Shiny app.
+
+Starts ``shiny run app/app.py`` on a local port, then drives dozens of
+concurrent sessions over Shiny's websocket protocol. Each session fills in the
+form and clicks "Add Variable to Queue" repeatedly. The script reports
+add-to-render latency percentiles, per-session queue bytes (as shown by the
+app) and the server's resident memory as sessions grow.
+
+    python tools/loadtest.py --sessions 40 --adds 50 --levels 6
+
+Needs the packages from requirements.txt (shiny pulls in ``websockets``).
+RSS sampling reads /proc and so only works on Linux.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOUND_OUTPUTS = ("queue_summary", "sas_code", "validation_errors", "session_usage", "level_inputs")
+
+
+def initial_inputs(levels: int) -> Dict[str, Any]:
+    inputs: Dict[str, Any] = {
+        "search": "",
+        "search_pick": "",
+        "dataset": "YRBS",
+        "var_code": "",
+        "var_name": "",
+        "description": "",
+        "var_type": "Indicator",
+        "topic": "Mental Health",
+        "sub_topic": "Mental Health Conditions",
+        "levels": levels,
+        "queue_item": "",
+        ".clientdata_url_search": "",
+    }
+    for button in ("add_var", "clear_queue", "generate", "item_load", "item_update", "item_up", "item_down", "item_delete"):
+        inputs[f"{button}:shiny.action"] = 0
+    for i in range(1, levels + 1):
+        inputs[f"level_{i}"] = ""
+    for out in BOUND_OUTPUTS:
+        inputs[f".clientdata_output_{out}_hidden"] = False
+    return inputs
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class Session:
+    def __init__(self, ws: Any):
+        self.ws = ws
+        self.values: Dict[str, Any] = {}
+
+    async def recv_until(self, output: str, timeout: float = 30.0) -> None:
+        """Read messages until ``output`` gets a new value."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            raw = await asyncio.wait_for(self.ws.recv(), timeout=deadline - time.perf_counter())
+            if isinstance(raw, bytes):
+                continue
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            values = msg.get("values") or {}
+            self.values.update(values)
+            if output in values:
+                return
+
+    async def send(self, method: str, data: Dict[str, Any]) -> None:
+        await self.ws.send(json.dumps({"method": method, "data": data}))
+
+
+async def run_session(
+    n: int, port: int, adds: int, levels: int, latencies: List[float], usage: Dict[int, str]
+) -> None:
+    async with websockets.connect(f"ws://127.0.0.1:{port}/websocket/", max_size=None) as ws:
+        session = Session(ws)
+        await session.send("init", initial_inputs(levels))
+        await session.recv_until("queue_summary")
+        for i in range(1, adds + 1):
+            fields = {
+                "var_code": f"s{n}v{i}",
+                "var_name": f"session{n}_var{i}",
+                "description": f"Load-test variable {i} of session {n} " + "x" * 40,
+            }
+            fields.update({f"level_{j}": f"Level {j} label" for j in range(1, levels + 1)})
+            await session.send("update", fields)
+            start = time.perf_counter()
+            await session.send("update", {"add_var:shiny.action": i})
+            await session.recv_until("queue_summary")
+            latencies.append(time.perf_counter() - start)
+        # Let the usage line catch up with the last add
+        try:
+            await session.recv_until("session_usage", timeout=2.0)
+        except asyncio.TimeoutError:
+            pass
+        usage[n] = session.values.get("session_usage", "")
+
+
+def wait_for_server(port: int, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Shiny server did not start on port {port}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(args: argparse.Namespace, pid: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    usage: Dict[int, str] = {}
+    rss_samples: List[int] = []
+    rss_start = rss_bytes(pid)
+
+    async def sample_rss() -> None:
+        while True:
+            value = rss_bytes(pid)
+            if value is not None:
+                rss_samples.append(value)
+            await asyncio.sleep(0.25)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        run_session(n, args.port, args.adds, args.levels, latencies, usage)
+        for n in range(1, args.sessions + 1)
+    ])
+    elapsed = time.perf_counter() - started
+    rss_end = rss_bytes(pid)
+    sampler.cancel()
+
+    return {
+        "sessions": args.sessions,
+        "adds_per_session": args.adds,
+        "levels": args.levels,
+        "total_adds": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "adds_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+        },
+        "rss_bytes": {
+            "start": rss_start,
+            "peak": max(rss_samples) if rss_samples else None,
+            "end": rss_end,
+            "per_session": (rss_end - rss_start) // args.sessions if rss_start and rss_end else None,
+        },
+        "session_usage_sample": usage.get(1, ""),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--adds", type=int, default=25, help="variables added per session")
+    parser.add_argument("--levels", type=int, default=4, choices=range(2, 7))
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "shiny", "run", "--port", str(args.port), "app/app.py"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(args.port)
+        report = asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w") as fh:
+            fh.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
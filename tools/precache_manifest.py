@@ -0,0 +1,245 @@
+"""Versioned precache manifest for the exported Shinylive site.
+
+Run after ``shinylive export app docs``. The script lists exactly the files
+the app needs to start, writes them to ``docs/precache-manifest.json`` and
+installs a small service-worker module (tools/shinylive/precache-sw.js).
+That module keeps those files in Cache Storage, so repeat visits start
+without network fetches, including when offline.
+
+* Pyodide runtime files: pyodide.asm.js/.wasm, python_stdlib.zip and
+  pyodide-lock.json.
+* The wheels for the app's imports plus their dependencies, as resolved from
+  pyodide-lock.json. The imports come from the exported app.json, starting
+  at app.py and following the app's own modules. Imports made inside
+  functions (such as pandas in sasgen.sasmeta) are loaded on demand and are
+  only listed under ``on_demand``. Shinylive's base packages (micropip, ssl,
+  pyodide-http) are always included.
+* The Shinylive JS/CSS assets outside ``shinylive/pyodide`` and
+  ``shinylive/pyright`` (the latter is only used by the editor), plus
+  index.html and app.json.
+
+The manifest version is a hash of every listed file's content, so the
+browser replaces the precache when anything changes. The script edits the
+exported ``shinylive-sw.js``, which is stock, in one way: it adds an import
+of ``precache-sw.js``. Re-running the script is safe.
+
+    python tools/precache_manifest.py docs
+    python tools/precache_manifest.py docs --test-page   # also copy warmstart.html (local testing)
+"""
+import argparse
+import ast
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shinylive")
+MANIFEST_NAME = "precache-manifest.json"
+SW_MODULE = "precache-sw.js"
+TEST_PAGE = "warmstart.html"
+SW_IMPORT = f'import "./{SW_MODULE}";\n'
+VERSION_PLACEHOLDER = "__PRECACHE_VERSION__"
+
+APP_ENTRY = "app.py"
+PYODIDE_DIR = "shinylive/pyodide"
+# Walked for JS/CSS assets, minus packages (listed individually) and the editor's pyright
+SKIPPED_DIRS = ("shinylive/pyodide", "shinylive/pyright")
+RUNTIME_FILES = ("pyodide.asm.js", "pyodide.asm.wasm", "python_stdlib.zip", "pyodide-lock.json")
+# Installed in every Shinylive deployment (see shinylive's BASE_PYODIDE_PACKAGE_NAMES)
+BASE_PACKAGES = ("micropip", "ssl", "pyodide-http")
+SITE_FILES = ("index.html", "app.json")
+
+
+# === App imports ===
+
+def _module_name(path: str) -> str:
+    parts = path[: -len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _imports(tree: ast.AST, module: str, is_package: bool) -> Iterable[Tuple[str, bool]]:
+    """(absolute module name, runs at import time) for each import in ``tree``."""
+    package = module if is_package else module.rpartition(".")[0]
+    pending = [(tree, True)]
+    while pending:
+        node, eager = pending.pop()
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name, eager
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split(".")
+                base = ".".join(parts[: len(parts) - node.level + 1] + ([base] if base else []))
+            yield base, eager
+            for alias in node.names:  # ``from pkg import submodule``
+                yield f"{base}.{alias.name}", eager
+        # Function bodies run later, if at all
+        nested = eager and not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda))
+        pending.extend((child, nested) for child in ast.iter_child_nodes(node))
+
+
+def app_imports(app_files: Dict[str, str]) -> Tuple[Set[str], Set[str]]:
+    """Third-party top-level imports reachable from app.py: (at start-up, on demand)."""
+    modules = {_module_name(path): path for path in app_files if path.endswith(".py")}
+    eager: Set[str] = set()
+    lazy: Set[str] = set()
+    seen: Set[str] = set()
+    pending = [_module_name(APP_ENTRY)]
+    while pending:
+        module = pending.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        path = modules[module]
+        tree = ast.parse(app_files[path], filename=path)
+        for name, at_start in _imports(tree, module, path.endswith("__init__.py")):
+            if name in modules:
+                # Importing a submodule runs its parent packages first
+                parts = name.split(".")
+                parents = (".".join(parts[:i]) for i in range(1, len(parts) + 1))
+                pending.extend(parent for parent in parents if parent in modules)
+            elif name.split(".")[0] not in modules:
+                (eager if at_start else lazy).add(name.split(".")[0])
+    return eager, lazy - eager
+
+
+# === Pyodide packages ===
+
+def resolve_packages(lock: Dict[str, Any], imports: Iterable[str], names: Iterable[str] = ()) -> List[str]:
+    """pyodide-lock.json keys for the ``imports`` (module names), package ``names`` and their dependencies.
+
+    Module names are matched against each package's ``imports`` only, as
+    Shinylive and Pyodide do, so ``import hashlib`` doesn't pull in the
+    optional OpenSSL-backed hashlib package.
+    """
+    packages = lock["packages"]
+    by_import: Dict[str, str] = {}
+    by_name: Dict[str, str] = {}
+    for key, info in packages.items():
+        by_name[info["name"].lower()] = key
+        for module in info.get("imports", []):
+            by_import.setdefault(module, key)
+    found: List[str] = []
+    pending = [by_import.get(module) for module in imports] + [by_name.get(name.lower()) for name in names]
+    while pending:
+        key = pending.pop()
+        if key is None or key in found:
+            continue  # standard library or already listed
+        found.append(key)
+        pending.extend(by_name.get(dep.lower()) for dep in packages[key]["depends"])
+    return sorted(found)
+
+
+# === Manifest ===
+
+def _digest(path: str) -> Tuple[str, int]:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest(), os.path.getsize(path)
+
+
+def _stock_cache_prefix(sw_source: str) -> str:
+    """Stock shinylive-sw.js deletes every cache not named ``version + cacheName`` on activation."""
+    version = re.search(r'var version = "([^"]*)"', sw_source)
+    name = re.search(r'var cacheName = "([^"]*)"', sw_source)
+    if not (version and name):
+        raise ValueError("shinylive-sw.js: could not find the service worker's cache name")
+    return version.group(1) + name.group(1)
+
+
+def build_manifest(site: str) -> Dict[str, Any]:
+    with open(os.path.join(site, "app.json"), encoding="utf-8") as fh:
+        app_files = {f["name"]: f["content"] for f in json.load(fh) if f.get("type", "text") == "text"}
+    with open(os.path.join(site, PYODIDE_DIR, "pyodide-lock.json"), encoding="utf-8") as fh:
+        lock = json.load(fh)
+    with open(os.path.join(site, "shinylive-sw.js"), encoding="utf-8") as fh:
+        cache_prefix = _stock_cache_prefix(fh.read())
+
+    eager, lazy = app_imports(app_files)
+    packages = resolve_packages(lock, eager, BASE_PACKAGES)
+    on_demand = [key for key in resolve_packages(lock, lazy) if key not in packages]
+
+    urls = [f"{PYODIDE_DIR}/{name}" for name in RUNTIME_FILES]
+    urls += [f"{PYODIDE_DIR}/{lock['packages'][key]['file_name']}" for key in packages]
+    for root, dirs, files in os.walk(os.path.join(site, "shinylive")):
+        rel = os.path.relpath(root, site).replace(os.sep, "/")
+        dirs[:] = sorted(d for d in dirs if f"{rel}/{d}" not in SKIPPED_DIRS)
+        urls += [f"{rel}/{name}" for name in sorted(files) if not name.startswith(".")]
+    urls += list(SITE_FILES)
+
+    entries = []
+    missing = []
+    for url in urls:
+        path = os.path.join(site, *url.split("/"))
+        if not os.path.exists(path):
+            missing.append(url)
+            continue
+        sha, size = _digest(path)
+        integrity = "sha256-" + base64.b64encode(bytes.fromhex(sha)).decode("ascii")
+        entries.append({"url": url, "size": size, "sha256": sha, "integrity": integrity})
+    if missing:
+        raise ValueError("missing from the export: " + ", ".join(missing))
+
+    version = hashlib.sha256("".join(e["url"] + e["sha256"] for e in entries).encode("utf-8")).hexdigest()[:16]
+    return {
+        "version": version,
+        "cache": f"{cache_prefix}::codelookup-{version}",
+        "cache_prefix": f"{cache_prefix}::codelookup-",
+        "pyodide": lock["info"]["version"],
+        "packages": packages,
+        "on_demand": on_demand,
+        "bytes": sum(e["size"] for e in entries),
+        "files": entries,
+    }
+
+
+def install(site: str, manifest: Dict[str, Any], test_page: bool = False) -> None:
+    with open(os.path.join(site, MANIFEST_NAME), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1)
+        fh.write("\n")
+    # The version is baked into the module so the browser sees a changed
+    # service worker, and re-installs the precache, whenever the manifest changes.
+    with open(os.path.join(TEMPLATE_DIR, SW_MODULE), encoding="utf-8") as fh:
+        module = fh.read().replace(VERSION_PLACEHOLDER, manifest["version"])
+    with open(os.path.join(site, SW_MODULE), "w", encoding="utf-8") as fh:
+        fh.write(module)
+    sw_path = os.path.join(site, "shinylive-sw.js")
+    with open(sw_path, encoding="utf-8") as fh:
+        sw = fh.read()
+    if SW_IMPORT not in sw:
+        # Imports run first, so the precache fetch handler is registered before the stock one
+        with open(sw_path, "w", encoding="utf-8") as fh:
+            fh.write(SW_IMPORT + sw)
+    if test_page:
+        shutil.copy(os.path.join(TEMPLATE_DIR, TEST_PAGE), os.path.join(site, TEST_PAGE))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("site", nargs="?", default="docs", help="directory written by shinylive export")
+    parser.add_argument("--test-page", action="store_true", help=f"also copy {TEST_PAGE} (cold/warm start timings)")
+    args = parser.parse_args()
+    try:
+        manifest = build_manifest(args.site)
+    except (OSError, ValueError) as e:
+        sys.exit(f"precache_manifest: {e}")
+    install(args.site, manifest, args.test_page)
+    print(
+        f"{MANIFEST_NAME} {manifest['version']}: {len(manifest['files'])} files, "
+        f"{manifest['bytes'] / 1e6:.1f} MB, packages: {', '.join(manifest['packages'])}"
+    )
+    if manifest["on_demand"]:
+        print(f"on demand (not precached): {', '.join(manifest['on_demand'])}")
+
+
+if __name__ == "__main__":
+    main()
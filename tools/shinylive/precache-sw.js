@@ -0,0 +1,120 @@
+// Precache for the exported Shinylive site.
+//
+// Copied to docs/ by tools/precache_manifest.py, which also adds an import of
+// this module to the top of the stock shinylive-sw.js, so the fetch handler
+// below is registered before Shinylive's own. Every file in
+// precache-manifest.json (Pyodide runtime, the app's wheels, Shinylive assets,
+// app.json) is stored in Cache Storage when the service worker installs and
+// served from there afterwards; anything else goes to Shinylive as before.
+//
+// The cache name starts with the stock worker's cache name, because the
+// stock worker deletes all other caches when it activates. Files whose
+// sha256 is unchanged are copied over from the previous version's cache.
+
+const PRECACHE_VERSION = "__PRECACHE_VERSION__";
+const SHA_HEADER = "X-Precache-SHA256";
+const baseUrl = new URL("./", self.location).href;
+const manifestUrl = new URL(`precache-manifest.json?v=${PRECACHE_VERSION}`, baseUrl).href;
+
+let manifest = null;
+let precached = null; // absolute URL -> manifest entry
+let loading = null;
+
+function loadManifest() {
+  loading ||= (async () => {
+    // The manifest is stored in the precache too, so it is available offline
+    const response = (await caches.match(manifestUrl)) || (await fetch(manifestUrl, { cache: "no-cache" }));
+    if (!response.ok) {
+      throw new Error(`precache: ${manifestUrl} returned ${response.status}`);
+    }
+    manifest = await response.json();
+    precached = new Map(manifest.files.map((file) => [new URL(file.url, baseUrl).href, file]));
+    return manifest;
+  })().catch((error) => {
+    loading = null; // try again on the next install or start
+    throw error;
+  });
+  return loading;
+}
+
+// Loaded whenever the browser starts this worker, not just on install
+const ready = loadManifest().catch((error) => {
+  console.warn(error);
+  return null;
+});
+
+async function previousCopy(url, file) {
+  for (const name of await caches.keys()) {
+    if (name === manifest.cache || !name.startsWith(manifest.cache_prefix)) continue;
+    const response = await (await caches.open(name)).match(url);
+    if (response && response.headers.get(SHA_HEADER) === file.sha256) return response;
+  }
+  return null;
+}
+
+async function precacheFile(cache, url, file) {
+  let response = await previousCopy(url, file);
+  if (response === null) {
+    // integrity makes fetch reject a body that doesn't match the manifest
+    const fetched = await fetch(url, { cache: "no-cache", integrity: file.integrity });
+    if (!fetched.ok) throw new Error(`precache: ${url} returned ${fetched.status}`);
+    const headers = new Headers(fetched.headers);
+    headers.set(SHA_HEADER, file.sha256);
+    response = new Response(await fetched.blob(), { status: fetched.status, statusText: fetched.statusText, headers });
+  }
+  await cache.put(url, response);
+}
+
+async function precache() {
+  await loadManifest();
+  const cache = await caches.open(manifest.cache);
+  const have = new Set((await cache.keys()).map((request) => request.url));
+  await Promise.all(
+    [...precached].filter(([url]) => !have.has(url)).map(([url, file]) => precacheFile(cache, url, file))
+  );
+  await cache.put(manifestUrl, new Response(JSON.stringify(manifest), { headers: { "Content-Type": "application/json" } }));
+}
+
+self.addEventListener("install", (event) => {
+  // A failed precache must not stop Shinylive's worker from installing; files
+  // that didn't make it are fetched from the network as usual.
+  event.waitUntil(precache().catch((error) => console.warn("precache failed:", error)));
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    (async () => {
+      if ((await ready) === null) return;
+      const stale = (await caches.keys()).filter(
+        (name) => name.startsWith(manifest.cache_prefix) && name !== manifest.cache
+      );
+      await Promise.all(stale.map((name) => caches.delete(name)));
+    })()
+  );
+});
+
+function precacheUrl(request) {
+  const url = new URL(request.url);
+  url.hash = "";
+  if (url.href === baseUrl) url.pathname += "index.html";
+  return url.href;
+}
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  if (request.method !== "GET" || !request.url.startsWith(baseUrl)) return;
+  // Cross-origin-isolated requests get extra headers from the stock handler
+  if (new URL(request.url).searchParams.get("coi") === "1" || request.referrer.includes("coi=1")) return;
+  const url = precacheUrl(request);
+  // Until the manifest is loaded, anything under shinylive/ may be precached
+  if (precached !== null ? !precached.has(url) : !url.startsWith(`${baseUrl}shinylive/`)) return;
+  event.respondWith(
+    (async () => {
+      if ((await ready) !== null && precached.has(url)) {
+        const cached = await (await caches.open(manifest.cache)).match(url);
+        if (cached) return cached;
+      }
+      return fetch(request);
+    })()
+  );
+});